@@ -1,9 +1,58 @@
 from django.contrib import admin
-from .models import TimeSlot
+
+from . import index
+from .models import AvailabilityRule, TimeSlot
+
 
 @admin.register(TimeSlot)
 class TimeSlotAdmin(admin.ModelAdmin):
     list_display = ['date', 'start_time', 'end_time', 'provider', 'is_available']
     list_filter = ['is_available', 'date', 'provider']
     search_fields = ['provider__username']
-    date_hierarchy = 'date'
\ No newline at end of file
+    date_hierarchy = 'date'
+
+    # edições pelo admin também precisam manter o índice de disponibilidade
+    def save_model(self, request, obj, form, change):
+        old = TimeSlot.objects.filter(pk=obj.pk).values_list("provider_id", "date").first() if change else None
+        super().save_model(request, obj, form, change)
+        if old:
+            index.refresh_days(old[0], [old[1]])
+        index.refresh_days(obj.provider_id, [obj.date])
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        index.refresh_days(obj.provider_id, [obj.date])
+
+    def delete_queryset(self, request, queryset):
+        affected = set(queryset.values_list("provider_id", "date"))
+        super().delete_queryset(request, queryset)
+        for provider_id, d in affected:
+            index.refresh_days(provider_id, [d])
+
+
+@admin.register(AvailabilityRule)
+class AvailabilityRuleAdmin(admin.ModelAdmin):
+    list_display = ['provider', 'start_date', 'end_date', 'slot_minutes', 'break_minutes']
+    list_filter = ['provider']
+    search_fields = ['provider__username']
+
+    # os horários da regra só existem no índice: toda edição o recalcula
+    def save_model(self, request, obj, form, change):
+        old = (
+            AvailabilityRule.objects.filter(pk=obj.pk).values_list("provider_id", "start_date", "end_date").first()
+            if change else None
+        )
+        super().save_model(request, obj, form, change)
+        if old:
+            index.refresh_range(*old)
+        index.refresh_range(obj.provider_id, obj.start_date, obj.end_date)
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        index.refresh_range(obj.provider_id, obj.start_date, obj.end_date)
+
+    def delete_queryset(self, request, queryset):
+        affected = list(queryset.values_list("provider_id", "start_date", "end_date"))
+        super().delete_queryset(request, queryset)
+        for provider_id, start, end in affected:
+            index.refresh_range(provider_id, start, end)
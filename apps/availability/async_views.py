@@ -0,0 +1,167 @@
+"""
+Versões assíncronas (ASGI) das APIs de leitura de disponibilidade.
+
+Mesmo contrato das views síncronas (JSON, ETag/304, cache), mas usando o ORM
+assíncrono do Django, para que clientes lentos ou em polling não ocupem um
+worker inteiro. Servidas em api/async/... e, com AVAILABILITY_ASYNC_API=1,
+também nas URLs principais (perfil de deploy ASGI, ver README).
+"""
+import json
+from datetime import date as date_type
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+
+from django.contrib.auth.decorators import login_required
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.dateparse import parse_date
+from django.utils.http import http_date
+
+from config.db_router import read_from_replica
+
+from . import cache as availability_cache, changes, index
+from .views import (
+    CHANGES_CURSOR_HEADER,
+    CalendarEventChunker,
+    calendar_days_queryset,
+    calendar_delta_response,
+    calendar_events,
+    calendar_stream_params,
+    parse_since,
+)
+
+
+def _not_modified(request, etag, last_modified):
+    """Resposta 304 se o cliente já tem a versão atual (como o decorator condition)."""
+    return get_conditional_response(
+        request,
+        etag=etag,
+        last_modified=int(last_modified.timestamp()) if last_modified else None,
+    )
+
+
+def _with_validators(response, etag, last_modified):
+    if etag:
+        response.headers.setdefault("ETag", etag)
+    if last_modified:
+        response.headers.setdefault("Last-Modified", http_date(last_modified.timestamp()))
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+@read_from_replica
+@login_required
+async def available_slots_api(request):
+    """
+    GET /availability/api/async/slots/?date=YYYY-MM-DD[&provider=<id>]
+    """
+    date_str = request.GET.get("date")
+    provider_id = request.GET.get("provider") or None
+
+    d = parse_date(date_str) if date_str else None
+    if not isinstance(d, date_type) or (provider_id is not None and not provider_id.isdigit()):
+        return JsonResponse({"results": []})
+
+    etag, last_modified = await index.arange_stamp(d, d, provider_id)
+    not_modified = _not_modified(request, etag, last_modified)
+    if not_modified is not None:
+        return _with_validators(not_modified, etag, last_modified)
+
+    key = availability_cache.slots_key(d, provider_id)
+    payload = await availability_cache.aget(key, etag)
+    if payload is None:
+        payload = json.dumps({"results": await index.afree_slots_for_date(d, provider_id)}).encode()
+        await availability_cache.aput(key, etag, payload)
+
+    return _with_validators(HttpResponse(payload, content_type="application/json"), etag, last_modified)
+
+
+@read_from_replica
+@login_required
+async def calendar_events_api(request):
+    """
+    GET /availability/api/async/calendar-events/?start=YYYY-MM-DD&end=YYYY-MM-DD[&since=<cursor>]
+    """
+    start_str = request.GET.get("start")
+    end_str = request.GET.get("end")
+
+    start = parse_date(start_str) if start_str else None
+    end = parse_date(end_str) if end_str else None
+
+    if not (isinstance(start, date_type) and isinstance(end, date_type)):
+        return _with_validators(JsonResponse({"events": []}), None, None)
+
+    if "since" in request.GET:
+        since = parse_since(request)
+        delta = None if since is None else await changes.adelta(since, start, end)
+        return _with_validators(calendar_delta_response(since, delta), None, None)
+
+    etag, last_modified = await index.arange_stamp(start, end)
+    not_modified = _not_modified(request, etag, last_modified)
+    if not_modified is not None:
+        return _with_validators(not_modified, etag, last_modified)
+
+    # lido antes dos eventos: no pior caso o cliente reaplica uma mudança já vista
+    cursor = await changes.ahead()
+    key = availability_cache.calendar_key("calendar", start, end)
+    payload = await availability_cache.aget(key, etag)
+    if payload is None:
+        rows = [row async for row in calendar_days_queryset(start, end)]
+        payload = json.dumps(calendar_events(rows)).encode()
+        await availability_cache.aput(key, etag, payload)
+
+    response = HttpResponse(payload, content_type="application/json")
+    response[CHANGES_CURSOR_HEADER] = cursor
+    return _with_validators(response, etag, last_modified)
+
+
+async def _aiter_rows(qs, chunk_size=2000):
+    """
+    Itera um queryset em blocos sem carregar tudo na memória.
+    QuerySet.aiterator() executa a consulta de values_list() ainda na thread
+    assíncrona no Django 5.1 (SynchronousOnlyOperation); aqui o gerador de
+    .iterator() é criado preguiçosamente e cada bloco é lido via sync_to_async
+    (sempre na mesma thread, então o cursor no servidor continua válido).
+    """
+    rows = qs.iterator(chunk_size=chunk_size)
+    next_chunk = sync_to_async(lambda: list(islice(rows, chunk_size)))
+    while chunk := await next_chunk():
+        for row in chunk:
+            yield row
+
+
+async def _calendar_event_chunks(start, end, provider_id=None):
+    chunker = CalendarEventChunker()
+    async for row in _aiter_rows(calendar_days_queryset(start, end, provider_id), chunk_size=500):
+        chunk = chunker.feed(row)
+        if chunk:
+            yield chunk
+    yield chunker.close()
+
+
+@read_from_replica
+@login_required
+async def calendar_events_stream_api(request):
+    """
+    GET /availability/api/async/calendar-events/stream/?start=YYYY-MM-DD&end=YYYY-MM-DD[&provider=<id>]
+    """
+    start, end, provider_id, error = calendar_stream_params(request)
+    if error:
+        return JsonResponse({"error": error}, status=400)
+
+    etag, last_modified = await index.arange_stamp(start, end, provider_id)
+    not_modified = _not_modified(request, etag, last_modified)
+    if not_modified is not None:
+        return _with_validators(not_modified, etag, last_modified)
+
+    key = availability_cache.calendar_key("calendar-stream", start, end, provider_id)
+    payload = await availability_cache.aget(key, etag)
+    if payload is not None:
+        response = HttpResponse(payload, content_type="application/json")
+    else:
+        response = StreamingHttpResponse(
+            availability_cache.acaching_stream(key, etag, _calendar_event_chunks(start, end, provider_id)),
+            content_type="application/json",
+        )
+    return _with_validators(response, etag, last_modified)
@@ -0,0 +1,80 @@
+"""
+Bloqueio e desbloqueio de vários dias de uma vez (intervalo + dias da semana).
+
+Cada operação roda em uma transação com um número fixo de consultas, qualquer
+que seja o tamanho do intervalo: uma agregação dos agendamentos ativos por
+dia, um INSERT em lote de DayOff (ou um DELETE), um UPDATE de TimeSlot e a
+atualização do índice dos dias afetados.
+"""
+from dataclasses import dataclass, field
+
+from django.db import transaction
+from django.db.models import Count, Exists, OuterRef
+
+from . import index
+from .generation import daterange
+from .models import DayOff, TimeSlot
+
+
+ACTIVE_STATUSES = ["pending", "confirmed"]
+
+
+@dataclass
+class BlockResult:
+    dates: list = field(default_factory=list)
+    # {date: agendamentos ativos} dos dias que ficaram de fora
+    conflicts: dict = field(default_factory=dict)
+
+
+def select_dates(start_date, end_date, weekdays=None):
+    """Dias do intervalo, opcionalmente só nos dias da semana informados."""
+    return [d for d in daterange(start_date, end_date) if not weekdays or d.weekday() in weekdays]
+
+
+def active_bookings_by_day(provider, dates):
+    """{date: quantidade de agendamentos ativos} do prestador, em uma consulta."""
+    from apps.bookings.models import Booking
+
+    rows = (
+        Booking.objects
+        .filter(time_slot__provider=provider, time_slot__date__in=dates, status__in=ACTIVE_STATUSES)
+        .values("time_slot__date")
+        .annotate(n=Count("id"))
+        .order_by()
+    )
+    return {row["time_slot__date"]: row["n"] for row in rows}
+
+
+def block_days(provider, dates, reason=""):
+    """
+    Bloqueia os dias sem agendamento ativo; os que têm agendamento ficam de
+    fora e voltam em BlockResult.conflicts.
+    """
+    result = BlockResult()
+    with transaction.atomic():
+        result.conflicts = active_bookings_by_day(provider, dates)
+        result.dates = [d for d in dates if d not in result.conflicts]
+        if not result.dates:
+            return result
+
+        DayOff.objects.bulk_create(
+            [DayOff(provider=provider, date=d, reason=reason) for d in result.dates],
+            ignore_conflicts=True,
+        )
+        TimeSlot.objects.filter(provider=provider, date__in=result.dates).update(is_available=False)
+        index.refresh_days(provider.pk, result.dates)
+    return result
+
+
+def unblock_days(provider, dates):
+    """Remove os bloqueios e reabre os horários sem agendamento ativo. Retorna quantos dias saíram do bloqueio."""
+    from apps.bookings.models import Booking
+
+    with transaction.atomic():
+        unblocked, _ = DayOff.objects.filter(provider=provider, date__in=dates).delete()
+
+        # reabilita apenas slots sem booking ativo
+        active = Booking.objects.filter(time_slot=OuterRef("pk"), status__in=ACTIVE_STATUSES)
+        TimeSlot.objects.filter(provider=provider, date__in=dates).exclude(Exists(active)).update(is_available=True)
+        index.refresh_days(provider.pk, dates)
+    return unblocked
@@ -0,0 +1,128 @@
+"""
+Cache dos payloads serializados das APIs de disponibilidade.
+
+Cada entrada guarda (etag, payload). O etag é o carimbo de versão dos
+prestadores/dias cobertos (index.range_stamp), então uma entrada só é usada
+se nenhum desses dias mudou desde que foi gravada. Além disso, toda escrita
+que altera um dia (index.refresh_days) apaga na hora as entradas diárias
+daquele dia, sem esperar a expiração.
+
+Funciona com qualquer backend do Django (locmem, arquivo, Redis...). O
+tamanho é limitado por MAX_ENTRIES do backend (o locmem descarta as menos
+usadas recentemente) e por AVAILABILITY_CACHE_MAX_PAYLOAD por entrada.
+
+Acertos e falhas são contados na memória do processo (config.instrumentation),
+não no próprio cache: não dobram o tráfego da leitura nem somem com um
+clear() ou uma expulsão.
+"""
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+from config.instrumentation import CacheCounters
+
+
+counters = CacheCounters("availability")
+
+
+def _cache():
+    return caches[settings.AVAILABILITY_CACHE_ALIAS]
+
+
+def slots_key(d, provider_id=None):
+    return f"availability:slots:{d}:{provider_id or 'all'}"
+
+
+def calendar_key(kind, start, end, provider_id=None):
+    return f"availability:{kind}:{start}:{end}:{provider_id or 'all'}"
+
+
+def get(key, etag):
+    """Payload em cache para a chave, desde que o etag ainda seja o atual."""
+    if etag is not None:
+        entry = _cache().get(key)
+        if entry is not None and entry[0] == etag:
+            counters.record(hit=True)
+            return entry[1]
+    counters.record(hit=False)
+    return None
+
+
+def put(key, etag, payload):
+    if etag is None or len(payload) > settings.AVAILABILITY_CACHE_MAX_PAYLOAD:
+        return
+    _cache().set(key, (etag, payload))
+
+
+def get_or_build(key, etag, builder):
+    payload = get(key, etag)
+    if payload is None:
+        payload = builder()
+        put(key, etag, payload)
+    return payload
+
+
+def caching_stream(key, etag, chunks):
+    """
+    Repassa os pedaços de uma resposta em streaming e, se ela couber no limite
+    de payload, grava o resultado completo no cache ao final.
+    """
+    limit = settings.AVAILABILITY_CACHE_MAX_PAYLOAD
+    parts, size = [], 0
+    for chunk in chunks:
+        if parts is not None:
+            size += len(chunk)
+            if size <= limit:
+                parts.append(chunk)
+            else:
+                parts = None
+        yield chunk
+    if parts is not None:
+        put(key, etag, "".join(parts).encode())
+
+
+async def aget(key, etag):
+    if etag is not None:
+        entry = await _cache().aget(key)
+        if entry is not None and entry[0] == etag:
+            counters.record(hit=True)
+            return entry[1]
+    counters.record(hit=False)
+    return None
+
+
+async def aput(key, etag, payload):
+    if etag is None or len(payload) > settings.AVAILABILITY_CACHE_MAX_PAYLOAD:
+        return
+    await _cache().aset(key, (etag, payload))
+
+
+async def acaching_stream(key, etag, chunks):
+    """Versão assíncrona de caching_stream, para as views ASGI."""
+    limit = settings.AVAILABILITY_CACHE_MAX_PAYLOAD
+    parts, size = [], 0
+    async for chunk in chunks:
+        if parts is not None:
+            size += len(chunk)
+            if size <= limit:
+                parts.append(chunk)
+            else:
+                parts = None
+        yield chunk
+    if parts is not None:
+        await aput(key, etag, "".join(parts).encode())
+
+
+def invalidate_days(provider_id, dates):
+    """Apaga as entradas diárias dos dias alterados (após o commit)."""
+    keys = []
+    for d in dates:
+        keys += [slots_key(d, provider_id), slots_key(d)]
+
+    if keys:
+        transaction.on_commit(lambda: _cache().delete_many(keys))
+
+
+def stats():
+    """Acertos/falhas deste processo desde que ele subiu."""
+    return counters.snapshot()
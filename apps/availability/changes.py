@@ -0,0 +1,128 @@
+"""
+Registro de mudanças do índice de disponibilidade (AvailabilityChange).
+
+index.refresh_many compara os horários livres antigos e novos de cada dia
+alterado e grava a diferença na mesma transação, então toda escrita em
+TimeSlot, DayOff, Booking ou AvailabilityRule entra no registro. O feed de
+calendário (?since=<cursor>) devolve só o que mudou depois do cursor do
+cliente, em vez do mês inteiro.
+
+O id é atribuído no INSERT, mas a linha só fica visível no COMMIT: uma
+transação que pegou o id 10 pode commitar depois de outra com o id 11. Por
+isso o cursor só avança sobre mudanças gravadas há mais de
+AVAILABILITY_CHANGES_SETTLE_SECONDS (mais que a duração de uma escrita); as
+mais novas ficam para o próximo poll, em vez de serem puladas de vez.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Max, Min, Q
+from django.utils import timezone
+
+from .models import AvailabilityChange
+
+
+def diff(old_slots, new_slots):
+    """(adicionados, alterados, removidos) entre duas listas free_slots."""
+    old = {slot[0]: slot for slot in old_slots}
+    new = {slot[0]: slot for slot in new_slots}
+    added = [slot for slot_id, slot in new.items() if slot_id not in old]
+    changed = [slot for slot_id, slot in new.items() if slot_id in old and old[slot_id] != slot]
+    removed = [slot_id for slot_id in old if slot_id not in new]
+    return added, changed, removed
+
+
+def record(entries):
+    """Grava as diferenças; entries: [(provider_id, date, free_slots antigos, novos), ...]."""
+    rows = []
+    for provider_id, d, old_slots, new_slots in entries:
+        added, changed, removed = diff(old_slots, new_slots)
+        if added or changed or removed:
+            rows.append(AvailabilityChange(
+                provider_id=provider_id, date=d, added=added, changed=changed, removed=removed,
+            ))
+    if rows:
+        AvailabilityChange.objects.bulk_create(rows, batch_size=500)
+
+
+def _settled():
+    """Filtro das mudanças gravadas antes da janela de assentamento."""
+    return Q(created_at__lt=timezone.now() - timedelta(seconds=settings.AVAILABILITY_CHANGES_SETTLE_SECONDS))
+
+
+def _head_queryset():
+    return AvailabilityChange.objects.filter(_settled())
+
+
+def head():
+    """Cursor atual (id da última mudança já assentada, 0 se não houver)."""
+    return _head_queryset().aggregate(m=Max("id"))["m"] or 0
+
+
+async def ahead():
+    return (await _head_queryset().aaggregate(m=Max("id")))["m"] or 0
+
+
+def _bounds_aggregates():
+    return {"lo": Min("id"), "hi": Max("id", filter=_settled())}
+
+
+def _cursor(bounds, since):
+    """Novo cursor a partir de (lo, hi) do registro, ou None se since já saiu dele."""
+    # ids podem ter buracos (rollbacks): no pior caso o cliente recarrega à toa
+    if since and bounds["lo"] is not None and bounds["lo"] > since + 1:
+        return None
+    # o cursor nunca volta: sem mudança assentada depois dele, fica onde está
+    return max(bounds["hi"] or 0, since)
+
+
+def _delta_queryset(since, cursor, start, end, provider_id):
+    qs = AvailabilityChange.objects.filter(id__gt=since, id__lte=cursor, date__gte=start, date__lte=end)
+    if provider_id:
+        qs = qs.filter(provider_id=provider_id)
+    return qs.order_by("id").values_list("date", "provider__username", "added", "changed", "removed")
+
+
+def _consolidate(rows, cursor):
+    state = {}
+    for d, username, added, changed, removed in rows:
+        for slot_id in removed:
+            state[slot_id] = ("removed", None)
+        for slot in added:
+            state[slot[0]] = ("added", (d, username, slot))
+        for slot in changed:
+            state[slot[0]] = ("changed", (d, username, slot))
+
+    result = {"cursor": cursor, "added": [], "changed": [], "removed": []}
+    for slot_id, (kind, value) in state.items():
+        result[kind].append(slot_id if kind == "removed" else value)
+    return result
+
+
+def delta(since, start, end, provider_id=None):
+    """
+    Mudanças nos dias [start, end] depois do cursor, já consolidadas por
+    horário (vale o último estado): {"cursor", "added", "changed", "removed"},
+    com added/changed como (date, username, [id, "HH:MM", "HH:MM"]).
+    Retorna None se o cursor for mais antigo que o registro (prune): o
+    cliente precisa recarregar tudo.
+    """
+    cursor = _cursor(AvailabilityChange.objects.aggregate(**_bounds_aggregates()), since)
+    if cursor is None:
+        return None
+    return _consolidate(_delta_queryset(since, cursor, start, end, provider_id), cursor)
+
+
+async def adelta(since, start, end, provider_id=None):
+    cursor = _cursor(await AvailabilityChange.objects.aaggregate(**_bounds_aggregates()), since)
+    if cursor is None:
+        return None
+    return _consolidate([row async for row in _delta_queryset(since, cursor, start, end, provider_id)], cursor)
+
+
+def prune(retention_days=None):
+    """Apaga mudanças mais antigas que a retenção; retorna quantas saíram."""
+    days = settings.AVAILABILITY_CHANGES_RETENTION_DAYS if retention_days is None else retention_days
+    cutoff = timezone.now() - timedelta(days=days)
+    deleted, _ = AvailabilityChange.objects.filter(created_at__lt=cutoff).delete()
+    return deleted
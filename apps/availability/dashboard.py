@@ -0,0 +1,104 @@
+"""
+Dados do painel de agenda (ScheduleView) do prestador.
+
+A página só traz os formulários e um resumo por mês (uma consulta agregada
+sobre o índice DayAvailability, que já inclui os horários de regra). As
+tabelas de horários e de dias bloqueados são carregadas sob demanda, um mês
+e uma página por vez, por views.schedule_rows_api.
+"""
+import calendar
+from datetime import date as date_type
+
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncMonth
+
+from .models import DayAvailability, DayOff, TimeSlot
+
+
+SUMMARY_MONTHS_BEFORE = 2
+SUMMARY_MONTHS = 12
+ROWS_PAGE_SIZE = 100
+
+
+def add_months(d, n):
+    """Primeiro dia do mês n meses depois (ou antes) do mês de d."""
+    year, month = divmod(d.year * 12 + d.month - 1 + n, 12)
+    return date_type(year, month + 1, 1)
+
+
+def parse_month(value):
+    """Primeiro dia do mês "AAAA-MM", ou None se for inválido."""
+    try:
+        year, month = (int(part) for part in value.split("-"))
+        return date_type(year, month, 1)
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+def month_bounds(first):
+    return first, first.replace(day=calendar.monthrange(first.year, first.month)[1])
+
+
+def summary_queryset(provider_id, start, end):
+    """Contagens do índice por mês em [start, end): dias com horário livre, horários livres e dias bloqueados."""
+    return (
+        DayAvailability.objects
+        .filter(provider_id=provider_id, date__gte=start, date__lt=end)
+        .annotate(month=TruncMonth("date"))
+        .values("month")
+        .annotate(
+            free_days=Count("id", filter=Q(free_count__gt=0)),
+            free_slots=Sum("free_count"),
+            blocked_days=Count("id", filter=Q(is_blocked=True)),
+        )
+        .order_by()
+    )
+
+
+def month_summary(provider_id, today=None):
+    """
+    [{"month", "free_days", "free_slots", "blocked_days"}, ...] dos
+    SUMMARY_MONTHS meses a partir de SUMMARY_MONTHS_BEFORE meses atrás, em
+    uma consulta; meses sem dados no índice vêm zerados.
+    """
+    first = add_months(today or date_type.today(), -SUMMARY_MONTHS_BEFORE)
+    months = [add_months(first, i) for i in range(SUMMARY_MONTHS)]
+    by_month = {row["month"]: row for row in summary_queryset(provider_id, months[0], add_months(months[-1], 1))}
+    empty = {"free_days": 0, "free_slots": 0, "blocked_days": 0}
+    return [{**empty, **by_month.get(m, {}), "month": m} for m in months]
+
+
+def rows_queryset(provider_id, kind, first):
+    """Linhas de um mês: horários materializados (kind="slots") ou dias bloqueados."""
+    start, end = month_bounds(first)
+    if kind == "slots":
+        return (
+            TimeSlot.objects
+            .filter(provider_id=provider_id, date__range=(start, end))
+            .order_by("date", "start_time", "id")
+            .values_list("id", "date", "start_time", "end_time", "is_available")
+        )
+    return (
+        DayOff.objects
+        .filter(provider_id=provider_id, date__range=(start, end))
+        .order_by("date")
+        .values_list("date", "reason")
+    )
+
+
+def month_rows(provider_id, kind, first, page=1):
+    """
+    (linhas, há próxima página) de um mês: [[id, "AAAA-MM-DD", "HH:MM",
+    "HH:MM", disponível], ...] ou [["AAAA-MM-DD", motivo], ...]. O OFFSET
+    fica limitado às linhas do mês.
+    """
+    offset = (page - 1) * ROWS_PAGE_SIZE
+    rows = rows_queryset(provider_id, kind, first)[offset:offset + ROWS_PAGE_SIZE + 1]
+    if kind == "slots":
+        rows = [
+            [slot_id, d.isoformat(), st.strftime("%H:%M"), et.strftime("%H:%M"), available]
+            for slot_id, d, st, et, available in rows
+        ]
+    else:
+        rows = [[d.isoformat(), reason] for d, reason in rows]
+    return rows[:ROWS_PAGE_SIZE], len(rows) > ROWS_PAGE_SIZE
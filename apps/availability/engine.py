@@ -0,0 +1,147 @@
+"""
+Cálculo em lote dos horários livres (muitos prestadores × muitos dias).
+
+Lê TimeSlot, DayOff e AvailabilityRule de todos os prestadores do lote com uma
+consulta por tabela (values_list: tuplas, sem instanciar modelos) e trabalha
+com horários em minutos desde a meia-noite:
+
+- o padrão diário de cada regra é montado uma vez e reaproveitado em todos os
+  dias em que ela vale (os dias do intervalo saem por bisect na lista ordenada);
+- livres = horários da regra - horários já materializados + materializados
+  livres, por diferença de conjuntos, descartando os dias bloqueados.
+
+É o cálculo por trás do índice (index.compute_days, refresh_*, rebuild e
+check); a API de horários e os feeds de calendário leem o resultado gravado
+em DayAvailability.
+"""
+from bisect import bisect_left, bisect_right
+
+from .models import AvailabilityRule, DayOff, TimeSlot
+
+
+# "HH:MM" e "HHMM" (chave de regra) de cada minuto do dia
+HHMM = [f"{m // 60:02d}:{m % 60:02d}" for m in range(24 * 60)]
+HHMM_KEY = [hhmm.replace(":", "") for hhmm in HHMM]
+
+
+def minutes(t):
+    return t.hour * 60 + t.minute
+
+
+def _parse_hhmm(value):
+    return int(value[:2]) * 60 + int(value[3:5])
+
+
+def slot_key(provider_id, d, st, et):
+    """Chave virtual de um horário de regra (st/et em minutos); ver rules.parse_slot_key."""
+    return f"{_key_prefix(provider_id, d)}{HHMM_KEY[st]}.{HHMM_KEY[et]}"
+
+
+def _key_prefix(provider_id, d):
+    return f"r{provider_id}.{d:%Y%m%d}."
+
+
+def rule_pattern(windows, slot_minutes, break_minutes):
+    """
+    Horários (início, fim) em minutos de um dia da regra, com a mesma
+    aritmética de generation.build_slot_candidates.
+    """
+    if slot_minutes <= 0:
+        return ()
+    step = slot_minutes + break_minutes
+    pattern = {}
+    for st, et in windows:
+        lo, hi = _parse_hhmm(st), _parse_hhmm(et)
+        for t in range(lo, hi - slot_minutes + 1, step):
+            pattern[(t, t + slot_minutes)] = None
+    return tuple(pattern)
+
+
+def date_filter(dates):
+    """Filtro de data para uma lista ordenada: BETWEEN se for contínua, IN caso contrário."""
+    lo, hi = dates[0], dates[-1]
+    if (hi - lo).days + 1 == len(dates):
+        return {"date__range": (lo, hi)}
+    return {"date__in": dates}
+
+
+def offered(rule_rows, dates):
+    """
+    {(provider_id, date): {(início, fim), ...}} oferecidos pelas regras nos dias
+    (lista ordenada). rule_rows: tuplas (provider_id, start_date, end_date,
+    weekdays, windows, slot_minutes, break_minutes).
+    """
+    result = {}
+    for provider_id, start, end, weekdays, windows, slot_minutes, break_minutes in rule_rows:
+        pattern = rule_pattern(windows, slot_minutes, break_minutes)
+        if not pattern:
+            continue
+        weekdays = set(weekdays)
+        for d in dates[bisect_left(dates, start):bisect_right(dates, end)]:
+            if d.weekday() in weekdays:
+                result.setdefault((provider_id, d), set()).update(pattern)
+    return result
+
+
+def rule_rows(provider_ids, lo, hi):
+    return AvailabilityRule.objects.filter(
+        provider_id__in=provider_ids, start_date__lte=hi, end_date__gte=lo,
+    ).values_list("provider_id", "start_date", "end_date", "weekdays", "windows", "slot_minutes", "break_minutes")
+
+
+def compute(provider_ids, dates):
+    """
+    {(provider_id, date): (is_blocked, free_slots)} para todos os pares
+    prestador × dia, com free_slots no formato do índice:
+    [[id ou chave de regra, "HH:MM", "HH:MM"], ...] em ordem de início.
+    Três consultas, qualquer que seja o tamanho do lote.
+    """
+    provider_ids = sorted(set(provider_ids))
+    dates = sorted(set(dates))
+    if not provider_ids or not dates:
+        return {}
+    by_date = date_filter(dates)
+
+    blocked = set(
+        DayOff.objects.filter(provider_id__in=provider_ids, **by_date).values_list("provider_id", "date")
+    )
+    by_day = offered(rule_rows(provider_ids, dates[0], dates[-1]), dates)
+
+    slots = TimeSlot.objects.filter(provider_id__in=provider_ids, **by_date)
+    if not by_day:
+        slots = slots.filter(is_available=True)
+
+    # (provider_id, date) -> [(início, fim, id ou None), ...]
+    free = {}
+    materialized = {}
+    rows = slots.order_by().values_list("provider_id", "date", "id", "start_time", "end_time", "is_available")
+    for provider_id, d, slot_id, st, et, available in rows:
+        pair = (provider_id, d)
+        st, et = minutes(st), minutes(et)
+        # com regras, os horários já materializados (livres ou não) substituem os da regra
+        materialized.setdefault(pair, set()).add((st, et))
+        if available and pair not in blocked:
+            free.setdefault(pair, []).append((st, et, slot_id))
+
+    for pair, pattern in by_day.items():
+        if pair in blocked:
+            continue
+        free.setdefault(pair, []).extend(
+            (st, et, None) for st, et in pattern.difference(materialized.get(pair, ()))
+        )
+
+    result = {}
+    for provider_id in provider_ids:
+        for d in dates:
+            pair = (provider_id, d)
+            day = free.get(pair)
+            if not day:
+                result[pair] = (pair in blocked, [])
+                continue
+            day.sort(key=lambda s: (s[0], s[1]))
+            prefix = _key_prefix(provider_id, d)
+            result[pair] = (pair in blocked, [
+                [f"{prefix}{HHMM_KEY[st]}.{HHMM_KEY[et]}" if slot_id is None else slot_id, HHMM[st], HHMM[et]]
+                for st, et, slot_id in day
+            ])
+    return result
@@ -72,4 +72,33 @@ class GenerateRecurringSlotsForm(forms.Form):
 
 class DayOffForm(forms.Form):
     date = forms.DateField(label="Data", widget=forms.DateInput(attrs={"type": "date"}))
-    reason = forms.CharField(label="Motivo", required=False, max_length=200)
\ No newline at end of file
+    reason = forms.CharField(label="Motivo", required=False, max_length=200)
+
+
+# maior intervalo aceito no bloqueio/desbloqueio em lote
+MAX_BLOCK_RANGE_DAYS = 366
+
+
+class DayOffRangeForm(forms.Form):
+    start_date = forms.DateField(label="Data início", widget=forms.DateInput(attrs={"type": "date"}))
+    end_date = forms.DateField(label="Data fim", widget=forms.DateInput(attrs={"type": "date"}))
+    # vazio = todos os dias do intervalo
+    weekdays = forms.MultipleChoiceField(
+        label="Dias da semana",
+        choices=WEEKDAYS,
+        required=False,
+        widget=forms.CheckboxSelectMultiple,
+    )
+    reason = forms.CharField(label="Motivo", required=False, max_length=200)
+
+    def clean(self):
+        cleaned = super().clean()
+        start_date, end_date = cleaned.get("start_date"), cleaned.get("end_date")
+
+        if start_date and end_date:
+            if end_date < start_date:
+                raise forms.ValidationError("Data fim deve ser maior ou igual à data início.")
+            if (end_date - start_date).days + 1 > MAX_BLOCK_RANGE_DAYS:
+                raise forms.ValidationError(f"Intervalo máximo é de {MAX_BLOCK_RANGE_DAYS} dias.")
+
+        return cleaned
@@ -0,0 +1,103 @@
+from dataclasses import dataclass
+from datetime import date as date_type, datetime, timedelta
+
+from django.db import transaction
+
+from . import index
+from .models import TimeSlot, DayOff
+
+
+# quantidade de linhas por INSERT no bulk_create (fica abaixo do limite de
+# variáveis do SQLite mesmo com todas as colunas do TimeSlot)
+BULK_BATCH_SIZE = 500
+
+
+@dataclass
+class GenerationResult:
+    created: int = 0
+    skipped_existing: int = 0
+    skipped_blocked_days: int = 0
+
+
+def daterange(start: date_type, end: date_type):
+    cur = start
+    while cur <= end:
+        yield cur
+        cur += timedelta(days=1)
+
+
+def build_slot_candidates(start_date, end_date, weekdays, windows, slot_minutes, break_minutes, blocked=()):
+    """
+    Calcula em memória todos os horários (date, start_time, end_time) do intervalo.
+    Retorna (candidatos, dias ignorados por bloqueio). Candidatos repetidos
+    (janelas sobrepostas) aparecem uma única vez, na ordem em que surgem.
+    """
+    slot_delta = timedelta(minutes=slot_minutes)
+    step_delta = slot_delta + timedelta(minutes=break_minutes)
+
+    candidates = {}
+    skipped_blocked_days = 0
+
+    for d in daterange(start_date, end_date):
+        if d.weekday() not in weekdays:
+            continue
+        if d in blocked:
+            skipped_blocked_days += 1
+            continue
+
+        for (st, et) in windows:
+            cursor = datetime.combine(d, st)
+            end_dt = datetime.combine(d, et)
+
+            while cursor + slot_delta <= end_dt:
+                candidates[(d, cursor.time(), (cursor + slot_delta).time())] = None
+                cursor += step_delta
+
+    return list(candidates), skipped_blocked_days
+
+
+def generate_slots(provider, start_date, end_date, weekdays, windows, slot_minutes, break_minutes,
+                   batch_size=BULK_BATCH_SIZE):
+    """
+    Gera os horários recorrentes do prestador de forma set-based:
+    1 query para os bloqueios, 1 para os horários já existentes no intervalo,
+    e INSERTs em lote (ignore_conflicts) apenas para os que faltam.
+    O índice de disponibilidade do intervalo é atualizado na mesma transação.
+    """
+    result = GenerationResult()
+
+    with transaction.atomic():
+        blocked = set(
+            DayOff.objects.filter(provider=provider, date__range=(start_date, end_date))
+            .values_list("date", flat=True)
+        )
+
+        candidates, result.skipped_blocked_days = build_slot_candidates(
+            start_date, end_date, weekdays, windows, slot_minutes, break_minutes, blocked=blocked,
+        )
+        if not candidates:
+            return result
+
+        range_qs = TimeSlot.objects.filter(provider=provider, date__range=(start_date, end_date))
+        existing = set(range_qs.values_list("date", "start_time", "end_time"))
+
+        missing = [
+            TimeSlot(provider=provider, date=d, start_time=st, end_time=et, is_available=True)
+            for (d, st, et) in candidates
+            if (d, st, et) not in existing
+        ]
+
+        if missing:
+            for i in range(0, len(missing), batch_size):
+                TimeSlot.objects.bulk_create(missing[i:i + batch_size], ignore_conflicts=True)
+
+            # ignore_conflicts não informa quantas linhas entraram de fato
+            # (ex.: outra requisição inseriu o mesmo horário); recontar é exato.
+            result.created = range_qs.count() - len(existing)
+
+        if result.created:
+            index.refresh_range(provider.pk, start_date, end_date)
+
+        result.skipped_existing = len(candidates) - result.created
+
+    return result
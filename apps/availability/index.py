@@ -0,0 +1,248 @@
+"""
+Índice materializado de disponibilidade por (prestador, dia).
+
+Todas as escritas que mudam a disponibilidade (gerar horários, bloquear,
+desbloquear, agendar, cancelar) chamam refresh_days/refresh_range dentro da
+própria transação, então a API de horários responde com uma única consulta
+indexada em DayAvailability, sem cruzar TimeSlot com DayOff.
+
+Os horários das regras de disponibilidade (AvailabilityRule) entram aqui
+calculados em memória, com uma chave virtual no lugar do id (ver rules.py):
+o índice tem uma linha por dia, não por horário. O cálculo é o de
+engine.compute, em lote para vários prestadores.
+"""
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, F, Max, Min, Sum
+from django.utils import timezone
+
+from . import cache, changes, engine
+from .models import AvailabilityRule, TimeSlot, DayOff, DayAvailability
+
+
+# dias por consulta ao reconstruir intervalos longos
+REFRESH_CHUNK_DAYS = 366
+
+# prestadores calculados juntos no rebuild/check
+REBUILD_PROVIDER_BATCH = 100
+
+
+def compute_days(provider_id, dates):
+    """
+    Calcula, a partir das tabelas brutas e das regras,
+    {date: (is_blocked, free_slots)} para os dias informados.
+    """
+    return {d: value for (_pid, d), value in engine.compute([provider_id], dates).items()}
+
+
+def refresh_days(provider_id, dates, stats=None):
+    """Recalcula as linhas do índice para os dias informados de um prestador."""
+    refresh_many([provider_id], dates, stats)
+
+
+def refresh_many(provider_ids, dates, stats=None):
+    """
+    Recalcula as linhas do índice de vários prestadores × dias (consultas em
+    lote). stats: deltas do consolidado do painel ({(provider_id, date):
+    {contador: n}}, ver apps.bookings.analytics) gravados no mesmo upsert dos
+    horários livres; assim cada escrita faz uma chamada só.
+    """
+    dates = sorted(set(dates))
+    if not dates or not provider_ids:
+        return
+
+    # sem savepoint: quem chama já está em uma transação (ou esta é a transação)
+    with transaction.atomic(savepoint=False):
+        # as linhas que faltam entram vazias (equivalem a "sem linha") para que o
+        # lock abaixo cubra também os dias ainda sem índice
+        DayAvailability.objects.bulk_create(
+            [DayAvailability(provider_id=pid, date=d) for pid in provider_ids for d in dates],
+            batch_size=500, ignore_conflicts=True,
+        )
+        # refreshes concorrentes dos mesmos dias rodam em fila, cada um calculando
+        # depois que o anterior gravou: o lock do horário reservado não impede que
+        # duas reservas de horários diferentes do mesmo dia se sobrescrevam aqui
+        existing = {
+            (row.provider_id, row.date): row
+            for row in DayAvailability.objects.select_for_update()
+            .filter(provider_id__in=provider_ids, **engine.date_filter(dates))
+            .order_by("provider_id", "date")
+        }
+        computed = engine.compute(provider_ids, dates)
+
+        now = timezone.now()
+        to_update, versions, diffs = [], [], []
+        for (provider_id, d), (is_blocked, free_slots) in computed.items():
+            row = existing[(provider_id, d)]
+            if row.is_blocked != is_blocked or row.free_slots != free_slots:
+                if row.free_slots != free_slots:
+                    diffs.append((provider_id, d, row.free_slots, free_slots))
+                row.is_blocked = is_blocked
+                row.free_slots = free_slots
+                row.free_count = len(free_slots)
+                # incremento no próprio UPDATE; como a linha está travada desde
+                # a leitura, o valor gravado é o lido + 1
+                versions.append(row.version + 1)
+                row.version = F("version") + 1
+                row.updated_at = now
+                to_update.append(row)
+
+        changed = {}
+        for row in to_update:
+            changed.setdefault(row.provider_id, []).append(row.date)
+        for provider_id, changed_dates in changed.items():
+            cache.invalidate_days(provider_id, changed_dates)
+
+        if to_update:
+            DayAvailability.objects.bulk_update(
+                to_update, ["is_blocked", "free_slots", "free_count", "version", "updated_at"], batch_size=500
+            )
+            for row, version in zip(to_update, versions):
+                row.version = version
+        changes.record(diffs)
+
+        # consolidado do painel do prestador (horários livres e contadores por dia)
+        from apps.bookings import analytics
+        free = {(row.provider_id, row.date): row.free_count for row in to_update}
+        for pair in stats or {}:
+            if pair in computed:
+                free.setdefault(pair, len(computed[pair][1]))
+        analytics.sync(free, stats)
+
+
+def _chunked_ranges(start, end, days=REFRESH_CHUNK_DAYS):
+    cur = start
+    while cur <= end:
+        chunk_end = min(end, cur + timedelta(days=days - 1))
+        yield cur, chunk_end
+        cur = chunk_end + timedelta(days=1)
+
+
+def refresh_range(provider_id, start, end):
+    for lo, hi in _chunked_ranges(start, end):
+        refresh_days(provider_id, [lo + timedelta(days=i) for i in range((hi - lo).days + 1)])
+
+
+def _provider_bounds(provider_ids=None):
+    """{provider_id: (min_date, max_date)} considerando horários, bloqueios, regras e o próprio índice."""
+    bounds = {}
+    sources = (
+        (TimeSlot, "date", "date"),
+        (DayOff, "date", "date"),
+        (AvailabilityRule, "start_date", "end_date"),
+        (DayAvailability, "date", "date"),
+    )
+    for model, lo_field, hi_field in sources:
+        qs = model.objects.all()
+        if provider_ids:
+            qs = qs.filter(provider_id__in=provider_ids)
+        for row in qs.values("provider_id").annotate(lo=Min(lo_field), hi=Max(hi_field)).order_by():
+            lo, hi = bounds.get(row["provider_id"], (row["lo"], row["hi"]))
+            bounds[row["provider_id"]] = (min(lo, row["lo"]), max(hi, row["hi"]))
+    return bounds
+
+
+def _batched_ranges(bounds, start=None, end=None):
+    """
+    (prestadores, dias) em lotes de REBUILD_PROVIDER_BATCH prestadores e
+    REFRESH_CHUNK_DAYS dias, cobrindo a união dos intervalos do lote.
+    """
+    provider_ids = sorted(bounds, key=lambda pid: bounds[pid])
+    for i in range(0, len(provider_ids), REBUILD_PROVIDER_BATCH):
+        batch = provider_ids[i:i + REBUILD_PROVIDER_BATCH]
+        lo = min(bounds[pid][0] for pid in batch)
+        hi = max(bounds[pid][1] for pid in batch)
+        lo, hi = (max(lo, start) if start else lo), (min(hi, end) if end else hi)
+        for chunk_lo, chunk_hi in _chunked_ranges(lo, hi):
+            yield batch, [chunk_lo + timedelta(days=n) for n in range((chunk_hi - chunk_lo).days + 1)]
+
+
+def rebuild(provider_ids=None, start=None, end=None):
+    """Reconstrói o índice; retorna a quantidade de prestadores processados."""
+    bounds = _provider_bounds(provider_ids)
+    for batch, dates in _batched_ranges(bounds, start, end):
+        refresh_many(batch, dates)
+    return len(bounds)
+
+
+def check(provider_ids=None, start=None, end=None):
+    """
+    Compara o índice com as tabelas brutas.
+    Retorna uma lista de (provider_id, date, esperado, armazenado) divergentes.
+    """
+    mismatches = []
+    for batch, dates in _batched_ranges(_provider_bounds(provider_ids), start, end):
+        expected = engine.compute(batch, dates)
+        stored = {
+            (row.provider_id, row.date): (row.is_blocked, row.free_slots)
+            for row in DayAvailability.objects.filter(provider_id__in=batch, **engine.date_filter(dates))
+        }
+        for (provider_id, d), exp in expected.items():
+            got = stored.get((provider_id, d), (False, []))
+            if got != exp:
+                mismatches.append((provider_id, d, exp, got))
+    return mismatches
+
+
+def _stamp_aggregate_args(start, end, provider_id=None):
+    qs = DayAvailability.objects.filter(date__gte=start, date__lte=end)
+    if provider_id:
+        qs = qs.filter(provider_id=provider_id)
+    return qs, {
+        "rows": Count("id"), "total": Sum("version"), "top": Max("version"), "last": Max("updated_at"),
+    }
+
+
+def _stamp(agg):
+    last = agg["last"].timestamp() if agg["last"] else 0
+    etag = f'"{agg["rows"]}-{agg["total"] or 0}-{agg["top"] or 0}-{last}"'
+    return etag, agg["last"]
+
+
+def range_stamp(start, end, provider_id=None):
+    """
+    Carimbo de versão dos dias [start, end] (opcionalmente de um prestador):
+    (etag, last_modified), sem consultar os horários. O ETag junta a
+    quantidade de linhas (dias que entram ou saem), a soma e o máximo das
+    versões (toda mudança em um dia incrementa a da linha, mesmo quando o
+    commit chega fora de ordem) e o updated_at mais recente.
+    """
+    qs, aggregates = _stamp_aggregate_args(start, end, provider_id)
+    return _stamp(qs.aggregate(**aggregates))
+
+
+async def arange_stamp(start, end, provider_id=None):
+    qs, aggregates = _stamp_aggregate_args(start, end, provider_id)
+    return _stamp(await qs.aaggregate(**aggregates))
+
+
+def day_queryset(d, provider_id=None):
+    qs = DayAvailability.objects.filter(date=d, free_count__gt=0)
+    if provider_id:
+        qs = qs.filter(provider_id=provider_id)
+    return qs.values_list("provider_id", "provider__username", "free_slots")
+
+
+def _slot_results(rows):
+    results = []
+    for pid, username, free_slots in rows:
+        for slot_id, st, et in free_slots:
+            results.append({
+                "id": slot_id,
+                "start_time": st,
+                "end_time": et,
+                "provider_id": pid,
+                "provider_name": username,
+            })
+    results.sort(key=lambda r: r["start_time"])
+    return results
+
+
+def free_slots_for_date(d, provider_id=None):
+    """Horários livres do dia no formato de available_slots_api (uma consulta)."""
+    return _slot_results(day_queryset(d, provider_id))
+
+
+async def afree_slots_for_date(d, provider_id=None):
+    return _slot_results([row async for row in day_queryset(d, provider_id)])
@@ -0,0 +1,149 @@
+import json
+import random
+import time
+from datetime import date as date_type, time as time_type, timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from apps.availability import engine, index
+from apps.availability.generation import build_slot_candidates, daterange
+from apps.availability.models import AvailabilityRule, DayOff, TimeSlot
+from apps.availability.views import _calendar_events
+
+
+def _legacy_compute_days(provider_id, dates):
+    """Cálculo anterior (um prestador por vez, horários como time), mantido só para comparação."""
+    dates = sorted(set(dates))
+    blocked = set(DayOff.objects.filter(provider_id=provider_id, date__in=dates).values_list("date", flat=True))
+
+    offered = {}
+    for rule in AvailabilityRule.objects.filter(provider_id=provider_id, start_date__lte=dates[-1],
+                                                end_date__gte=dates[0]):
+        windows = [(time_type.fromisoformat(st), time_type.fromisoformat(et)) for st, et in rule.windows]
+        candidates, _ = build_slot_candidates(
+            max(dates[0], rule.start_date), min(dates[-1], rule.end_date), set(rule.weekdays), windows,
+            rule.slot_minutes, rule.break_minutes,
+        )
+        for d, st, et in candidates:
+            offered.setdefault(d, set()).add((st, et))
+
+    free = {d: [] for d in dates}
+    materialized = set()
+    for d, slot_id, st, et, available in (
+        TimeSlot.objects.filter(provider_id=provider_id, date__in=dates)
+        .order_by("date", "start_time").values_list("date", "id", "start_time", "end_time", "is_available")
+    ):
+        materialized.add((d, st, et))
+        if available and d not in blocked:
+            free[d].append([slot_id, st.strftime("%H:%M"), et.strftime("%H:%M")])
+    for d, pairs in offered.items():
+        if d in blocked:
+            continue
+        free[d].extend(
+            [engine.slot_key(provider_id, d, engine.minutes(st), engine.minutes(et)),
+             st.strftime("%H:%M"), et.strftime("%H:%M")]
+            for st, et in pairs if (d, st, et) not in materialized
+        )
+        free[d].sort(key=lambda s: (s[1], s[2]))
+    return {(provider_id, d): (d in blocked, free[d]) for d in dates}
+
+
+class Command(BaseCommand):
+    help = (
+        "Mede o cálculo de horários livres em lote (engine.compute) contra o cálculo por prestador, "
+        "além do rebuild do índice, da API do dia e do feed de calendário, com N prestadores × D dias "
+        "de regras, reservas e bloqueios sintéticos. Tudo é desfeito ao final."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--providers", type=int, default=100)
+        parser.add_argument("--days", type=int, default=90)
+        parser.add_argument("--slot-minutes", type=int, default=30)
+        parser.add_argument("--booked-ratio", type=float, default=0.1,
+                            help="Fração dos horários materializados como reservados.")
+        parser.add_argument("--dayoff-ratio", type=float, default=0.05)
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--output", help="Grava os resultados em JSON neste arquivo.")
+
+    def handle(self, *args, **opts):
+        with transaction.atomic():
+            provider_ids, dates = self._seed(opts)
+            results = self._measure(provider_ids, dates)
+            transaction.set_rollback(True)
+
+        self.stdout.write(f"{opts['providers']} prestadores × {opts['days']} dias")
+        self.stdout.write(f"{'etapa':<34}{'ms':>12}")
+        for name, ms in results["timings"].items():
+            self.stdout.write(f"{name:<34}{ms:>12.1f}")
+        speedup = results["timings"]["cálculo por prestador"] / results["timings"]["cálculo em lote (engine)"]
+        self.stdout.write(self.style.SUCCESS(
+            f"lote {speedup:.1f}x mais rápido; {results['free_slots']} horários livres, resultados idênticos."
+        ))
+
+        if opts["output"]:
+            with open(opts["output"], "w") as fh:
+                json.dump({"providers": opts["providers"], "days": opts["days"], **results}, fh, indent=2)
+
+    def _seed(self, opts):
+        rng = random.Random(opts["seed"])
+        User = get_user_model()
+        prefix = f"bench-engine-{time.monotonic_ns()}"
+        User.objects.bulk_create([
+            User(username=f"{prefix}-{i}", is_staff=True) for i in range(opts["providers"])
+        ])
+        provider_ids = list(User.objects.filter(username__startswith=prefix).values_list("pk", flat=True))
+
+        start = date_type.today() + timedelta(days=1)
+        end = start + timedelta(days=opts["days"] - 1)
+        windows = [(time_type(8, 0), time_type(12, 0)), (time_type(13, 0), time_type(18, 0))]
+
+        AvailabilityRule.objects.bulk_create([
+            AvailabilityRule(
+                provider_id=pid, start_date=start, end_date=end, weekdays=[0, 1, 2, 3, 4, 5],
+                windows=[[st.isoformat("minutes"), et.isoformat("minutes")] for st, et in windows],
+                slot_minutes=opts["slot_minutes"], break_minutes=0,
+            )
+            for pid in provider_ids
+        ])
+
+        candidates, _ = build_slot_candidates(start, end, {0, 1, 2, 3, 4, 5}, windows, opts["slot_minutes"], 0)
+        booked, dayoffs = [], []
+        for pid in provider_ids:
+            booked.extend(
+                TimeSlot(provider_id=pid, date=d, start_time=st, end_time=et, is_available=False)
+                for d, st, et in candidates if rng.random() < opts["booked_ratio"]
+            )
+            dayoffs.extend(
+                DayOff(provider_id=pid, date=d) for d in daterange(start, end) if rng.random() < opts["dayoff_ratio"]
+            )
+        TimeSlot.objects.bulk_create(booked, batch_size=500)
+        DayOff.objects.bulk_create(dayoffs, batch_size=500)
+        return provider_ids, list(daterange(start, end))
+
+    def _timed(self, fn):
+        t0 = time.perf_counter()
+        value = fn()
+        return value, (time.perf_counter() - t0) * 1000
+
+    def _measure(self, provider_ids, dates):
+        timings = {}
+
+        legacy, timings["cálculo por prestador"] = self._timed(
+            lambda: {k: v for pid in provider_ids for k, v in _legacy_compute_days(pid, dates).items()}
+        )
+        batched, timings["cálculo em lote (engine)"] = self._timed(lambda: engine.compute(provider_ids, dates))
+        if legacy != batched:
+            raise AssertionError("engine.compute diverge do cálculo por prestador.")
+
+        _, timings["rebuild do índice"] = self._timed(lambda: index.rebuild(provider_ids))
+
+        day_ms = [self._timed(lambda d=d: index.free_slots_for_date(d))[1] for d in dates[:30]]
+        timings["API do dia, todos (média)"] = sum(day_ms) / len(day_ms)
+        _, timings["feed de calendário (42 dias)"] = self._timed(
+            lambda: _calendar_events(dates[0], dates[0] + timedelta(days=41))
+        )
+
+        free_slots = sum(len(free) for _blocked, free in batched.values())
+        return {"timings": timings, "free_slots": free_slots}
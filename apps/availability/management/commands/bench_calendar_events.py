@@ -0,0 +1,62 @@
+import time
+import tracemalloc
+from datetime import date as date_type, time as time_type, timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import RequestFactory, override_settings
+
+from apps.availability.generation import generate_slots
+from apps.availability.views import calendar_events_api, calendar_events_stream_api
+
+
+class Command(BaseCommand):
+    help = "Compara memória de pico e tempo até o primeiro byte do feed de calendário (lista x streaming)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--providers", type=int, default=5)
+        parser.add_argument("--days", type=int, default=365)
+        parser.add_argument("--slot-minutes", type=int, default=15)
+
+    def handle(self, *args, **opts):
+        User = get_user_model()
+        start = date_type.today() + timedelta(days=1)
+        end = start + timedelta(days=opts["days"] - 1)
+
+        with transaction.atomic():
+            # dados descartáveis: tudo é desfeito ao final
+            providers = [
+                User.objects.create(username=f"bench-cal-{i}-{time.monotonic_ns()}", is_staff=True)
+                for i in range(opts["providers"])
+            ]
+            for p in providers:
+                generate_slots(p, start, end, set(range(7)), [(time_type(8, 0), time_type(20, 0))],
+                               opts["slot_minutes"], 0)
+
+            request = RequestFactory().get("/", {"start": str(start), "end": str(end)})
+            request.user = providers[0]
+
+            self.stdout.write(f"{'modo':<12}{'bytes':>12}{'1º byte (s)':>14}{'total (s)':>12}{'pico (MiB)':>12}")
+            self._measure("lista", calendar_events_api, request)
+            with override_settings(CALENDAR_EVENTS_MAX_RANGE_DAYS=opts["days"]):
+                self._measure("streaming", calendar_events_stream_api, request)
+
+            transaction.set_rollback(True)
+
+    def _measure(self, label, view, request):
+        tracemalloc.start()
+        t0 = time.perf_counter()
+        response = view(request)
+
+        size, ttfb = 0, None
+        chunks = response.streaming_content if response.streaming else [response.content]
+        for chunk in chunks:
+            if ttfb is None:
+                ttfb = time.perf_counter() - t0
+            size += len(chunk)
+        total = time.perf_counter() - t0
+
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        self.stdout.write(f"{label:<12}{size:>12}{ttfb:>14.3f}{total:>12.3f}{peak / 2**20:>12.1f}")
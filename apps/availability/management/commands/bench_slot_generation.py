@@ -0,0 +1,86 @@
+import time
+from datetime import date as date_type, datetime, time as time_type, timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from apps.availability import rules
+from apps.availability.generation import daterange, generate_slots
+from apps.availability.models import TimeSlot
+
+
+RANGES = {
+    "month": 30,
+    "quarter": 91,
+    "year": 365,
+}
+
+
+def _legacy_generate(provider, start_date, end_date, weekdays, windows, slot_minutes, break_minutes):
+    """Implementação anterior (1 get_or_create por horário), mantida só para comparação."""
+    created = 0
+    for d in daterange(start_date, end_date):
+        if d.weekday() not in weekdays:
+            continue
+        for (st, et) in windows:
+            cursor = datetime.combine(d, st)
+            end_dt = datetime.combine(d, et)
+            while cursor + timedelta(minutes=slot_minutes) <= end_dt:
+                slot_end = cursor + timedelta(minutes=slot_minutes)
+                _, was_created = TimeSlot.objects.get_or_create(
+                    provider=provider,
+                    date=d,
+                    start_time=cursor.time(),
+                    end_time=slot_end.time(),
+                    defaults={"is_available": True},
+                )
+                if was_created:
+                    created += 1
+                cursor = slot_end + timedelta(minutes=break_minutes)
+    return created
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara a geração de horários antiga (get_or_create), a geração em lote e a regra "
+        "de disponibilidade (sem TimeSlot; só o índice) para mês, trimestre e ano."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--slot-minutes", type=int, default=15)
+        parser.add_argument("--break-minutes", type=int, default=0)
+        parser.add_argument("--ranges", nargs="+", choices=list(RANGES), default=list(RANGES))
+        parser.add_argument("--skip-legacy", action="store_true", help="Mede apenas a geração em lote.")
+
+    def handle(self, *args, **opts):
+        weekdays = set(range(7))
+        windows = [(time_type(8, 0), time_type(20, 0))]
+        start_date = date_type.today() + timedelta(days=1)
+
+        self.stdout.write(f"{'intervalo':<10}{'horários':>10}{'antigo (s)':>14}{'lote (s)':>12}{'ganho':>10}{'regra (s)':>12}")
+
+        for name in opts["ranges"]:
+            end_date = start_date + timedelta(days=RANGES[name] - 1)
+            args = (start_date, end_date, weekdays, windows, opts["slot_minutes"], opts["break_minutes"])
+
+            legacy_s = None
+            if not opts["skip_legacy"]:
+                legacy_s, _ = self._run(_legacy_generate, *args)
+            bulk_s, created = self._run(lambda *a: generate_slots(*a).created, *args)
+            rule_s, _ = self._run(lambda *a: rules.create_rule(*a)[1].created, *args)
+
+            speedup = f"{legacy_s / bulk_s:.1f}x" if legacy_s else "-"
+            legacy_col = f"{legacy_s:.3f}" if legacy_s is not None else "-"
+            self.stdout.write(f"{name:<10}{created:>10}{legacy_col:>14}{bulk_s:>12.3f}{speedup:>10}{rule_s:>12.3f}")
+
+    def _run(self, fn, *args):
+        """Executa fn com um prestador descartável e desfaz tudo ao final."""
+        User = get_user_model()
+        with transaction.atomic():
+            provider = User.objects.create(username=f"bench-provider-{time.monotonic_ns()}", is_staff=True)
+            t0 = time.perf_counter()
+            created = fn(provider, *args)
+            elapsed = time.perf_counter() - t0
+            transaction.set_rollback(True)
+        return elapsed, created
@@ -0,0 +1,128 @@
+import http.client
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date as date_type, timedelta
+from urllib.parse import urlsplit
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    k = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[k]
+
+
+class Command(BaseCommand):
+    help = (
+        "Teste de carga das APIs de disponibilidade contra servidores já em execução "
+        "(ex.: gunicorn WSGI x ASGI). Mede requisições/s e latências p50/p95/p99."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--target", action="append", required=True, metavar="NOME=URL",
+            help="Ex.: --target wsgi=http://127.0.0.1:8000 --target asgi=http://127.0.0.1:8001",
+        )
+        parser.add_argument("--username", required=True, help="Usuário usado para autenticar as requisições.")
+        parser.add_argument("--concurrency", type=int, default=100)
+        parser.add_argument("--requests", type=int, default=2000, help="Requisições por caminho e alvo.")
+        parser.add_argument("--path", action="append", dest="paths",
+                            help="Caminho a testar (padrão: API de horários e feed do calendário).")
+        parser.add_argument("--output", help="Grava os resultados em JSON neste arquivo.")
+
+    def handle(self, *args, **opts):
+        user = get_user_model().objects.filter(username=opts["username"]).first()
+        if user is None:
+            raise CommandError(f"Usuário '{opts['username']}' não existe.")
+
+        # sessão real no banco compartilhado pelos servidores testados
+        client = Client()
+        client.force_login(user)
+        cookie = f"sessionid={client.cookies['sessionid'].value}"
+
+        today = date_type.today()
+        paths = opts["paths"] or [
+            f"/availability/api/slots/?date={today}",
+            f"/availability/api/calendar-events/stream/?start={today}&end={today + timedelta(days=41)}",
+        ]
+
+        results = []
+        self.stdout.write(f"{'alvo':<8}{'caminho':<50}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'erros':>8}")
+        for target in opts["target"]:
+            name, _, base_url = target.partition("=")
+            if not base_url:
+                raise CommandError(f"Alvo inválido: {target} (use NOME=URL)")
+            for path in paths:
+                row = self._run(base_url, path, cookie, opts["concurrency"], opts["requests"])
+                row.update(target=name, path=path)
+                results.append(row)
+                self.stdout.write(
+                    f"{name:<8}{path[:48]:<50}{row['rps']:>10.1f}{row['p50_ms']:>10.1f}"
+                    f"{row['p95_ms']:>10.1f}{row['p99_ms']:>10.1f}{row['errors']:>8}"
+                )
+
+        if opts["output"]:
+            with open(opts["output"], "w") as fh:
+                json.dump(results, fh, indent=2)
+
+    def _run(self, base_url, path, cookie, concurrency, total):
+        url = urlsplit(base_url)
+        conn_class = http.client.HTTPSConnection if url.scheme == "https" else http.client.HTTPConnection
+        headers = {"Cookie": cookie, "Accept": "application/json", "Host": url.netloc}
+
+        remaining = [total]
+        lock = threading.Lock()
+        latencies, errors = [], [0]
+
+        def worker():
+            conn = conn_class(url.hostname, url.port, timeout=30)
+            local = []
+            while True:
+                with lock:
+                    if remaining[0] <= 0:
+                        break
+                    remaining[0] -= 1
+                t0 = time.perf_counter()
+                try:
+                    conn.request("GET", path, headers=headers)
+                    response = conn.getresponse()
+                    response.read()
+                    ok = response.status == 200
+                except (OSError, http.client.HTTPException):
+                    ok = False
+                    conn.close()
+                    conn = conn_class(url.hostname, url.port, timeout=30)
+                elapsed = time.perf_counter() - t0
+                if ok:
+                    local.append(elapsed)
+                else:
+                    with lock:
+                        errors[0] += 1
+            conn.close()
+            with lock:
+                latencies.extend(local)
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            for _ in range(concurrency):
+                pool.submit(worker)
+        wall = time.perf_counter() - started
+
+        to_ms = lambda v: v * 1000 if v is not None else float("nan")  # noqa: E731
+        return {
+            "requests": total,
+            "errors": errors[0],
+            "concurrency": concurrency,
+            "seconds": round(wall, 3),
+            "rps": len(latencies) / wall if wall else 0.0,
+            "p50_ms": to_ms(percentile(latencies, 50)),
+            "p95_ms": to_ms(percentile(latencies, 95)),
+            "p99_ms": to_ms(percentile(latencies, 99)),
+        }
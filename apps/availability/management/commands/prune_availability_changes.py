@@ -0,0 +1,20 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.availability import changes
+
+
+class Command(BaseCommand):
+    help = (
+        "Apaga do registro de mudanças da disponibilidade (feed ?since= do calendário) "
+        "as entradas mais antigas que a retenção. Clientes com cursor anterior recebem 410 e recarregam."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--retention-days", type=int, default=settings.AVAILABILITY_CHANGES_RETENTION_DAYS)
+
+    def handle(self, *args, **opts):
+        if opts["retention_days"] < 0:
+            raise CommandError("--retention-days não pode ser negativo.")
+        deleted = changes.prune(opts["retention_days"])
+        self.stdout.write(self.style.SUCCESS(f"{deleted} mudança(s) removida(s)."))
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from apps.availability import index
+
+
+class Command(BaseCommand):
+    help = "Reconstrói (ou verifica, com --check) o índice de disponibilidade por prestador/dia."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--provider", type=int, action="append", dest="providers",
+                            help="Restringe a um prestador (pode repetir).")
+        parser.add_argument("--start", help="Data inicial (YYYY-MM-DD).")
+        parser.add_argument("--end", help="Data final (YYYY-MM-DD).")
+        parser.add_argument("--check", action="store_true",
+                            help="Apenas compara o índice com as tabelas brutas; falha se divergir.")
+
+    def handle(self, *args, **opts):
+        start = parse_date(opts["start"]) if opts["start"] else None
+        end = parse_date(opts["end"]) if opts["end"] else None
+
+        if opts["check"]:
+            mismatches = index.check(opts["providers"], start, end)
+            for provider_id, d, expected, stored in mismatches[:50]:
+                self.stdout.write(f"prestador={provider_id} data={d} esperado={expected} armazenado={stored}")
+            if mismatches:
+                raise CommandError(f"{len(mismatches)} dia(s) divergente(s) no índice.")
+            self.stdout.write(self.style.SUCCESS("Índice consistente."))
+            return
+
+        total = index.rebuild(opts["providers"], start, end)
+        self.stdout.write(self.style.SUCCESS(f"Índice reconstruído para {total} prestador(es)."))
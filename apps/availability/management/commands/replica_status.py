@@ -0,0 +1,41 @@
+import sqlite3
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from config.db_router import REPLICA_ALIAS, replica_configured, replica_lag
+
+
+class Command(BaseCommand):
+    help = (
+        "Mostra o atraso da réplica de leitura e se as views a usariam. Com --sync, copia o "
+        "primário SQLite para a réplica SQLite (para testar o roteamento localmente)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sync", action="store_true", help="Copia o banco primário para a réplica (só SQLite).")
+
+    def handle(self, *args, **opts):
+        if not replica_configured():
+            raise CommandError("Nenhuma réplica configurada (DATABASE_REPLICA_URL ou SQLITE_REPLICA_PATH).")
+
+        if opts["sync"]:
+            primary, replica = connections["default"], connections[REPLICA_ALIAS]
+            if primary.vendor != "sqlite" or replica.vendor != "sqlite":
+                raise CommandError("--sync só funciona com primário e réplica em SQLite.")
+            replica.close()
+            with sqlite3.connect(primary.settings_dict["NAME"]) as src, \
+                    sqlite3.connect(replica.settings_dict["NAME"]) as dst:
+                src.backup(dst)
+            self.stdout.write(f"Réplica sincronizada: {replica.settings_dict['NAME']}")
+
+        lag = replica_lag()
+        if lag is None:
+            self.stdout.write(self.style.ERROR("Réplica indisponível: leituras vão para o primário."))
+        elif lag > settings.REPLICA_MAX_LAG_SECONDS:
+            self.stdout.write(self.style.WARNING(
+                f"Atraso de {lag:.1f}s (limite {settings.REPLICA_MAX_LAG_SECONDS}s): leituras vão para o primário."
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Atraso de {lag:.1f}s: leituras vão para a réplica."))
@@ -0,0 +1,64 @@
+# Generated by Django 5.1.1 on 2026-10-18 19:47
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def populate_index(apps, schema_editor):
+    """Preenche o índice com os dados já existentes (mesma regra de apps.availability.index)."""
+    TimeSlot = apps.get_model("availability", "TimeSlot")
+    DayOff = apps.get_model("availability", "DayOff")
+    DayAvailability = apps.get_model("availability", "DayAvailability")
+
+    days = {}
+    for provider_id, d in DayOff.objects.values_list("provider_id", "date"):
+        days[(provider_id, d)] = (True, [])
+
+    slots = (
+        TimeSlot.objects.filter(is_available=True)
+        .order_by("provider_id", "date", "start_time")
+        .values_list("provider_id", "date", "id", "start_time", "end_time")
+    )
+    for provider_id, d, slot_id, st, et in slots.iterator(chunk_size=2000):
+        is_blocked, free = days.setdefault((provider_id, d), (False, []))
+        if not is_blocked:
+            free.append([slot_id, st.strftime("%H:%M"), et.strftime("%H:%M")])
+
+    DayAvailability.objects.bulk_create(
+        [
+            DayAvailability(provider_id=provider_id, date=d, is_blocked=is_blocked,
+                            free_slots=free, free_count=len(free))
+            for (provider_id, d), (is_blocked, free) in days.items()
+        ],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('availability', '0003_alter_timeslot_options_dayoff'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DayAvailability',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Data')),
+                ('is_blocked', models.BooleanField(default=False, verbose_name='Bloqueado')),
+                ('free_slots', models.JSONField(default=list, verbose_name='Horários livres')),
+                ('free_count', models.PositiveIntegerField(default=0, verbose_name='Qtd. livres')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('provider', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Prestador')),
+            ],
+            options={
+                'ordering': ['date', 'provider'],
+                'indexes': [models.Index(fields=['date', 'free_count'], name='idx_dayavailability_date_free')],
+                'constraints': [models.UniqueConstraint(fields=('provider', 'date'), name='uniq_dayavailability_provider_date')],
+            },
+        ),
+        migrations.RunPython(populate_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.1 on 2026-10-18 19:48
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('availability', '0004_dayavailability'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='dayoff',
+            index=models.Index(fields=['date'], name='idx_dayoff_date'),
+        ),
+        migrations.AddIndex(
+            model_name='timeslot',
+            index=models.Index(condition=models.Q(('is_available', True)), fields=['date', 'provider', 'start_time'], name='idx_timeslot_available'),
+        ),
+    ]
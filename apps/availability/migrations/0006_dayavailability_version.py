@@ -0,0 +1,18 @@
+# Generated by Django 5.1.1 on 2026-10-18 19:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('availability', '0005_hot_lookup_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dayavailability',
+            name='version',
+            field=models.PositiveIntegerField(default=1, verbose_name='Versão'),
+        ),
+    ]
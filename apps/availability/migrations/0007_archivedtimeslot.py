@@ -0,0 +1,33 @@
+# Generated by Django 5.1.1 on 2026-10-18 20:05
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('availability', '0006_dayavailability_version'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedTimeSlot',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('date', models.DateField(verbose_name='Data')),
+                ('start_time', models.TimeField(verbose_name='Horário Início')),
+                ('end_time', models.TimeField(verbose_name='Horário Fim')),
+                ('is_available', models.BooleanField(verbose_name='Disponível')),
+                ('created_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True, verbose_name='Arquivado em')),
+                ('provider', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Prestador')),
+            ],
+            options={
+                'ordering': ['date', 'start_time'],
+                'indexes': [models.Index(fields=['provider', 'date'], name='idx_archivedslot_provider_date')],
+            },
+        ),
+    ]
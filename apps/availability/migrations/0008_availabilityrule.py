@@ -0,0 +1,34 @@
+# Generated by Django 5.1.1 on 2026-10-18 20:15
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('availability', '0007_archivedtimeslot'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AvailabilityRule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start_date', models.DateField(verbose_name='Data inicial')),
+                ('end_date', models.DateField(verbose_name='Data final')),
+                ('weekdays', models.JSONField(default=list, verbose_name='Dias da semana')),
+                ('windows', models.JSONField(default=list, verbose_name='Janelas')),
+                ('slot_minutes', models.PositiveIntegerField(verbose_name='Duração (min)')),
+                ('break_minutes', models.PositiveIntegerField(default=0, verbose_name='Intervalo (min)')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('provider', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='availability_rules', to=settings.AUTH_USER_MODEL, verbose_name='Prestador')),
+            ],
+            options={
+                'ordering': ['start_date', 'id'],
+                'indexes': [models.Index(fields=['provider', 'end_date'], name='idx_rule_provider_end')],
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.1.1 on 2026-10-18 20:23
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('availability', '0008_availabilityrule'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AvailabilityChange',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('date', models.DateField(verbose_name='Data')),
+                ('added', models.JSONField(default=list, verbose_name='Adicionados')),
+                ('changed', models.JSONField(default=list, verbose_name='Alterados')),
+                ('removed', models.JSONField(default=list, verbose_name='Removidos')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('provider', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Prestador')),
+            ],
+            options={
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['created_at'], name='idx_availchange_created')],
+            },
+        ),
+    ]
@@ -17,6 +17,14 @@ class TimeSlot(models.Model):
                 name="uniq_timeslot_provider_date_start_end",
             )
         ]
+        indexes = [
+            # consultas por dia/intervalo de horários livres (API de horários e calendário)
+            models.Index(
+                fields=["date", "provider", "start_time"],
+                condition=models.Q(is_available=True),
+                name="idx_timeslot_available",
+            ),
+        ]
 
     def __str__(self):
         return f"{self.date} - {self.start_time} às {self.end_time}"
@@ -36,6 +44,129 @@ class DayOff(models.Model):
                 name="uniq_dayoff_provider_date",
             )
         ]
+        indexes = [
+            models.Index(fields=["date"], name="idx_dayoff_date"),
+        ]
+
+    def __str__(self):
+        return f"{self.date} ({self.provider})"
+
+
+class AvailabilityRule(models.Model):
+    """
+    Disponibilidade recorrente do prestador (mesmos campos do formulário de
+    geração). Os horários livres são calculados a partir da regra no índice de
+    disponibilidade; um TimeSlot só é criado quando alguém reserva o horário
+    (apps.availability.rules.materialize).
+    """
+    provider = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="availability_rules",
+        verbose_name="Prestador",
+    )
+    start_date = models.DateField("Data inicial")
+    end_date = models.DateField("Data final")
+    # dias da semana (0=Seg ... 6=Dom)
+    weekdays = models.JSONField("Dias da semana", default=list)
+    # [["HH:MM", "HH:MM"], ...]
+    windows = models.JSONField("Janelas", default=list)
+    slot_minutes = models.PositiveIntegerField("Duração (min)")
+    break_minutes = models.PositiveIntegerField("Intervalo (min)", default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["start_date", "id"]
+        indexes = [
+            models.Index(fields=["provider", "end_date"], name="idx_rule_provider_end"),
+        ]
+
+    def __str__(self):
+        return f"{self.start_date} a {self.end_date} ({self.provider})"
+
+
+class DayAvailability(models.Model):
+    """
+    Resumo materializado dos horários livres de um prestador em um dia.
+    Mantido por apps.availability.index.refresh_days a cada escrita em
+    TimeSlot/DayOff/Booking; pode ser reconstruído com
+    `manage.py rebuild_availability_index`.
+    """
+    provider = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="+", verbose_name="Prestador"
+    )
+    date = models.DateField("Data")
+    is_blocked = models.BooleanField("Bloqueado", default=False)
+    # [[id, "HH:MM", "HH:MM"], ...] em ordem de início
+    free_slots = models.JSONField("Horários livres", default=list)
+    free_count = models.PositiveIntegerField("Qtd. livres", default=0)
+    # incrementada a cada mudança; base do ETag das APIs de disponibilidade
+    version = models.PositiveIntegerField("Versão", default=1)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["date", "provider"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["provider", "date"],
+                name="uniq_dayavailability_provider_date",
+            )
+        ]
+        indexes = [
+            models.Index(fields=["date", "free_count"], name="idx_dayavailability_date_free"),
+        ]
+
+    def __str__(self):
+        return f"{self.date} ({self.provider_id}): {self.free_count} livre(s)"
+
+
+class AvailabilityChange(models.Model):
+    """
+    Diferença de horários livres de um (prestador, dia) gravada por
+    index.refresh_many a cada mudança no índice. O id é o cursor do modo
+    ?since= do feed de calendário (apps.availability.changes).
+    """
+    id = models.BigAutoField(primary_key=True)
+    provider = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="+", verbose_name="Prestador"
+    )
+    date = models.DateField("Data")
+    # [[id, "HH:MM", "HH:MM"], ...] no formato de DayAvailability.free_slots
+    added = models.JSONField("Adicionados", default=list)
+    changed = models.JSONField("Alterados", default=list)
+    # [id, ...]
+    removed = models.JSONField("Removidos", default=list)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["id"]
+        indexes = [
+            models.Index(fields=["created_at"], name="idx_availchange_created"),
+        ]
+
+    def __str__(self):
+        return f"#{self.id} {self.date} ({self.provider_id})"
+
+
+class ArchivedTimeSlot(models.Model):
+    """
+    Horário passado e nunca reservado, movido de TimeSlot pelo
+    `manage.py archive_old_rows` (mesmo id do original).
+    """
+    id = models.BigIntegerField(primary_key=True)
+    provider = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="+", verbose_name="Prestador"
+    )
+    date = models.DateField("Data")
+    start_time = models.TimeField("Horário Início")
+    end_time = models.TimeField("Horário Fim")
+    is_available = models.BooleanField("Disponível")
+    created_at = models.DateTimeField()
+    archived_at = models.DateTimeField("Arquivado em", auto_now_add=True)
+
+    class Meta:
+        ordering = ["date", "start_time"]
+        indexes = [
+            models.Index(fields=["provider", "date"], name="idx_archivedslot_provider_date"),
+        ]
 
     def __str__(self):
-        return f"{self.date} ({self.provider})"
\ No newline at end of file
+        return f"{self.date} - {self.start_time} às {self.end_time} (arquivado)"
@@ -0,0 +1,180 @@
+"""
+Disponibilidade por regra (AvailabilityRule).
+
+Os horários de uma regra não existem como linhas de TimeSlot: o índice
+(engine.compute) os calcula em memória a partir do padrão diário da regra e os
+publica com uma chave virtual "r<prestador>.<AAAAMMDD>.<HHMM>.<HHMM>" no
+lugar do id. Ao reservar, materialize()/materialize_many() validam a chave
+contra as regras e os bloqueios e criam (ou reaproveitam) o TimeSlot dentro
+da transação da reserva; a partir daí o horário segue o fluxo normal.
+"""
+import re
+from datetime import datetime
+
+from django.db import transaction
+from django.db.models import Q
+
+from . import engine, index
+from .generation import GenerationResult, daterange
+from .models import AvailabilityRule, DayOff, TimeSlot
+
+
+SLOT_KEY_RE = re.compile(r"r(\d+)\.(\d{8})\.(\d{4})\.(\d{4})")
+
+
+class SlotNotOffered(Exception):
+    """A chave não corresponde a um horário livre oferecido por uma regra."""
+
+
+def parse_slot_key(key):
+    """(provider_id, date, start_time, end_time) da chave, ou None se for inválida."""
+    m = SLOT_KEY_RE.fullmatch(key) if isinstance(key, str) else None
+    if m is None:
+        return None
+    try:
+        return (
+            int(m[1]),
+            datetime.strptime(m[2], "%Y%m%d").date(),
+            datetime.strptime(m[3], "%H%M").time(),
+            datetime.strptime(m[4], "%H%M").time(),
+        )
+    except ValueError:
+        return None
+
+
+def rules_for(provider_id, start, end):
+    return AvailabilityRule.objects.filter(provider_id=provider_id, start_date__lte=end, end_date__gte=start)
+
+
+def rule_slots(provider_id, dates):
+    """
+    {date: {(início, fim), ...}} em minutos, oferecidos pelas regras do
+    prestador nos dias informados (uma consulta; não desconta bloqueios nem reservas).
+    """
+    dates = sorted(set(dates))
+    if not dates:
+        return {}
+    by_day = engine.offered(engine.rule_rows([provider_id], dates[0], dates[-1]), dates)
+    return {d: pattern for (_pid, d), pattern in by_day.items()}
+
+
+def create_rule(provider, start_date, end_date, weekdays, windows, slot_minutes, break_minutes):
+    """
+    Grava a regra e atualiza o índice do intervalo; nenhum TimeSlot é criado.
+    Retorna (regra, GenerationResult) com created = horários oferecidos.
+    """
+    with transaction.atomic():
+        rule = AvailabilityRule.objects.create(
+            provider=provider,
+            start_date=start_date,
+            end_date=end_date,
+            weekdays=sorted(weekdays),
+            windows=[[st.isoformat("minutes"), et.isoformat("minutes")] for st, et in windows],
+            slot_minutes=slot_minutes,
+            break_minutes=break_minutes,
+        )
+        blocked = set(
+            DayOff.objects.filter(provider=provider, date__range=(start_date, end_date))
+            .values_list("date", flat=True)
+        )
+        index.refresh_range(provider.pk, start_date, end_date)
+
+    days = [d for d in daterange(start_date, end_date) if d.weekday() in rule.weekdays]
+    skipped_blocked_days = sum(1 for d in days if d in blocked)
+    per_day = len(engine.rule_pattern(rule.windows, slot_minutes, break_minutes))
+    offered = per_day * (len(days) - skipped_blocked_days)
+
+    return rule, GenerationResult(created=offered, skipped_blocked_days=skipped_blocked_days)
+
+
+def delete_rule(rule):
+    """
+    Remove a regra. Os TimeSlots que ela materializou e que estão livres (reserva
+    cancelada) deixam de ser oferecidos, salvo se outra regra oferecer o mesmo
+    horário; os que têm reserva ativa continuam como estão.
+    """
+    dates = list(daterange(rule.start_date, rule.end_date))
+    own = engine.offered([(
+        rule.provider_id, rule.start_date, rule.end_date,
+        rule.weekdays, rule.windows, rule.slot_minutes, rule.break_minutes,
+    )], dates)
+    with transaction.atomic():
+        rule.delete()
+        remaining = rule_slots(rule.provider_id, dates)
+        candidates = (
+            TimeSlot.objects.filter(
+                provider_id=rule.provider_id,
+                date__range=(rule.start_date, rule.end_date),
+                is_available=True,
+                created_at__gte=rule.created_at,
+            )
+            .exclude(bookings__status__in=["pending", "confirmed"])
+            .values_list("pk", "date", "start_time", "end_time")
+        )
+        orphaned = []
+        for pk, d, st, et in candidates:
+            span = (engine.minutes(st), engine.minutes(et))
+            if span in own.get((rule.provider_id, d), ()) and span not in remaining.get(d, ()):
+                orphaned.append(pk)
+        if orphaned:
+            TimeSlot.objects.filter(pk__in=orphaned).update(is_available=False)
+        index.refresh_range(rule.provider_id, rule.start_date, rule.end_date)
+
+
+def materialize_many(keys):
+    """
+    {chave: TimeSlot} para as chaves que correspondem a horários oferecidos em
+    dias não bloqueados; as demais ficam de fora. Cria as linhas que faltam em
+    um INSERT (ignore_conflicts: outra reserva pode ter materializado o mesmo
+    horário) e as lê de volta em uma consulta. O TimeSlot devolvido pode já
+    estar indisponível; quem reserva continua checando is_available.
+    """
+    wanted = {}
+    for key in keys:
+        parsed = parse_slot_key(key)
+        if parsed is not None:
+            wanted[key] = parsed
+    if not wanted:
+        return {}
+
+    dates_by_provider = {}
+    for provider_id, d, _st, _et in wanted.values():
+        dates_by_provider.setdefault(provider_id, set()).add(d)
+
+    offered = {pid: rule_slots(pid, dates) for pid, dates in dates_by_provider.items()}
+    blocked = set(
+        DayOff.objects.filter(
+            provider_id__in=dates_by_provider,
+            date__in={d for dates in dates_by_provider.values() for d in dates},
+        ).values_list("provider_id", "date")
+    )
+
+    valid = {
+        key: (pid, d, st, et)
+        for key, (pid, d, st, et) in wanted.items()
+        if (engine.minutes(st), engine.minutes(et)) in offered[pid].get(d, ()) and (pid, d) not in blocked
+    }
+    if not valid:
+        return {}
+
+    TimeSlot.objects.bulk_create([
+        TimeSlot(provider_id=pid, date=d, start_time=st, end_time=et, is_available=True)
+        for pid, d, st, et in set(valid.values())
+    ], ignore_conflicts=True)
+
+    lookup = Q()
+    for pid, d, st, et in set(valid.values()):
+        lookup |= Q(provider_id=pid, date=d, start_time=st, end_time=et)
+    rows = {
+        (ts.provider_id, ts.date, ts.start_time, ts.end_time): ts
+        for ts in TimeSlot.objects.filter(lookup)
+    }
+    return {key: rows[parts] for key, parts in valid.items() if parts in rows}
+
+
+def materialize(key):
+    """TimeSlot do horário de regra indicado pela chave; SlotNotOffered se não for oferecido."""
+    ts = materialize_many([key]).get(key)
+    if ts is None:
+        raise SlotNotOffered("Este horário não está mais disponível.")
+    return ts
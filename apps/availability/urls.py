@@ -1,11 +1,31 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import async_views, views
+
+# perfil ASGI: as URLs principais das APIs de leitura usam as views assíncronas
+api = async_views if settings.AVAILABILITY_ASYNC_API else views
 
 urlpatterns = [
     path("schedule/", views.ScheduleView.as_view(), name="availability_schedule"),
 
     # API
-    path("api/slots/", views.available_slots_api, name="availability_slots_api"),
+    path("api/slots/", api.available_slots_api, name="availability_slots_api"),
     path("calendario/", views.calendar_view, name="availability_calendar"),
-    path("api/calendar-events/", views.calendar_events_api, name="availability_calendar_events"),
+    path("api/calendar-events/", api.calendar_events_api, name="availability_calendar_events"),
+    path("api/calendar-events/stream/", api.calendar_events_stream_api, name="availability_calendar_events_stream"),
+    path("api/cache-stats/", views.cache_stats_api, name="availability_cache_stats"),
+    path("api/schedule/", views.schedule_rows_api, name="availability_schedule_rows"),
+
+    # API assíncrona (ASGI)
+    path("api/async/slots/", async_views.available_slots_api, name="availability_slots_async_api"),
+    path(
+        "api/async/calendar-events/",
+        async_views.calendar_events_api,
+        name="availability_calendar_events_async",
+    ),
+    path(
+        "api/async/calendar-events/stream/",
+        async_views.calendar_events_stream_api,
+        name="availability_calendar_events_stream_async",
+    ),
 ]
\ No newline at end of file
@@ -1,17 +1,26 @@
-from datetime import date as date_type, datetime, timedelta
+from datetime import date as date_type, timedelta
 import calendar
+import json
 
+from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
-from django.db import transaction
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from django.shortcuts import redirect, get_object_or_404, render
+from django.utils.cache import patch_cache_control
 from django.utils.dateparse import parse_date
+from django.utils.safestring import mark_safe
 from django.views import View
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
 
-from .forms import GenerateRecurringSlotsForm, DayOffForm
-from .models import TimeSlot, DayOff
+from config.db_router import read_from_replica
+
+from . import blocking, cache as availability_cache, changes, dashboard, index, rules
+from .forms import WEEKDAYS, GenerateRecurringSlotsForm, DayOffForm, DayOffRangeForm
+from .generation import generate_slots
+from .models import AvailabilityRule, DayAvailability
 
 
 class StaffRequiredMixin(UserPassesTestMixin):
@@ -25,13 +34,6 @@ class StaffRequiredMixin(UserPassesTestMixin):
         return super().handle_no_permission()
 
 
-def _daterange(start: date_type, end: date_type):
-    cur = start
-    while cur <= end:
-        yield cur
-        cur += timedelta(days=1)
-
-
 class ScheduleView(LoginRequiredMixin, StaffRequiredMixin, View):
     template_name = "availability/schedule.html"
 
@@ -51,21 +53,34 @@ class ScheduleView(LoginRequiredMixin, StaffRequiredMixin, View):
         if action == "unblock_day":
             return self._post_unblock_day(request)
 
+        if action == "block_range":
+            return self._post_block_range(request)
+
+        if action == "unblock_range":
+            return self._post_unblock_range(request)
+
+        if action == "delete_rule":
+            return self._post_delete_rule(request)
+
         messages.error(request, "Ação inválida.")
         return redirect("availability_schedule")
 
     def _context(self, request):
-        slots = (
-            TimeSlot.objects
-            .filter(provider=request.user)
-            .order_by("-date", "start_time")[:300]
-        )
-        dayoffs = DayOff.objects.filter(provider=request.user).order_by("-date")[:60]
+        # só formulários e o resumo mensal: as tabelas vêm de schedule_rows_api
+        today = date_type.today()
+        selected = dashboard.parse_month(request.GET.get("month")) or today.replace(day=1)
+        weekday_names = dict(WEEKDAYS)
+        availability_rules = [
+            (rule, ", ".join(weekday_names[d] for d in rule.weekdays))
+            for rule in AvailabilityRule.objects.filter(provider=request.user).order_by("-start_date")[:50]
+        ]
         return {
             "gen_form": GenerateRecurringSlotsForm(),
             "dayoff_form": DayOffForm(),
-            "slots": slots,
-            "dayoffs": dayoffs,
+            "range_form": DayOffRangeForm(),
+            "summary": dashboard.month_summary(request.user.pk, today),
+            "selected_month": f"{selected:%Y-%m}",
+            "rules": availability_rules,
         }
 
     def _post_generate(self, request):
@@ -94,45 +109,25 @@ class ScheduleView(LoginRequiredMixin, StaffRequiredMixin, View):
         slot_minutes = form.cleaned_data["slot_minutes"]
         break_minutes = form.cleaned_data["break_minutes"]
 
-        created = 0
-        skipped_blocked_days = 0
-
-        with transaction.atomic():
-            blocked = set(
-                DayOff.objects.filter(provider=request.user, date__range=(start_date, end_date))
-                .values_list("date", flat=True)
+        if settings.AVAILABILITY_GENERATION_MODE == "rules":
+            _rule, result = rules.create_rule(
+                request.user, start_date, end_date, weekdays, windows, slot_minutes, break_minutes,
             )
+            msg = f"Regra criada: {result.created} horário(s) oferecido(s)."
+            if result.skipped_blocked_days:
+                msg += f" ({result.skipped_blocked_days} dia(s) ignorado(s) por bloqueio.)"
+            messages.success(request, msg)
+            return redirect("availability_schedule")
 
-            for d in _daterange(start_date, end_date):
-                if d.weekday() not in weekdays:
-                    continue
-                if d in blocked:
-                    skipped_blocked_days += 1
-                    continue
-
-                for (st, et) in windows:
-                    start_dt = datetime.combine(d, st)
-                    end_dt = datetime.combine(d, et)
-                    cursor = start_dt
-
-                    while cursor + timedelta(minutes=slot_minutes) <= end_dt:
-                        slot_end = cursor + timedelta(minutes=slot_minutes)
-
-                        _, was_created = TimeSlot.objects.get_or_create(
-                            provider=request.user,
-                            date=d,
-                            start_time=cursor.time(),
-                            end_time=slot_end.time(),
-                            defaults={"is_available": True},
-                        )
-                        if was_created:
-                            created += 1
-
-                        cursor = slot_end + timedelta(minutes=break_minutes)
-
-        msg = f"{created} horários criados."
-        if skipped_blocked_days:
-            msg += f" ({skipped_blocked_days} dia(s) ignorado(s) por bloqueio.)"
+        result = generate_slots(
+            request.user, start_date, end_date, weekdays, windows, slot_minutes, break_minutes,
+        )
+
+        msg = f"{result.created} horários criados."
+        if result.skipped_existing:
+            msg += f" {result.skipped_existing} já existiam."
+        if result.skipped_blocked_days:
+            msg += f" ({result.skipped_blocked_days} dia(s) ignorado(s) por bloqueio.)"
         messages.success(request, msg)
         return redirect("availability_schedule")
 
@@ -147,22 +142,11 @@ class ScheduleView(LoginRequiredMixin, StaffRequiredMixin, View):
         reason = form.cleaned_data.get("reason") or ""
 
         # se houver booking ativo nesse dia, não bloquear (evita inconsistência)
-        from apps.bookings.models import Booking
-
-        has_active = Booking.objects.filter(
-            time_slot__provider=request.user,
-            time_slot__date=d,
-            status__in=["pending", "confirmed"],
-        ).exists()
-
-        if has_active:
+        result = blocking.block_days(request.user, [d], reason)
+        if result.conflicts:
             messages.error(request, "Não é possível bloquear: existem agendamentos ativos nesse dia.")
             return redirect("availability_schedule")
 
-        with transaction.atomic():
-            DayOff.objects.get_or_create(provider=request.user, date=d, defaults={"reason": reason})
-            TimeSlot.objects.filter(provider=request.user, date=d).update(is_available=False)
-
         messages.info(request, "Dia bloqueado (agenda desativada para a data).")
         return redirect("availability_schedule")
 
@@ -172,27 +156,100 @@ class ScheduleView(LoginRequiredMixin, StaffRequiredMixin, View):
             messages.error(request, "Data inválida.")
             return redirect("availability_schedule")
 
-        d = form.cleaned_data["date"]
+        blocking.unblock_days(request.user, [form.cleaned_data["date"]])
+        messages.success(request, "Dia desbloqueado.")
+        return redirect("availability_schedule")
 
-        from apps.bookings.models import Booking
+    def _range_dates(self, request):
+        """(dias selecionados, formulário inválido ou None) do bloqueio em lote."""
+        form = DayOffRangeForm(request.POST)
+        if not form.is_valid():
+            return None, form
+        weekdays = {int(x) for x in form.cleaned_data["weekdays"]}
+        return blocking.select_dates(form.cleaned_data["start_date"], form.cleaned_data["end_date"], weekdays), form
 
-        with transaction.atomic():
-            DayOff.objects.filter(provider=request.user, date=d).delete()
+    def _invalid_range(self, request, form):
+        ctx = self._context(request)
+        ctx["range_form"] = form
+        return render(request, self.template_name, ctx)
 
-            # reabilita apenas slots sem booking ativo
-            active_slot_ids = Booking.objects.filter(
-                time_slot__provider=request.user,
-                time_slot__date=d,
-                status__in=["pending", "confirmed"],
-            ).values_list("time_slot_id", flat=True)
+    def _post_block_range(self, request):
+        dates, form = self._range_dates(request)
+        if dates is None:
+            return self._invalid_range(request, form)
+
+        result = blocking.block_days(request.user, dates, form.cleaned_data.get("reason") or "")
+        if result.dates:
+            messages.info(request, f"{len(result.dates)} dia(s) bloqueado(s).")
+        if result.conflicts:
+            conflicts = ", ".join(
+                f"{d:%d/%m/%Y} ({n})" for d, n in sorted(result.conflicts.items())
+            )
+            messages.error(request, f"Não bloqueados por terem agendamentos ativos: {conflicts}.")
+        if not dates:
+            messages.error(request, "Nenhum dia do intervalo corresponde aos dias da semana escolhidos.")
+        return redirect("availability_schedule")
 
-            TimeSlot.objects.filter(provider=request.user, date=d).exclude(id__in=active_slot_ids).update(is_available=True)
+    def _post_unblock_range(self, request):
+        dates, form = self._range_dates(request)
+        if dates is None:
+            return self._invalid_range(request, form)
 
-        messages.success(request, "Dia desbloqueado.")
+        unblocked = blocking.unblock_days(request.user, dates) if dates else 0
+        messages.success(request, f"{unblocked} dia(s) desbloqueado(s).")
         return redirect("availability_schedule")
 
+    def _post_delete_rule(self, request):
+        rule_id = request.POST.get("rule_id", "")
+        rule = get_object_or_404(AvailabilityRule, pk=rule_id if rule_id.isdigit() else 0, provider=request.user)
+        rules.delete_rule(rule)
+        messages.info(request, "Regra removida. Horários já reservados continuam valendo.")
+        return redirect("availability_schedule")
+
+
+def _parse_day(value):
+    # FullCalendar manda "YYYY-MM-DDTHH:MM:SS-03:00"; só a data interessa
+    return parse_date(value[:10]) if value else None
 
+
+def _request_stamp(request, by_provider=True):
+    """
+    (etag, last_modified) do intervalo pedido, calculado uma vez por requisição
+    a partir das versões de DayAvailability (sem rodar a consulta de horários).
+    """
+    if not hasattr(request, "_availability_stamp"):
+        if "since" in request.GET:
+            # o delta depende do cursor, não das versões do intervalo: sem
+            # validadores, nunca vira 304
+            start = end = None
+        elif "date" in request.GET:
+            start = end = _parse_day(request.GET.get("date"))
+        else:
+            start, end = _parse_day(request.GET.get("start")), _parse_day(request.GET.get("end"))
+        provider_id = (request.GET.get("provider") or None) if by_provider else None
+
+        stamp = (None, None)
+        valid_provider = provider_id is None or provider_id.isdigit()
+        if isinstance(start, date_type) and isinstance(end, date_type) and valid_provider:
+            stamp = index.range_stamp(start, end, provider_id)
+        request._availability_stamp = stamp
+    return request._availability_stamp
+
+
+def _conditional(by_provider=True):
+    # o navegador sempre revalida (If-None-Match) e recebe 304 se nada mudou
+    def decorator(view):
+        view = condition(
+            etag_func=lambda request, *a, **kw: _request_stamp(request, by_provider)[0],
+            last_modified_func=lambda request, *a, **kw: _request_stamp(request, by_provider)[1],
+        )(view)
+        return cache_control(private=True, no_cache=True)(view)
+    return decorator
+
+
+@read_from_replica
 @login_required
+@_conditional()
 def available_slots_api(request):
     """
     GET /availability/api/slots/?date=YYYY-MM-DD[&provider=<id>]
@@ -204,84 +261,284 @@ def available_slots_api(request):
     if not isinstance(d, date_type):
         return JsonResponse({"results": []})
 
-    qs = TimeSlot.objects.filter(date=d, is_available=True).order_by("start_time").select_related("provider")
+    # índice materializado por (prestador, dia): já exclui dias bloqueados
+    payload = availability_cache.get_or_build(
+        availability_cache.slots_key(d, provider_id),
+        _request_stamp(request)[0],
+        lambda: json.dumps({"results": index.free_slots_for_date(d, provider_id=provider_id)}).encode(),
+    )
+    return HttpResponse(payload, content_type="application/json")
 
-    if provider_id:
-        qs = qs.filter(provider_id=provider_id)
 
-    # não mostra horários de dias bloqueados (por provider)
-    if provider_id:
-        if DayOff.objects.filter(provider_id=provider_id, date=d).exists():
-            return JsonResponse({"results": []})
-    else:
-        blocked_provider_ids = set(DayOff.objects.filter(date=d).values_list("provider_id", flat=True))
-        if blocked_provider_ids:
-            qs = qs.exclude(provider_id__in=blocked_provider_ids)
-
-    data = [
-        {
-            "id": s.id,
-            "start_time": s.start_time.strftime("%H:%M"),
-            "end_time": s.end_time.strftime("%H:%M"),
-            "provider_id": s.provider_id,
-            "provider_name": getattr(s.provider, "username", str(s.provider)),
-        }
-        for s in qs
-    ]
-    return JsonResponse({"results": data})
+CHANGES_CURSOR_HEADER = "X-Changes-Cursor"
+
+# escapes de json_script: o JSON embutido não pode fechar a tag <script>
+_SCRIPT_ESCAPES = {ord("<"): "\\u003C", ord(">"): "\\u003E", ord("&"): "\\u0026"}
+
 
+def month_grid_range(year, month):
+    """[início, fim) da grade mensal do FullCalendar: 6 semanas começando no domingo."""
+    first = date_type(year, month, 1)
+    start = first - timedelta(days=(first.weekday() + 1) % 7)
+    return start, start + timedelta(days=42)
 
+
+@read_from_replica
 @login_required
 def calendar_view(request):
     """
-    Página de calendário visual
+    Página de calendário visual. Os eventos do mês atual vêm embutidos na
+    página (mesmo payload e mesma entrada de cache do feed em streaming),
+    então o calendário desenha sem esperar uma segunda requisição.
+    """
+    today = date_type.today()
+    start, end = month_grid_range(today.year, today.month)
+    cursor = changes.head()
+    payload = calendar_events_payload(start, end)
+    return render(request, "availability/calendar.html", {
+        "initial_start": start,
+        "initial_end": end,
+        "changes_cursor": cursor,
+        "poll_seconds": settings.CALENDAR_POLL_SECONDS,
+        "initial_events": mark_safe(payload.decode().translate(_SCRIPT_ESCAPES)),
+    })
+
+
+def calendar_days_queryset(start, end, provider_id=None):
+    """
+    Linhas do índice com horários livres no intervalo: uma por (dia, prestador),
+    já sem os dias bloqueados e com os horários de regras incluídos.
     """
-    return render(request, "availability/calendar.html")
+    qs = DayAvailability.objects.filter(date__gte=start, date__lte=end, free_count__gt=0)
+    if provider_id:
+        qs = qs.filter(provider_id=provider_id)
+    return qs.order_by("date", "provider_id").values_list("date", "provider_id", "provider__username", "free_slots")
+
+
+def _event(d, username, slot):
+    slot_id, st, et = slot
+    return {
+        "id": slot_id,
+        "title": f"{st} - {username}",
+        "start": f"{d}T{st}:00",
+        "end": f"{d}T{et}:00",
+        "url": f"/novo/?slot={slot_id}",  # link para agendar
+        "color": "#28a745",
+    }
+
+
+def calendar_events(rows):
+    """Eventos FullCalendar das linhas de calendar_days_queryset."""
+    events = [
+        _event(d, username, slot)
+        for d, _provider_id, username, free_slots in rows
+        for slot in free_slots
+    ]
+    # as linhas vêm por dia; dentro do dia, em ordem de início
+    events.sort(key=lambda e: e["start"])
+    return events
 
 
+def _calendar_events(start, end):
+    return calendar_events(calendar_days_queryset(start, end))
+
+
+def calendar_delta_response(since, delta):
+    """
+    Resposta do feed com ?since=: 400 se o cursor for inválido, 410 se expirou
+    (delta None). Nunca cacheável, nem com validadores.
+    """
+    if since is None:
+        response = JsonResponse({"error": "since inválido."}, status=400)
+    elif delta is None:
+        response = JsonResponse({"error": "Cursor expirado; recarregue o calendário."}, status=410)
+    else:
+        for kind in ("added", "changed"):
+            delta[kind] = [_event(d, username, slot) for d, username, slot in delta[kind]]
+        response = JsonResponse(delta)
+    patch_cache_control(response, no_store=True)
+    return response
+
+
+def parse_since(request):
+    since = request.GET["since"]
+    return int(since) if since.isdigit() else None
+
+
+@read_from_replica
 @login_required
+@_conditional(by_provider=False)  # esta versão ignora ?provider=
 def calendar_events_api(request):
     """
     Retorna eventos no formato FullCalendar
     GET /availability/api/calendar-events/?start=YYYY-MM-DD&end=YYYY-MM-DD
+
+    Com &since=<cursor>, devolve só o que mudou no intervalo depois do cursor:
+    {"cursor", "added": [eventos], "changed": [eventos], "removed": [ids]}
+    (410 se o cursor já saiu do registro). O cursor inicial vem no cabeçalho
+    X-Changes-Cursor da resposta completa.
     """
-    from datetime import date as date_type
-    from django.utils.dateparse import parse_date
-    
     start_str = request.GET.get("start")
     end_str = request.GET.get("end")
-    
+
     start = parse_date(start_str) if start_str else None
     end = parse_date(end_str) if end_str else None
-    
+
     if not (isinstance(start, date_type) and isinstance(end, date_type)):
         return JsonResponse({"events": []})
-    
-    # busca slots disponíveis no intervalo
-    slots = TimeSlot.objects.filter(
-        date__gte=start,
-        date__lte=end,
-        is_available=True
-    ).select_related("provider")
-    
-    # ignora dias bloqueados
-    blocked_dates = set(
-        DayOff.objects.filter(date__gte=start, date__lte=end)
-        .values_list("date", "provider_id")
+
+    if "since" in request.GET:
+        since = parse_since(request)
+        return calendar_delta_response(since, None if since is None else changes.delta(since, start, end))
+
+    # lido antes dos eventos: no pior caso o cliente reaplica uma mudança já vista
+    cursor = changes.head()
+    response = HttpResponse(
+        availability_cache.get_or_build(
+            availability_cache.calendar_key("calendar", start, end),
+            _request_stamp(request, by_provider=False)[0],
+            lambda: json.dumps(_calendar_events(start, end)).encode(),
+        ),
+        content_type="application/json",
+    )
+    response[CHANGES_CURSOR_HEADER] = cursor
+    return response
+
+
+# eventos serializados por bloco enviado ao cliente
+CALENDAR_STREAM_CHUNK = 500
+
+
+class CalendarEventChunker:
+    """
+    Serializa linhas de calendar_days_queryset direto em texto JSON,
+    agrupando CALENDAR_STREAM_CHUNK eventos por pedaço enviado.
+    """
+
+    def __init__(self):
+        self.buf = ["["]
+        self.sep = ""
+
+    def feed(self, row):
+        d, _provider_id, username, free_slots = row
+        name = json.dumps(username)[1:-1]
+
+        for slot_id, st, et in free_slots:
+            # o id pode ser inteiro (TimeSlot) ou chave de regra (texto)
+            self.buf.append(
+                f'{self.sep}{{"id": {json.dumps(slot_id)}, "title": "{st} - {name}", '
+                f'"start": "{d}T{st}:00", "end": "{d}T{et}:00", '
+                f'"url": "/novo/?slot={slot_id}", "color": "#28a745"}}'
+            )
+            self.sep = ", "
+        if len(self.buf) >= CALENDAR_STREAM_CHUNK:
+            chunk, self.buf = "".join(self.buf), []
+            return chunk
+        return None
+
+    def close(self):
+        self.buf.append("]")
+        return "".join(self.buf)
+
+
+def _calendar_event_chunks(start, end, provider_id=None):
+    """
+    Gera o array JSON de eventos em pedaços, lendo as linhas do índice
+    com .iterator() (sem instanciar modelos).
+    """
+    chunker = CalendarEventChunker()
+    for row in calendar_days_queryset(start, end, provider_id).iterator(chunk_size=500):
+        chunk = chunker.feed(row)
+        if chunk:
+            yield chunk
+    yield chunker.close()
+
+
+def calendar_events_payload(start, end, provider_id=None):
+    """Array JSON do feed em streaming, já montado (usa e preenche o mesmo cache)."""
+    return availability_cache.get_or_build(
+        availability_cache.calendar_key("calendar-stream", start, end, provider_id),
+        index.range_stamp(start, end, provider_id)[0],
+        lambda: "".join(_calendar_event_chunks(start, end, provider_id)).encode(),
+    )
+
+
+def calendar_stream_params(request):
+    """(start, end, provider_id, erro) validados para o feed em streaming."""
+    start = _parse_day(request.GET.get("start"))
+    end = _parse_day(request.GET.get("end"))
+    provider_id = request.GET.get("provider") or None
+
+    if not (isinstance(start, date_type) and isinstance(end, date_type)) or end < start:
+        return start, end, provider_id, "Informe start e end válidos (YYYY-MM-DD)."
+
+    max_days = settings.CALENDAR_EVENTS_MAX_RANGE_DAYS
+    if (end - start).days + 1 > max_days:
+        return start, end, provider_id, f"Intervalo máximo é de {max_days} dias."
+
+    if provider_id is not None and not provider_id.isdigit():
+        return start, end, provider_id, "provider inválido."
+
+    return start, end, provider_id, None
+
+
+@read_from_replica
+@login_required
+@_conditional()
+def calendar_events_stream_api(request):
+    """
+    Mesmo formato de calendar_events_api, mas transmitido em streaming e com
+    intervalo máximo (settings.CALENDAR_EVENTS_MAX_RANGE_DAYS).
+    GET /availability/api/calendar-events/stream/?start=YYYY-MM-DD&end=YYYY-MM-DD[&provider=<id>]
+    """
+    start, end, provider_id, error = calendar_stream_params(request)
+    if error:
+        return JsonResponse({"error": error}, status=400)
+
+    key = availability_cache.calendar_key("calendar-stream", start, end, provider_id)
+    etag = _request_stamp(request)[0]
+    payload = availability_cache.get(key, etag)
+    if payload is not None:
+        return HttpResponse(payload, content_type="application/json")
+
+    return StreamingHttpResponse(
+        availability_cache.caching_stream(key, etag, _calendar_event_chunks(start, end, provider_id)),
+        content_type="application/json",
     )
-    
-    events = []
-    for s in slots:
-        if (s.date, s.provider_id) in blocked_dates:
-            continue
-        
-        events.append({
-            "id": s.id,
-            "title": f"{s.start_time.strftime('%H:%M')} - {s.provider.username}",
-            "start": f"{s.date}T{s.start_time}",
-            "end": f"{s.date}T{s.end_time}",
-            "url": f"/novo/?slot={s.id}",  # link para agendar
-            "color": "#28a745",
-        })
-    
-    return JsonResponse(events, safe=False)
\ No newline at end of file
+
+
+@login_required
+def cache_stats_api(request):
+    """
+    Contadores de acerto/falha do cache de disponibilidade deste processo
+    (somente staff); por requisição, ver QUERY_INSTRUMENTATION.
+    GET /availability/api/cache-stats/
+    """
+    if not request.user.is_staff:
+        return JsonResponse({"error": "Acesso restrito."}, status=403)
+    return JsonResponse(availability_cache.stats())
+
+
+@read_from_replica
+@login_required
+def schedule_rows_api(request):
+    """
+    Tabelas do painel de agenda do prestador logado (somente staff), por mês e página.
+    GET /availability/api/schedule/?kind=slots|dayoffs&month=YYYY-MM[&page=N]
+    """
+    if not request.user.is_staff:
+        return JsonResponse({"error": "Acesso restrito."}, status=403)
+
+    kind = request.GET.get("kind", "slots")
+    first = dashboard.parse_month(request.GET.get("month"))
+    page = request.GET.get("page", "1")
+    if kind not in ("slots", "dayoffs") or first is None or not page.isdigit() or int(page) < 1:
+        return JsonResponse({"error": "Parâmetros inválidos."}, status=400)
+
+    page = int(page)
+    rows, has_next = dashboard.month_rows(request.user.pk, kind, first, page)
+    return JsonResponse({
+        "month": f"{first:%Y-%m}",
+        "results": rows,
+        "next_page": page + 1 if has_next else None,
+    })
@@ -1,9 +1,89 @@
+import io
+from datetime import date as date_type
+
+from django.conf import settings
 from django.contrib import admin
-from .models import Booking
+from django.core.exceptions import PermissionDenied
+from django.http import StreamingHttpResponse
+from django.template.response import TemplateResponse
+from django.urls import path
+
+from . import analytics, export, importer
+from .forms import BookingImportForm
+from .models import Booking, OutboundEmail, ProviderDailyStats
 
 @admin.register(Booking)
 class BookingAdmin(admin.ModelAdmin):
     list_display = ("id", "user", "time_slot", "status", "created_at")
     list_filter = ("status",)
     search_fields = ("user__username", "user__email")
-    readonly_fields = ("created_at",)  # removido 'updated_at'
\ No newline at end of file
+    readonly_fields = ("created_at",)  # removido 'updated_at'
+    actions = ["export_csv"]
+
+    def get_readonly_fields(self, request, obj=None):
+        # concluído é definitivo: o consolidado do painel não desconta atendimentos realizados
+        if obj is not None and obj.status == "completed":
+            return (*self.readonly_fields, "status")
+        return self.readonly_fields
+
+    def save_model(self, request, obj, form, change):
+        old_status = Booking.objects.filter(pk=obj.pk).values_list("status", flat=True).first() if change else None
+        super().save_model(request, obj, form, change)
+        # mantém o consolidado do painel (mudar o horário de um agendamento exige backfill)
+        if not change:
+            analytics.record_booked([obj])
+        elif old_status != obj.status:
+            analytics.record_status_changes([(obj.time_slot.provider_id, obj.time_slot.date, old_status, obj.status)])
+
+    @admin.action(description="Exportar selecionados (CSV)")
+    def export_csv(self, request, queryset):
+        # em streaming: não carrega a seleção inteira em memória
+        rows = export.booking_queryset().filter(pk__in=queryset.values("pk"))
+        response = StreamingHttpResponse(
+            export.csv_chunks(map(export.format_row, rows.iterator(chunk_size=settings.BOOKING_EXPORT_CHUNK_SIZE))),
+            content_type=export.FORMATS["csv"],
+        )
+        response["Content-Disposition"] = f'attachment; filename="agendamentos-{date_type.today():%Y%m%d}.csv"'
+        return response
+
+    def get_urls(self):
+        return [
+            path("importar/", self.admin_site.admin_view(self.import_view), name="bookings_booking_import"),
+        ] + super().get_urls()
+
+    def import_view(self, request):
+        """Upload de CSV para importer (lido em streaming, em lotes)."""
+        if not self.has_add_permission(request):
+            raise PermissionDenied
+        result = None
+        form = BookingImportForm(request.POST or None, request.FILES or None)
+        if request.method == "POST" and form.is_valid():
+            upload = io.TextIOWrapper(form.cleaned_data["file"].file, encoding="utf-8-sig", newline="")
+            try:
+                result = importer.import_csv(upload, dry_run=form.cleaned_data["dry_run"])
+            except UnicodeDecodeError:
+                form.add_error("file", "O arquivo precisa estar em UTF-8.")
+        context = {
+            **self.admin_site.each_context(request),
+            "title": "Importar horários e agendamentos",
+            "opts": self.model._meta,
+            "form": form,
+            "result": result,
+        }
+        return TemplateResponse(request, "admin/bookings/booking/import_csv.html", context)
+
+
+@admin.register(OutboundEmail)
+class OutboundEmailAdmin(admin.ModelAdmin):
+    list_display = ("id", "subject", "status", "attempts", "next_attempt_at", "sent_at")
+    list_filter = ("status",)
+    search_fields = ("subject",)
+    readonly_fields = ("created_at", "sent_at", "last_error")
+
+
+@admin.register(ProviderDailyStats)
+class ProviderDailyStatsAdmin(admin.ModelAdmin):
+    list_display = ("date", "provider", "slots_free", "booked", "cancelled", "completed", "updated_at")
+    list_filter = ("provider",)
+    date_hierarchy = "date"
+    readonly_fields = ("updated_at",)
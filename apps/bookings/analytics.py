@@ -0,0 +1,340 @@
+"""
+Consolidado diário por prestador (ProviderDailyStats) para o painel de uso.
+
+Os contadores são atualizados de forma incremental, na transação de cada
+escrita: reservar soma em booked e lead_minutes, cancelar/concluir soma em
+cancelled/completed. As escritas que atualizam o índice de disponibilidade
+passam esses deltas (booked_deltas/status_deltas) para index.refresh_many,
+que grava tudo junto com os horários livres dos dias em um único upsert
+(sync); as demais usam record_*. O painel lê só esta tabela, uma linha por
+prestador e dia, sem varrer Booking × TimeSlot.
+
+Horários oferecidos = livres + agendados - cancelados (um cancelamento devolve
+o horário aos livres). Os livres de dias passados ficam congelados: o
+arquivamento remove horários antigos nunca reservados, e isso não deve
+reescrever o histórico.
+
+rebuild() recalcula tudo a partir de Booking, ArchivedBooking e
+DayAvailability (manage.py backfill_provider_stats).
+"""
+import logging
+from datetime import date as date_type, datetime, timedelta
+
+from django.db import connection, transaction
+from django.db.models import Case, F, Max, Min, Q, Value, When
+from django.utils import timezone
+
+from apps.availability.models import DayAvailability
+from .models import ArchivedBooking, Booking, ProviderDailyStats
+
+logger = logging.getLogger("saas.analytics")
+
+
+COUNTERS = ["booked", "cancelled", "completed", "lead_minutes"]
+
+# status que têm contador próprio
+STATUS_COUNTERS = {"cancelled": "cancelled", "completed": "completed"}
+
+# dias recalculados por transação no rebuild
+REBUILD_CHUNK_DAYS = 92
+
+# maior intervalo aceito pelo painel
+STATS_MAX_RANGE_DAYS = 366
+
+# linhas por INSERT do upsert de sync (8 parâmetros por linha)
+SYNC_BATCH_SIZE = 100
+
+
+def lead_minutes(d, start_time, created_at):
+    """Minutos entre a criação do agendamento e o início do horário (nunca negativo)."""
+    start = timezone.make_aware(datetime.combine(d, start_time))
+    return max(0, int((start - created_at).total_seconds() // 60))
+
+
+def _apply(deltas):
+    """
+    Soma deltas {(provider_id, date): {contador: n}} às linhas, criando as
+    que faltam: um INSERT (ignore_conflicts) e um UPDATE com CASE por contador,
+    qualquer que seja o número de dias.
+    """
+    deltas = {pair: fields for pair, fields in deltas.items() if any(fields.values())}
+    if not deltas:
+        return
+
+    ProviderDailyStats.objects.bulk_create(
+        [ProviderDailyStats(provider_id=pid, date=d) for pid, d in deltas],
+        ignore_conflicts=True,
+    )
+
+    pairs = Q()
+    for pid, d in deltas:
+        pairs |= Q(provider_id=pid, date=d)
+    updates = {}
+    for field in COUNTERS:
+        whens = [
+            When(Q(provider_id=pid, date=d), then=Value(fields[field]))
+            for (pid, d), fields in deltas.items() if fields.get(field)
+        ]
+        if whens:
+            updates[field] = F(field) + Case(*whens, default=Value(0))
+    ProviderDailyStats.objects.filter(pairs).update(**updates, updated_at=timezone.now())
+
+
+def booked_deltas(bookings):
+    """Deltas dos agendamentos recém-criados (com time_slot carregado)."""
+    deltas = {}
+    for booking in bookings:
+        ts = booking.time_slot
+        fields = deltas.setdefault((ts.provider_id, ts.date), {"booked": 0, "lead_minutes": 0})
+        fields["booked"] += 1
+        fields["lead_minutes"] += lead_minutes(ts.date, ts.start_time, booking.created_at)
+        # agendamento criado já cancelado/concluído (admin, importação)
+        if booking.status in STATUS_COUNTERS:
+            counter = STATUS_COUNTERS[booking.status]
+            fields[counter] = fields.get(counter, 0) + 1
+    return deltas
+
+
+def record_booked(bookings):
+    """Conta agendamentos recém-criados (com time_slot carregado)."""
+    _apply(booked_deltas(bookings))
+
+
+def status_deltas(changes):
+    """
+    Deltas de mudanças de status: [(provider_id, date, status antigo, status
+    novo), ...]. Um agendamento concluído foi atendido e não sai do
+    consolidado: a mudança é recusada e registrada no log (backfill_provider_stats
+    --check mostra o dia divergente, se a linha de origem mudou mesmo).
+    """
+    deltas = {}
+    for provider_id, d, old, new in changes:
+        if old == new:
+            continue
+        if old == "completed":
+            logger.warning(
+                "mudança de status completed -> %s ignorada no consolidado (prestador %s, %s)", new, provider_id, d,
+            )
+            continue
+        fields = deltas.setdefault((provider_id, d), {})
+        if old in STATUS_COUNTERS:
+            fields[STATUS_COUNTERS[old]] = fields.get(STATUS_COUNTERS[old], 0) - 1
+        if new in STATUS_COUNTERS:
+            fields[STATUS_COUNTERS[new]] = fields.get(STATUS_COUNTERS[new], 0) + 1
+    return deltas
+
+
+def record_status_changes(changes):
+    """Aplica mudanças de status: [(provider_id, date, status antigo, status novo), ...]."""
+    _apply(status_deltas(changes))
+
+
+def sync(free, deltas=None, today=None):
+    """
+    Upsert único (INSERT ... ON CONFLICT DO UPDATE) com os horários livres
+    que o índice acabou de calcular ({(provider_id, date): livres}) e os
+    deltas dos contadores ({(provider_id, date): {contador: n}}), somados no
+    próprio banco. Os livres de dias passados não mudam; dias com delta e
+    sem livres informados vão para _apply.
+    """
+    today = today or date_type.today()
+    deltas = {pair: fields for pair, fields in (deltas or {}).items() if any(fields.values())}
+    _apply({pair: fields for pair, fields in deltas.items() if pair not in free})
+    pairs = sorted(pair for pair in free if pair[1] >= today or pair in deltas)
+    if not pairs:
+        return
+
+    ops, qn = connection.ops, connection.ops.quote_name
+    table = qn(ProviderDailyStats._meta.db_table)
+    columns = ["provider_id", "date", "slots_free", *COUNTERS, "updated_at"]
+    assignments = ", ".join([
+        f"{qn('slots_free')} = CASE WHEN EXCLUDED.{qn('date')} >= %s "
+        f"THEN EXCLUDED.{qn('slots_free')} ELSE {table}.{qn('slots_free')} END",
+        *[f"{qn(c)} = {table}.{qn(c)} + EXCLUDED.{qn(c)}" for c in COUNTERS],
+        f"{qn('updated_at')} = EXCLUDED.{qn('updated_at')}",
+    ])
+    now = ops.adapt_datetimefield_value(timezone.now())
+    with connection.cursor() as cursor:
+        for i in range(0, len(pairs), SYNC_BATCH_SIZE):
+            batch = pairs[i:i + SYNC_BATCH_SIZE]
+            params = []
+            for pid, d in batch:
+                fields = deltas.get((pid, d), {})
+                params += [pid, ops.adapt_datefield_value(d), free[(pid, d)],
+                           *[fields.get(c, 0) for c in COUNTERS], now]
+            placeholders = ", ".join(["(" + ", ".join(["%s"] * len(columns)) + ")"] * len(batch))
+            cursor.execute(
+                f"INSERT INTO {table} ({', '.join(qn(c) for c in columns)}) VALUES {placeholders} "
+                f"ON CONFLICT ({qn('provider_id')}, {qn('date')}) DO UPDATE SET {assignments}",
+                [*params, ops.adapt_datefield_value(today)],
+            )
+
+
+def compute(provider_ids, start, end):
+    """
+    {(provider_id, date): [livres, agendados, cancelados, concluídos, antecedência]}
+    a partir das tabelas de origem, no intervalo [start, end].
+    """
+    by_provider = {"provider_id__in": provider_ids} if provider_ids else {}
+    result = {}
+
+    def row(pair):
+        return result.setdefault(pair, [0, 0, 0, 0, 0])
+
+    free_rows = DayAvailability.objects.filter(date__range=(start, end), **by_provider).values_list(
+        "provider_id", "date", "free_count",
+    )
+    for pid, d, free in free_rows:
+        row((pid, d))[0] = free
+
+    sources = [
+        Booking.objects.filter(
+            time_slot__date__range=(start, end),
+            **({"time_slot__provider_id__in": provider_ids} if provider_ids else {}),
+        ).values_list("time_slot__provider_id", "time_slot__date", "time_slot__start_time", "status", "created_at"),
+        ArchivedBooking.objects.filter(slot_date__range=(start, end), **by_provider).values_list(
+            "provider_id", "slot_date", "slot_start_time", "status", "created_at",
+        ),
+    ]
+    for qs in sources:
+        for pid, d, st, status, created_at in qs.order_by().iterator(chunk_size=2000):
+            counts = row((pid, d))
+            counts[1] += 1
+            if status == "cancelled":
+                counts[2] += 1
+            elif status == "completed":
+                counts[3] += 1
+            counts[4] += lead_minutes(d, st, created_at)
+    return result
+
+
+def _bounds(provider_ids=None):
+    """(primeira, última) data com dados nas tabelas de origem, ou (None, None)."""
+    by_provider = {"provider_id__in": provider_ids} if provider_ids else {}
+    ranges = [
+        DayAvailability.objects.filter(**by_provider).aggregate(lo=Min("date"), hi=Max("date")),
+        Booking.objects.filter(
+            **({"time_slot__provider_id__in": provider_ids} if provider_ids else {})
+        ).aggregate(lo=Min("time_slot__date"), hi=Max("time_slot__date")),
+        ArchivedBooking.objects.filter(**by_provider).aggregate(lo=Min("slot_date"), hi=Max("slot_date")),
+    ]
+    los = [r["lo"] for r in ranges if r["lo"]]
+    his = [r["hi"] for r in ranges if r["hi"]]
+    return (min(los), max(his)) if los else (None, None)
+
+
+def _chunks(start, end, days=REBUILD_CHUNK_DAYS):
+    while start <= end:
+        chunk_end = min(end, start + timedelta(days=days - 1))
+        yield start, chunk_end
+        start = chunk_end + timedelta(days=1)
+
+
+def _resolve_range(provider_ids, start, end):
+    if start and end:
+        return start, end
+    lo, hi = _bounds(provider_ids)
+    return start or lo, end or hi
+
+
+def rebuild(provider_ids=None, start=None, end=None, today=None):
+    """
+    Recalcula o consolidado (todos os prestadores ou os informados), um bloco
+    de dias por transação. Nos dias passados os livres já gravados são mantidos.
+    Retorna quantas linhas foram gravadas.
+    """
+    today = today or date_type.today()
+    start, end = _resolve_range(provider_ids, start, end)
+    if start is None:
+        return 0
+
+    written = 0
+    for lo, hi in _chunks(start, end):
+        with transaction.atomic():
+            now = timezone.now()
+            existing = ProviderDailyStats.objects.filter(date__range=(lo, hi))
+            if provider_ids:
+                existing = existing.filter(provider_id__in=provider_ids)
+            existing.update(booked=0, cancelled=0, completed=0, lead_minutes=0, updated_at=now)
+            existing.filter(date__gte=today).update(slots_free=0)
+
+            computed = compute(provider_ids, lo, hi)
+            rows = {True: [], False: []}
+            for (pid, d), (free, booked, cancelled, completed, lead) in computed.items():
+                rows[d >= today].append(ProviderDailyStats(
+                    provider_id=pid, date=d, slots_free=free, booked=booked, cancelled=cancelled,
+                    completed=completed, lead_minutes=lead, updated_at=now,
+                ))
+            for current, fields in ((True, ["slots_free", *COUNTERS]), (False, COUNTERS)):
+                if rows[current]:
+                    ProviderDailyStats.objects.bulk_create(
+                        rows[current], batch_size=500, update_conflicts=True,
+                        unique_fields=["provider", "date"], update_fields=[*fields, "updated_at"],
+                    )
+            written += len(computed)
+    return written
+
+
+def check(provider_ids=None, start=None, end=None, today=None):
+    """
+    Compara o consolidado com as tabelas de origem, sem gravar nada.
+    Retorna [(provider_id, date, esperado, armazenado), ...] dos dias divergentes.
+    """
+    today = today or date_type.today()
+    start, end = _resolve_range(provider_ids, start, end)
+    if start is None:
+        return []
+
+    mismatches = []
+    zero = (0, 0, 0, 0, 0)
+    for lo, hi in _chunks(start, end):
+        stored_qs = ProviderDailyStats.objects.filter(date__range=(lo, hi))
+        if provider_ids:
+            stored_qs = stored_qs.filter(provider_id__in=provider_ids)
+        stored = {
+            (pid, d): values
+            for pid, d, *values in stored_qs.values_list("provider_id", "date", "slots_free", *COUNTERS)
+        }
+        computed = compute(provider_ids, lo, hi)
+        for pair in sorted(set(stored) | set(computed), key=lambda p: (p[1], p[0])):
+            expected = list(computed.get(pair, zero))
+            actual = list(stored.get(pair, zero))
+            if pair[1] < today:
+                # livres do passado são histórico: não se comparam
+                expected[0] = actual[0]
+            if expected != actual:
+                mismatches.append((pair[0], pair[1], expected, actual))
+    return mismatches
+
+
+def _rates(offered, booked, cancelled, completed, lead):
+    occupied = booked - cancelled
+    return {
+        "offered": offered,
+        "booked": booked,
+        "cancelled": cancelled,
+        "completed": completed,
+        "occupancy": round(occupied / offered, 4) if offered else None,
+        "cancellation_rate": round(cancelled / booked, 4) if booked else None,
+        "avg_lead_hours": round(lead / booked / 60, 1) if booked else None,
+    }
+
+
+def summary(provider_id, start, end):
+    """
+    (dias, totais) do prestador em [start, end], lidos do consolidado em uma
+    consulta: cada dia e o total com oferecidos, agendados, cancelados,
+    concluídos, ocupação, taxa de cancelamento e antecedência média (horas).
+    """
+    rows = (
+        ProviderDailyStats.objects
+        .filter(provider_id=provider_id, date__range=(start, end))
+        .order_by("date")
+        .values_list("date", "slots_free", *COUNTERS)
+    )
+    days, totals = [], [0, 0, 0, 0, 0]
+    for d, free, booked, cancelled, completed, lead in rows:
+        values = (free + booked - cancelled, booked, cancelled, completed, lead)
+        days.append({"date": d, **_rates(*values)})
+        totals = [t + v for t, v in zip(totals, values)]
+    return days, _rates(*totals)
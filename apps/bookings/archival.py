@@ -0,0 +1,212 @@
+"""
+Arquivamento de linhas antigas de Booking e TimeSlot.
+
+Move, em lotes e uma transação por lote, para ArchivedBooking e
+ArchivedTimeSlot:
+- agendamentos concluídos/cancelados de horários anteriores ao corte;
+- horários anteriores ao corte sem nenhum agendamento (o PROTECT de
+  Booking.time_slot continua valendo: um horário com agendamento ativo,
+  mesmo antigo, fica onde está).
+
+No Postgres as tabelas de arquivo podem ser particionadas por mês
+(partition_archive_tables), com as partições criadas sob demanda.
+"""
+from dataclasses import dataclass
+from datetime import date as date_type
+
+from django.db import connection, transaction
+from django.db.models import Exists, OuterRef
+
+from apps.availability import index
+from apps.availability.models import ArchivedTimeSlot, TimeSlot
+from .models import ArchivedBooking, Booking
+
+ARCHIVABLE_STATUSES = ["completed", "cancelled"]
+
+# tabela de arquivo -> coluna de data usada como chave de partição
+PARTITIONED_TABLES = {
+    ArchivedBooking: "slot_date",
+    ArchivedTimeSlot: "date",
+}
+
+
+class PartitioningUnsupported(Exception):
+    """O banco em uso não tem particionamento nativo (só o Postgres tem)."""
+
+
+@dataclass
+class ArchiveResult:
+    bookings: int = 0
+    slots: int = 0
+    batches: int = 0
+
+
+def archivable_bookings(cutoff):
+    return Booking.objects.filter(status__in=ARCHIVABLE_STATUSES, time_slot__date__lt=cutoff)
+
+
+def archivable_slots(cutoff):
+    return TimeSlot.objects.filter(date__lt=cutoff).exclude(
+        Exists(Booking.objects.filter(time_slot=OuterRef("pk")))
+    )
+
+
+def _lock_batch(qs, batch_size):
+    # skip_locked: dois arquivadores em paralelo não disputam as mesmas linhas
+    if connection.features.has_select_for_update_skip_locked:
+        qs = qs.select_for_update(skip_locked=True, of=("self",))
+    return qs.order_by("pk")[:batch_size]
+
+
+def archive_bookings_batch(cutoff, batch_size):
+    with transaction.atomic():
+        rows = list(_lock_batch(archivable_bookings(cutoff), batch_size).values(
+            "pk", "user_id", "time_slot_id", "time_slot__provider_id", "time_slot__date",
+            "time_slot__start_time", "time_slot__end_time", "status", "created_at",
+        ))
+        if not rows:
+            return 0
+
+        _ensure_partitions(ArchivedBooking, {row["time_slot__date"] for row in rows})
+        ArchivedBooking.objects.bulk_create([
+            ArchivedBooking(
+                id=row["pk"],
+                user_id=row["user_id"],
+                provider_id=row["time_slot__provider_id"],
+                time_slot_id=row["time_slot_id"],
+                slot_date=row["time_slot__date"],
+                slot_start_time=row["time_slot__start_time"],
+                slot_end_time=row["time_slot__end_time"],
+                status=row["status"],
+                created_at=row["created_at"],
+            )
+            for row in rows
+        ], ignore_conflicts=True)
+        Booking.objects.filter(pk__in=[row["pk"] for row in rows]).delete()
+        # os horários continuam em TimeSlot; disponibilidade não muda
+    return len(rows)
+
+
+def archive_slots_batch(cutoff, batch_size):
+    with transaction.atomic():
+        slots = list(_lock_batch(archivable_slots(cutoff), batch_size))
+        if not slots:
+            return 0
+
+        _ensure_partitions(ArchivedTimeSlot, {ts.date for ts in slots})
+        ArchivedTimeSlot.objects.bulk_create([
+            ArchivedTimeSlot(
+                id=ts.pk,
+                provider_id=ts.provider_id,
+                date=ts.date,
+                start_time=ts.start_time,
+                end_time=ts.end_time,
+                is_available=ts.is_available,
+                created_at=ts.created_at,
+            )
+            for ts in slots
+        ], ignore_conflicts=True)
+        # delete() passa pelo Collector: se um agendamento surgiu no meio, ProtectedError desfaz o lote
+        TimeSlot.objects.filter(pk__in=[ts.pk for ts in slots]).delete()
+
+        by_provider = {}
+        for ts in slots:
+            by_provider.setdefault(ts.provider_id, set()).add(ts.date)
+        for provider_id, dates in by_provider.items():
+            index.refresh_days(provider_id, dates)
+    return len(slots)
+
+
+def archive(cutoff, batch_size=1000, max_batches=None, progress=None):
+    """
+    Arquiva tudo que for anterior a cutoff, lote a lote. Agendamentos
+    primeiro: os horários que eles liberam entram no mesmo passe.
+    progress(kind, n) é chamado após cada lote.
+    """
+    result = ArchiveResult()
+    for kind, batch_fn in (("bookings", archive_bookings_batch), ("slots", archive_slots_batch)):
+        while max_batches is None or result.batches < max_batches:
+            n = batch_fn(cutoff, batch_size)
+            if not n:
+                break
+            setattr(result, kind, getattr(result, kind) + n)
+            result.batches += 1
+            if progress:
+                progress(kind, n)
+    return result
+
+
+# -- particionamento (Postgres) ---------------------------------------------
+
+def _is_partitioned(table):
+    if connection.vendor != "postgresql":
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid WHERE c.relname = %s",
+            [table],
+        )
+        return cursor.fetchone() is not None
+
+
+def _month_start(d):
+    return d.replace(day=1)
+
+
+def _next_month(d):
+    return date_type(d.year + d.month // 12, d.month % 12 + 1, 1)
+
+
+def _ensure_partitions(model, dates):
+    """Cria as partições mensais que faltam para as datas (só se a tabela for particionada)."""
+    table = model._meta.db_table
+    if not dates or not _is_partitioned(table):
+        return
+    qn = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        for month in sorted({_month_start(d) for d in dates}):
+            cursor.execute(
+                f"CREATE TABLE IF NOT EXISTS {qn(f'{table}_{month:%Y_%m}')} PARTITION OF {qn(table)} "
+                "FOR VALUES FROM (%s) TO (%s)",
+                [month, _next_month(month)],
+            )
+
+
+def partition_archive_tables():
+    """
+    Converte as tabelas de arquivo em tabelas particionadas por mês (Postgres).
+    A PK passa a ser (id, data), exigência do particionamento; as FKs para o
+    usuário deixam de existir no banco (a exclusão em cascata do Django continua
+    valendo). Retorna as tabelas convertidas.
+    """
+    if connection.vendor != "postgresql":
+        raise PartitioningUnsupported("Particionamento nativo só no Postgres.")
+
+    qn = connection.ops.quote_name
+    converted = []
+    with transaction.atomic(), connection.schema_editor() as editor:
+        for model, column in PARTITIONED_TABLES.items():
+            table = model._meta.db_table
+            if _is_partitioned(table):
+                continue
+            old = f"{table}_unpartitioned"
+            with connection.cursor() as cursor:
+                cursor.execute(f"ALTER TABLE {qn(table)} RENAME TO {qn(old)}")
+                # os nomes dos índices são globais no schema: libera para recriar
+                for idx in model._meta.indexes:
+                    cursor.execute(f"DROP INDEX IF EXISTS {qn(idx.name)}")
+                cursor.execute(
+                    f"CREATE TABLE {qn(table)} (LIKE {qn(old)} INCLUDING DEFAULTS) "
+                    f"PARTITION BY RANGE ({qn(column)})"
+                )
+                cursor.execute(f"ALTER TABLE {qn(table)} ADD PRIMARY KEY ({qn('id')}, {qn(column)})")
+                cursor.execute(f"SELECT DISTINCT date_trunc('month', {qn(column)})::date FROM {qn(old)}")
+                months = [row[0] for row in cursor.fetchall()]
+            _ensure_partitions(model, months)
+            with connection.cursor() as cursor:
+                cursor.execute(f"INSERT INTO {qn(table)} SELECT * FROM {qn(old)}")
+                cursor.execute(f"DROP TABLE {qn(old)}")
+            for idx in model._meta.indexes:
+                editor.add_index(model, idx)
+            converted.append(table)
+    return converted
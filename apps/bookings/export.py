@@ -0,0 +1,120 @@
+"""
+Exportação de agendamentos em CSV ou JSONL, em streaming.
+
+Booking e ArchivedBooking são lidos com .iterator(chunk_size=...) (cursor no
+servidor no Postgres), já ordenados por (data, início, id), e intercalados
+com heapq.merge. Só um bloco de linhas fica em memória de cada vez,
+qualquer que seja o tamanho do histórico. Usado pela view booking_export e
+pelo `manage.py export_bookings`.
+"""
+import csv
+import heapq
+import json
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import ArchivedBooking, Booking
+
+
+FORMATS = {
+    "csv": "text/csv; charset=utf-8",
+    "jsonl": "application/x-ndjson",
+}
+
+FIELDS = ["id", "user", "email", "provider", "date", "start_time", "end_time", "status", "created_at"]
+
+# linhas por pedaço de texto entregue ao StreamingHttpResponse/arquivo
+LINES_PER_CHUNK = 500
+
+
+def _filters(prefix, provider_id, start, end, statuses):
+    filters = {}
+    if provider_id:
+        filters[f"{prefix['provider']}_id"] = provider_id
+    if start:
+        filters[f"{prefix['date']}__gte"] = start
+    if end:
+        filters[f"{prefix['date']}__lte"] = end
+    if statuses:
+        filters["status__in"] = statuses
+    return filters
+
+
+def booking_queryset(provider_id=None, start=None, end=None, statuses=None):
+    fields = {"provider": "time_slot__provider", "date": "time_slot__date"}
+    return (
+        Booking.objects
+        .filter(**_filters(fields, provider_id, start, end, statuses))
+        .order_by("time_slot__date", "time_slot__start_time", "id")
+        .values_list(
+            "id", "user__username", "user__email", "time_slot__provider__username",
+            "time_slot__date", "time_slot__start_time", "time_slot__end_time", "status", "created_at",
+        )
+    )
+
+
+def archived_queryset(provider_id=None, start=None, end=None, statuses=None):
+    fields = {"provider": "provider", "date": "slot_date"}
+    return (
+        ArchivedBooking.objects
+        .filter(**_filters(fields, provider_id, start, end, statuses))
+        .order_by("slot_date", "slot_start_time", "id")
+        .values_list(
+            "id", "user__username", "user__email", "provider__username",
+            "slot_date", "slot_start_time", "slot_end_time", "status", "created_at",
+        )
+    )
+
+
+def format_row(row):
+    """Linha de booking_queryset/archived_queryset com datas e horas em texto."""
+    pk, user, email, provider, d, st, et, status, created_at = row
+    return (
+        pk, user, email, provider, d.isoformat(), st.strftime("%H:%M"), et.strftime("%H:%M"), status,
+        timezone.localtime(created_at).isoformat(timespec="seconds"),
+    )
+
+
+def iter_rows(provider_id=None, start=None, end=None, statuses=None, chunk_size=None):
+    """Tuplas na ordem de FIELDS, ativas e arquivadas intercaladas por (data, início, id)."""
+    chunk_size = chunk_size or settings.BOOKING_EXPORT_CHUNK_SIZE
+    sources = [
+        qs(provider_id, start, end, statuses).iterator(chunk_size=chunk_size)
+        for qs in (booking_queryset, archived_queryset)
+    ]
+    merged = heapq.merge(*sources, key=lambda row: (row[4], row[5], row[0]))
+    return map(format_row, merged)
+
+
+class _Echo:
+    """Arquivo falso para csv.writer: devolve a linha em vez de gravá-la."""
+
+    def write(self, value):
+        return value
+
+
+def _chunked(lines):
+    buffer = []
+    for line in lines:
+        buffer.append(line)
+        if len(buffer) >= LINES_PER_CHUNK:
+            yield "".join(buffer)
+            buffer = []
+    if buffer:
+        yield "".join(buffer)
+
+
+def csv_chunks(rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(FIELDS)
+    yield from _chunked(writer.writerow(row) for row in rows)
+
+
+def jsonl_chunks(rows):
+    yield from _chunked(json.dumps(dict(zip(FIELDS, row)), ensure_ascii=False) + "\n" for row in rows)
+
+
+def export_chunks(fmt, rows):
+    """Pedaços de texto do arquivo no formato pedido ("csv" ou "jsonl")."""
+    return csv_chunks(rows) if fmt == "csv" else jsonl_chunks(rows)
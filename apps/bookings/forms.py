@@ -1,15 +1,32 @@
 from django import forms
 
 from .models import Booking
+from apps.availability import rules
 from apps.availability.models import TimeSlot
 
 
 class BookingForm(forms.ModelForm):
+    # id de um TimeSlot livre ou chave de horário de regra (apps.availability.rules);
+    # a view resolve a chave para um TimeSlot na transação da reserva
+    time_slot = forms.CharField(widget=forms.HiddenInput())
+
     class Meta:
         model = Booking
-        fields = ["time_slot"]
-        widgets = {"time_slot": forms.HiddenInput()}
+        fields = []
+        exclude = ["time_slot"]
+
+    def clean_time_slot(self):
+        ref = self.cleaned_data["time_slot"].strip()
+        if ref.isdigit():
+            ts = TimeSlot.objects.filter(pk=ref, is_available=True).first()
+            if ts is None:
+                raise forms.ValidationError("Este horário não está mais disponível.")
+            return ts
+        if rules.parse_slot_key(ref) is None:
+            raise forms.ValidationError("Selecione um horário válido.")
+        return ref
+
 
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.fields["time_slot"].queryset = TimeSlot.objects.filter(is_available=True)
\ No newline at end of file
+class BookingImportForm(forms.Form):
+    file = forms.FileField(label="Arquivo CSV")
+    dry_run = forms.BooleanField(label="Só validar (dry-run)", required=False, initial=True)
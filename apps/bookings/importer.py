@@ -0,0 +1,309 @@
+"""
+Importação em massa de horários e agendamentos a partir de CSV.
+
+Cada linha é um horário (provider, date, start_time, end_time) e, se tiver
+user, um agendamento nele (status, created_at opcionais). O arquivo de
+export.py pode ser reimportado como está (colunas extras são ignoradas).
+
+O arquivo é lido em streaming e processado em lotes de
+BOOKING_IMPORT_BATCH_SIZE linhas, cada lote em uma transação:
+
+- validação em lote, com um punhado de consultas por lote (usuários, horários
+  existentes, dias bloqueados, agendamentos existentes), contra as mesmas
+  regras das constraints uniq_timeslot_provider_date_start_end e
+  uniq_active_booking_per_timeslot, inclusive entre linhas do próprio arquivo;
+- bulk_create dos horários novos e dos agendamentos, e atualização do índice
+  de disponibilidade e do consolidado do painel dos dias afetados.
+
+Linhas inválidas não interrompem a importação: entram no relatório de erros
+com o número da linha. Com dry_run nada é gravado e o relatório sai igual.
+"""
+import csv
+from dataclasses import dataclass, field
+from datetime import date as date_type, datetime, time as time_type
+from itertools import islice
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, connection, transaction
+from django.utils import timezone
+
+from apps.availability import index
+from apps.availability.models import DayOff, TimeSlot
+from . import analytics
+from .models import Booking
+
+REQUIRED_COLUMNS = ["provider", "date", "start_time", "end_time"]
+OPTIONAL_COLUMNS = ["user", "status", "created_at"]
+
+ACTIVE_STATUSES = ["pending", "confirmed"]
+# agendamentos que ocupam o horário (is_available=False)
+TAKEN_STATUSES = ACTIVE_STATUSES + ["completed"]
+
+# erros guardados no relatório (o total continua sendo contado)
+MAX_REPORTED_ERRORS = 1000
+
+
+class RowError(Exception):
+    """Linha inválida; a mensagem vai para o relatório."""
+
+
+@dataclass
+class ImportResult:
+    dry_run: bool = False
+    rows: int = 0
+    slots_created: int = 0
+    bookings_created: int = 0
+    skipped: int = 0
+    error_count: int = 0
+    # [(linha, mensagem), ...] até MAX_REPORTED_ERRORS
+    errors: list = field(default_factory=list)
+
+    def add_error(self, line, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line, message))
+
+
+@dataclass
+class _Row:
+    line: int
+    provider: str
+    date: date_type
+    start_time: time_type
+    end_time: time_type
+    user: str
+    status: str
+    created_at: datetime
+
+
+def _parse(line, raw, today):
+    try:
+        provider = (raw.get("provider") or "").strip()
+        if not provider:
+            raise RowError("Prestador obrigatório.")
+        d = date_type.fromisoformat((raw.get("date") or "").strip())
+        st = time_type.fromisoformat((raw.get("start_time") or "").strip())
+        et = time_type.fromisoformat((raw.get("end_time") or "").strip())
+    except ValueError:
+        raise RowError("Data ou horário inválido (use AAAA-MM-DD e HH:MM).")
+    if et <= st:
+        raise RowError("O horário final deve ser maior que o inicial.")
+
+    user = (raw.get("user") or "").strip()
+    status = (raw.get("status") or "").strip()
+    created_at = None
+    if user:
+        status = status or ("completed" if d < today else "pending")
+        if status not in {code for code, _label in Booking.STATUS_CHOICES}:
+            raise RowError(f"Status inválido: {status}.")
+        if (raw.get("created_at") or "").strip():
+            try:
+                created_at = datetime.fromisoformat(raw["created_at"].strip())
+            except ValueError:
+                raise RowError("created_at inválido (use ISO 8601).")
+            if timezone.is_naive(created_at):
+                created_at = timezone.make_aware(created_at)
+    elif status:
+        raise RowError("Status informado sem usuário.")
+    return _Row(line, provider, d, st, et, user, status, created_at)
+
+
+class Importer:
+    def __init__(self, dry_run=False, batch_size=None):
+        self.batch_size = batch_size or settings.BOOKING_IMPORT_BATCH_SIZE
+        self.result = ImportResult(dry_run=dry_run)
+        self.today = date_type.today()
+        # username -> (id, is_staff) ou None se não existir
+        self.users = {}
+        # (provider_id, date, início, fim) -> id do TimeSlot (None: criado neste dry-run)
+        self.slots = {}
+        # horários com agendamento ativo (no banco ou já aceito no arquivo)
+        self.active = set()
+        # (horário, user_id, status) no banco ou no arquivo: reimportar não duplica
+        self.bookings_seen = set()
+
+    def run(self, lines):
+        """Importa as linhas de texto do CSV (arquivo aberto, iterável) e devolve o ImportResult."""
+        reader = csv.DictReader(lines)
+        missing = [c for c in REQUIRED_COLUMNS if c not in (reader.fieldnames or [])]
+        if missing:
+            self.result.add_error(1, f"Colunas obrigatórias ausentes: {', '.join(missing)}.")
+            return self.result
+
+        rows = enumerate(reader, start=2)
+        while batch := list(islice(rows, self.batch_size)):
+            self._batch(batch)
+        self.result.errors.sort()
+        return self.result
+
+    def _batch(self, batch):
+        result = self.result
+        result.rows += len(batch)
+        parsed = []
+        for line, raw in batch:
+            try:
+                parsed.append(_parse(line, raw, self.today))
+            except RowError as exc:
+                result.add_error(line, str(exc))
+        if not parsed:
+            return
+
+        self._resolve_users({r.provider for r in parsed} | {r.user for r in parsed if r.user})
+        valid = []
+        for row in parsed:
+            provider, user = self.users.get(row.provider), self.users.get(row.user) if row.user else None
+            if provider is None or not provider[1]:
+                result.add_error(row.line, f"Prestador desconhecido: {row.provider}.")
+            elif row.user and user is None:
+                result.add_error(row.line, f"Usuário desconhecido: {row.user}.")
+            else:
+                valid.append((row, (provider[0], row.date, row.start_time, row.end_time), user and user[0]))
+        blocked = self._load_existing([key for _row, key, _user in valid])
+
+        new_slots, bookings, taken, seen = {}, [], set(), []
+        for row, key, user_id in valid:
+            is_new = key not in self.slots and key not in new_slots
+            if key[:2] in blocked and (is_new or row.status in ACTIVE_STATUSES):
+                result.add_error(row.line, "Dia bloqueado para o prestador.")
+                continue
+            if is_new:
+                new_slots[key] = row
+            elif not row.user:
+                result.skipped += 1  # horário já existe
+                continue
+            if not row.user:
+                continue
+
+            booking_key = (key, user_id, row.status)
+            if booking_key in self.bookings_seen:
+                result.skipped += 1  # agendamento já existe
+                continue
+            if row.status in ACTIVE_STATUSES:
+                if key in self.active:
+                    result.add_error(row.line, "O horário já tem um agendamento ativo.")
+                    continue
+                self.active.add(key)
+            if row.status in TAKEN_STATUSES:
+                taken.add(key)
+            self.bookings_seen.add(booking_key)
+            seen.append(booking_key)
+            bookings.append((row, key, user_id))
+
+        if result.dry_run:
+            for key in new_slots:
+                self.slots[key] = None
+            result.slots_created += len(new_slots)
+            result.bookings_created += len(bookings)
+            return
+
+        try:
+            with transaction.atomic():
+                self._write(new_slots, bookings, taken)
+        except IntegrityError:
+            # outra gravação concorrente venceu alguma constraint: o lote inteiro volta
+            for key in new_slots:
+                self.slots.pop(key, None)
+            for booking_key in seen:
+                self.bookings_seen.discard(booking_key)
+                if booking_key[2] in ACTIVE_STATUSES:
+                    self.active.discard(booking_key[0])
+            lines = sorted({row.line for row in new_slots.values()} | {row.line for row, _key, _user in bookings})
+            for line in lines:
+                result.add_error(line, "Conflito com outra gravação durante a importação; importe de novo.")
+
+    def _resolve_users(self, usernames):
+        missing = [name for name in usernames if name not in self.users]
+        if not missing:
+            return
+        found = get_user_model().objects.filter(username__in=missing).values_list("username", "id", "is_staff")
+        for username, pk, is_staff in found:
+            self.users[username] = (pk, is_staff)
+        for name in missing:
+            self.users.setdefault(name, None)
+
+    def _load_existing(self, keys):
+        """
+        Carrega os horários ainda não vistos destes prestadores/dias e os
+        agendamentos deles. Retorna {(provider_id, date)} bloqueados.
+        """
+        if not keys:
+            return set()
+        unseen = [key for key in keys if key not in self.slots]
+        if unseen:
+            key_by_id = {}
+            for pid, d, st, et, pk in TimeSlot.objects.filter(
+                provider_id__in={key[0] for key in unseen}, date__in={key[1] for key in unseen},
+            ).values_list("provider_id", "date", "start_time", "end_time", "id"):
+                if (pid, d, st, et) not in self.slots:
+                    self.slots[(pid, d, st, et)] = pk
+                    key_by_id[pk] = (pid, d, st, et)
+
+            if key_by_id:
+                for slot_id, user_id, status in Booking.objects.filter(time_slot_id__in=key_by_id).values_list(
+                    "time_slot_id", "user_id", "status",
+                ):
+                    self.bookings_seen.add((key_by_id[slot_id], user_id, status))
+                    if status in ACTIVE_STATUSES:
+                        self.active.add(key_by_id[slot_id])
+
+        return set(
+            DayOff.objects.filter(
+                provider_id__in={key[0] for key in keys}, date__in={key[1] for key in keys},
+            ).values_list("provider_id", "date")
+        )
+
+    def _write(self, new_slots, bookings, taken):
+        result = self.result
+        created = TimeSlot.objects.bulk_create([
+            TimeSlot(provider_id=pid, date=d, start_time=st, end_time=et, is_available=(pid, d, st, et) not in taken)
+            for pid, d, st, et in new_slots
+        ], batch_size=1000)
+        slot_objects = {}
+        for ts in created:
+            key = (ts.provider_id, ts.date, ts.start_time, ts.end_time)
+            self.slots[key] = ts.pk
+            slot_objects[key] = ts
+        result.slots_created += len(created)
+
+        # horários que já existiam e passaram a ter agendamento
+        reused = [self.slots[key] for key in taken if key not in slot_objects]
+        if reused:
+            TimeSlot.objects.filter(pk__in=reused).update(is_available=False)
+
+        objs = []
+        for row, key, user_id in bookings:
+            ts = slot_objects.get(key) or TimeSlot(
+                pk=self.slots[key], provider_id=key[0], date=key[1], start_time=key[2], end_time=key[3],
+            )
+            objs.append(Booking(user_id=user_id, time_slot=ts, status=row.status))
+        objs = Booking.objects.bulk_create(objs, batch_size=1000)
+
+        # created_at é auto_now_add: as datas do arquivo entram depois, em um UPDATE por linha
+        # enviado de uma vez (executemany); um CASE com milhares de ramos custa mais
+        dated = [(obj, row.created_at) for obj, (row, _key, _user) in zip(objs, bookings) if row.created_at]
+        if dated:
+            table, qn = Booking._meta.db_table, connection.ops.quote_name
+            with connection.cursor() as cursor:
+                cursor.executemany(
+                    f"UPDATE {qn(table)} SET {qn('created_at')} = %s WHERE {qn('id')} = %s",
+                    [(connection.ops.adapt_datetimefield_value(created_at), obj.pk) for obj, created_at in dated],
+                )
+            for obj, created_at in dated:
+                obj.created_at = created_at
+        result.bookings_created += len(objs)
+
+        by_provider = {}
+        for pid, d, _st, _et in list(new_slots) + [key for _row, key, _user in bookings]:
+            by_provider.setdefault(pid, set()).add(d)
+        for provider_id, dates in by_provider.items():
+            index.refresh_days(provider_id, dates)
+        if objs:
+            # recalcula o consolidado dos dias do lote a partir das tabelas de origem:
+            # sai mais barato que somar milhares de deltas (analytics.record_booked)
+            dates = [d for _pid, d, _st, _et in (key for _row, key, _user in bookings)]
+            analytics.rebuild(sorted({key[0] for _row, key, _user in bookings}), min(dates), max(dates))
+
+
+def import_csv(lines, dry_run=False, batch_size=None):
+    return Importer(dry_run=dry_run, batch_size=batch_size).run(lines)
@@ -0,0 +1,72 @@
+from datetime import date as date_type, timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import ProtectedError
+
+from apps.availability.models import ArchivedTimeSlot, TimeSlot
+from apps.bookings import archival
+from apps.bookings.models import ArchivedBooking, Booking
+
+
+class Command(BaseCommand):
+    help = (
+        "Move horários passados nunca reservados e agendamentos concluídos/cancelados "
+        "anteriores à janela de retenção para as tabelas de arquivo, em lotes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--retention-days", type=int, default=settings.ARCHIVE_RETENTION_DAYS,
+                            help="Mantém nas tabelas principais os últimos N dias.")
+        parser.add_argument("--batch-size", type=int, default=settings.ARCHIVE_BATCH_SIZE)
+        parser.add_argument("--max-batches", type=int, help="Para após N lotes (execuções curtas via cron).")
+        parser.add_argument("--dry-run", action="store_true", help="Só conta o que seria arquivado.")
+        parser.add_argument("--partition", action="store_true",
+                            help="Postgres: converte as tabelas de arquivo em particionadas por mês.")
+        parser.add_argument("--vacuum", action="store_true", help="Postgres: VACUUM ANALYZE nas tabelas ao final.")
+
+    def handle(self, *args, **opts):
+        if opts["retention_days"] < 1:
+            raise CommandError("--retention-days deve ser pelo menos 1.")
+        cutoff = date_type.today() - timedelta(days=opts["retention_days"])
+
+        if opts["partition"]:
+            try:
+                converted = archival.partition_archive_tables()
+            except archival.PartitioningUnsupported:
+                raise CommandError("--partition só funciona no Postgres.")
+            self.stdout.write(f"Tabelas particionadas: {', '.join(converted) or 'nenhuma (já estavam)'}")
+
+        if opts["dry_run"]:
+            self.stdout.write(
+                f"Anteriores a {cutoff}: {archival.archivable_bookings(cutoff).count()} agendamento(s) e "
+                f"{archival.archivable_slots(cutoff).count()} horário(s) livre(s) seriam arquivados "
+                "(mais os horários liberados pelos agendamentos arquivados)."
+            )
+            return
+
+        before = {"slots": TimeSlot.objects.count(), "bookings": Booking.objects.count()}
+        labels = {"bookings": "agendamento(s)", "slots": "horário(s)"}
+        progress = lambda kind, n: self.stdout.write(f"  lote: {n} {labels[kind]}")  # noqa: E731
+        try:
+            result = archival.archive(cutoff, opts["batch_size"], opts["max_batches"], progress)
+        except ProtectedError:
+            raise CommandError("Um horário do lote ganhou agendamento durante o arquivamento; rode de novo.")
+
+        after = {"slots": TimeSlot.objects.count(), "bookings": Booking.objects.count()}
+        self.stdout.write(self.style.SUCCESS(
+            f"Arquivados (anteriores a {cutoff}, {result.batches} lote(s)): "
+            f"{result.bookings} agendamento(s), {result.slots} horário(s)."
+        ))
+        self.stdout.write(
+            f"TimeSlot: {before['slots']} -> {after['slots']} linhas | "
+            f"Booking: {before['bookings']} -> {after['bookings']} linhas | "
+            f"arquivo: {ArchivedTimeSlot.objects.count()} horários, {ArchivedBooking.objects.count()} agendamentos"
+        )
+
+        if opts["vacuum"] and connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                for model in (TimeSlot, Booking):
+                    cursor.execute(f"VACUUM (ANALYZE) {connection.ops.quote_name(model._meta.db_table)}")
+            self.stdout.write("VACUUM ANALYZE concluído.")
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from apps.bookings import analytics
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcula (ou verifica, com --check) o consolidado diário por prestador (ProviderDailyStats) "
+        "a partir de Booking, ArchivedBooking e do índice de disponibilidade."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--provider", type=int, action="append", dest="providers",
+                            help="Restringe a um prestador (pode repetir).")
+        parser.add_argument("--start", help="Data inicial (YYYY-MM-DD).")
+        parser.add_argument("--end", help="Data final (YYYY-MM-DD).")
+        parser.add_argument("--check", action="store_true",
+                            help="Apenas compara o consolidado com as tabelas de origem; falha se divergir.")
+
+    def handle(self, *args, **opts):
+        start = parse_date(opts["start"]) if opts["start"] else None
+        end = parse_date(opts["end"]) if opts["end"] else None
+
+        if opts["check"]:
+            mismatches = analytics.check(opts["providers"], start, end)
+            for provider_id, d, expected, stored in mismatches[:50]:
+                self.stdout.write(f"prestador={provider_id} data={d} esperado={expected} armazenado={stored}")
+            if mismatches:
+                raise CommandError(f"{len(mismatches)} dia(s) divergente(s) no consolidado.")
+            self.stdout.write(self.style.SUCCESS("Consolidado consistente."))
+            return
+
+        total = analytics.rebuild(opts["providers"], start, end)
+        self.stdout.write(self.style.SUCCESS(f"Consolidado recalculado: {total} linha(s) prestador/dia."))
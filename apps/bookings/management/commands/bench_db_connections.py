@@ -0,0 +1,73 @@
+import json
+import time
+from datetime import date as date_type
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+
+from apps.availability import index
+from apps.availability.management.commands.loadtest_availability import percentile
+
+
+class Command(BaseCommand):
+    help = (
+        "Mede o custo de conexão por requisição: simula o ciclo request_started/request_finished "
+        "com CONN_MAX_AGE=0 (uma conexão por requisição) e com conexões persistentes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=500)
+        parser.add_argument("--max-age", type=int, default=60, help="CONN_MAX_AGE do cenário persistente.")
+        parser.add_argument("--output", help="Grava os resultados em JSON neste arquivo.")
+
+    def handle(self, *args, **opts):
+        original = connection.settings_dict["CONN_MAX_AGE"]
+        results = {}
+        try:
+            for name, max_age in (("por requisição", 0), ("persistente", opts["max_age"])):
+                results[name] = self._run(max_age, opts["requests"])
+        finally:
+            connection.close()
+            connection.settings_dict["CONN_MAX_AGE"] = original
+
+        self.stdout.write(f"banco: {connection.vendor} ({connection.settings_dict['NAME']})")
+        self.stdout.write(f"{'modo':<16}{'CONN_MAX_AGE':>14}{'conexões':>10}{'média ms':>10}{'p50 ms':>10}{'p95 ms':>10}")
+        for name, row in results.items():
+            self.stdout.write(
+                f"{name:<16}{row['conn_max_age']:>14}{row['connections']:>10}{row['mean_ms']:>10.3f}"
+                f"{row['p50_ms']:>10.3f}{row['p95_ms']:>10.3f}"
+            )
+        overhead = results["por requisição"]["mean_ms"] - results["persistente"]["mean_ms"]
+        self.stdout.write(self.style.SUCCESS(f"custo de abrir a conexão: {overhead:.3f} ms por requisição"))
+
+        if opts["output"]:
+            with open(opts["output"], "w") as fh:
+                json.dump({"vendor": connection.vendor, "results": results}, fh, indent=2)
+
+    def _run(self, max_age, total):
+        connection.close()
+        connection.settings_dict["CONN_MAX_AGE"] = max_age
+        today = date_type.today()
+
+        latencies, connections = [], 0
+        for _ in range(total):
+            t0 = time.perf_counter()
+            close_old_connections()  # request_started
+            if connection.connection is None:
+                connections += 1
+            # consultas típicas de uma requisição leve (sessão + API de horários)
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            index.range_stamp(today, today)
+            list(index.day_queryset(today))
+            close_old_connections()  # request_finished
+            latencies.append(time.perf_counter() - t0)
+
+        return {
+            "conn_max_age": max_age,
+            "requests": total,
+            "connections": connections,
+            "mean_ms": sum(latencies) / len(latencies) * 1000,
+            "p50_ms": percentile(latencies, 50) * 1000,
+            "p95_ms": percentile(latencies, 95) * 1000,
+        }
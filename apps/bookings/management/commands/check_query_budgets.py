@@ -0,0 +1,140 @@
+import json
+from datetime import date as date_type, timedelta
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from apps.availability.models import TimeSlot
+from apps.bookings import services
+from config.instrumentation import assert_max_queries
+from .seed_benchmark_data import benchmark_users
+
+
+# orçamento de queries por view (inclui sessão e usuário). Não pode depender
+# do volume de dados: se crescer com o número de linhas, há um N+1.
+QUERY_BUDGETS = {
+    "availability_slots_api": 4,
+    "availability_slots_api (prestador)": 4,
+    "availability_calendar_events": 5,
+    "availability_calendar_events (since)": 5,
+    "availability_calendar_events_stream": 4,
+    "availability_calendar": 5,
+    "availability_schedule": 4,
+    "availability_schedule_rows": 3,
+    "availability_schedule_rows (bloqueios)": 3,
+    "booking_list": 4,
+    "booking_list (status)": 4,
+    "provider_bookings": 4,
+    "provider_stats": 4,
+    "booking_export (csv)": 4,
+    "provider_stats_api": 3,
+    "booking_create (GET)": 2,
+    "booking_create": 18,
+    "booking_cancel": 18,
+    "booking_batch (5 horários)": 19,
+}
+
+
+def budget_cases(provider, client_user):
+    """(nome, preparação fora da medição, requisição medida que recebe o que a preparação devolveu)."""
+    as_client, as_provider = Client(), Client()
+    as_client.force_login(client_user)
+    as_provider.force_login(provider)
+
+    free = TimeSlot.objects.filter(provider=provider, date__gte=date_type.today(), is_available=True)
+    day = free.values_list("date", flat=True).first() or date_type.today()
+    window = {"start": day.isoformat(), "end": (day + timedelta(days=41)).isoformat()}
+
+    def get(client, name, params=None):
+        return lambda _: client.get(reverse(name), params or {})
+
+    def stream(_):
+        response = as_client.get(reverse("availability_calendar_events_stream"), window)
+        return b"".join(response.streaming_content)
+
+    def export(_):
+        response = as_provider.get(reverse("booking_export"), {"status": ["completed", "cancelled"]})
+        return b"".join(response.streaming_content)
+
+    def batch(ids):
+        return as_client.post(
+            reverse("booking_batch"), json.dumps({"action": "book", "slot_ids": ids}),
+            content_type="application/json",
+        )
+
+    none = lambda: None  # noqa: E731
+    return [
+        ("availability_slots_api", none, get(as_client, "availability_slots_api", {"date": day})),
+        ("availability_slots_api (prestador)", none,
+         get(as_client, "availability_slots_api", {"date": day, "provider": provider.pk})),
+        ("availability_calendar_events", none, get(as_client, "availability_calendar_events", window)),
+        ("availability_calendar_events (since)", none,
+         get(as_client, "availability_calendar_events", {**window, "since": 0})),
+        ("availability_calendar_events_stream", none, stream),
+        ("availability_calendar", none, get(as_client, "availability_calendar")),
+        ("availability_schedule", none, get(as_provider, "availability_schedule")),
+        ("availability_schedule_rows", none,
+         get(as_provider, "availability_schedule_rows", {"kind": "slots", "month": f"{day:%Y-%m}"})),
+        ("availability_schedule_rows (bloqueios)", none,
+         get(as_provider, "availability_schedule_rows", {"kind": "dayoffs", "month": f"{day:%Y-%m}"})),
+        ("booking_list", none, get(as_client, "booking_list")),
+        ("booking_list (status)", none, get(as_client, "booking_list", {"status": "completed"})),
+        ("provider_bookings", none, get(as_provider, "provider_bookings")),
+        ("provider_stats", none, get(as_provider, "provider_stats")),
+        ("booking_export (csv)", none, export),
+        ("provider_stats_api", none, get(as_provider, "provider_stats_api")),
+        ("booking_create (GET)", none, get(as_client, "booking_create")),
+        ("booking_create", free.first,
+         lambda ts: as_client.post(reverse("booking_create"), {"time_slot": ts.pk})),
+        ("booking_cancel", lambda: services.book_slot(client_user, free.first()),
+         lambda booking: as_client.post(reverse("booking_cancel", args=[booking.pk]))),
+        ("booking_batch (5 horários)", lambda: list(free.values_list("pk", flat=True)[:5]), batch),
+    ]
+
+
+class Command(BaseCommand):
+    help = (
+        "Verifica o orçamento de queries de cada view sobre os dados do seed_benchmark_data. "
+        "Tudo roda em uma transação desfeita ao final."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--prefix", default="bench", help="Prefixo usado no seed_benchmark_data.")
+        parser.add_argument("--verbose-sql", action="store_true", help="Lista as queries de quem estourar.")
+
+    def handle(self, *args, **opts):
+        providers, clients = benchmark_users(opts["prefix"])
+        provider, client_user = providers.first(), clients.first()
+        if provider is None or client_user is None:
+            raise CommandError(f"Sem dados com o prefixo '{opts['prefix']}'. Rode seed_benchmark_data antes.")
+
+        failures = []
+        self.stdout.write(f"{'view':<40}{'queries':>8}{'orçamento':>11}")
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"]):
+            with transaction.atomic():
+                for name, prepare, call in budget_cases(provider, client_user):
+                    prepared = prepare()
+                    # cache frio: mede o caminho que realmente consulta o banco
+                    caches[settings.AVAILABILITY_CACHE_ALIAS].clear()
+                    budget = QUERY_BUDGETS[name]
+                    try:
+                        with assert_max_queries(budget, name) as stats:
+                            call(prepared)
+                    except AssertionError as exc:
+                        failures.append(name)
+                        if opts["verbose_sql"]:
+                            self.stderr.write(str(exc))
+                    style = self.style.ERROR if name in failures else (lambda s: s)
+                    self.stdout.write(style(f"{name:<40}{stats.count:>8}{budget:>11}"))
+                transaction.set_rollback(True)
+        # o cache pode ter guardado versões que foram desfeitas
+        caches[settings.AVAILABILITY_CACHE_ALIAS].clear()
+
+        if failures:
+            raise CommandError(f"Orçamento de queries estourado: {', '.join(failures)}")
+        self.stdout.write(self.style.SUCCESS("Todas as views dentro do orçamento."))
@@ -0,0 +1,136 @@
+import re
+from datetime import date as date_type, time as time_type, timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import RequestFactory
+
+from apps.availability import dashboard, index, rules
+from apps.availability.views import calendar_days_queryset
+from apps.bookings import export
+from apps.bookings.pagination import keyset_queryset
+from apps.bookings.models import ProviderDailyStats
+from apps.bookings.views import BookingListView, ProviderBookingsView
+
+
+# tabelas quentes que nunca devem ser lidas por varredura completa
+HOT_TABLES = {
+    "availability_timeslot",
+    "availability_dayoff",
+    "availability_dayavailability",
+    "availability_availabilityrule",
+    "bookings_booking",
+    "bookings_providerdailystats",
+    "bookings_archivedbooking",
+}
+
+# leitura pelo índice (ou pela chave primária) de uma tabela
+INDEX_SCAN_PATTERNS = {
+    "sqlite": re.compile(r"\bSEARCH (\w+) USING (?:COVERING )?INDEX"),
+    "postgresql": re.compile(r"(?:Index (?:Only )?Scan(?: Backward)? using \w+|Bitmap Heap Scan) on (\w+)"),
+}
+
+FULL_SCAN_PATTERNS = {
+    # "SCAN tabela" sem índice (SEARCH ... USING INDEX é o esperado)
+    "sqlite": re.compile(r"\bSCAN (\w+)(?! USING (?:COVERING )?INDEX)(?:\s|$)"),
+    "postgresql": re.compile(r"Seq Scan on (\w+)"),
+}
+
+
+def _list_queryset(view_class, user, params):
+    request = RequestFactory().get("/", params)
+    request.user = user
+    view = view_class()
+    view.setup(request)
+    return view.get_queryset()
+
+
+def hot_queries(client=None, provider=None, day=None):
+    """
+    (nome, queryset) de cada consulta quente das views, montadas pelo mesmo
+    código das views. Sem usuários, usa um prestador fictício (pk=1) nos dois papéis.
+    """
+    user = provider or get_user_model()(pk=1, username="plan-check", is_staff=True)
+    client = client or user
+    day = day or date_type.today()
+    start, end = day, day + timedelta(days=41)
+    # borda de página como a dos cursores ?after=/?before= (data, início, id)
+    page_key = (day, time_type(12, 0), 10 ** 9)
+    client_page, provider_page = BookingListView.paginate_by + 1, ProviderBookingsView.paginate_by + 1
+
+    return [
+        ("available_slots_api (todos)", index.day_queryset(day)),
+        ("available_slots_api (prestador)", index.day_queryset(day, provider_id=user.pk)),
+        ("calendar_events_api", calendar_days_queryset(start, end)),
+        ("calendar_events_stream_api (prestador)", calendar_days_queryset(start, end, user.pk)),
+        ("regras de disponibilidade (índice)", rules.rules_for(user.pk, start, end)),
+        ("painel de agenda (resumo mensal)", dashboard.summary_queryset(user.pk, start, end)),
+        ("painel de agenda (horários do mês)", dashboard.rows_queryset(user.pk, "slots", day.replace(day=1))),
+        ("painel de agenda (bloqueios do mês)", dashboard.rows_queryset(user.pk, "dayoffs", day.replace(day=1))),
+        ("BookingListView", _list_queryset(BookingListView, client, {})),
+        ("BookingListView (status)", _list_queryset(BookingListView, client, {"status": "pending"})),
+        ("ProviderBookingsView", _list_queryset(ProviderBookingsView, user, {})),
+        ("ProviderBookingsView (status)", _list_queryset(ProviderBookingsView, user, {"status": "pending"})),
+        ("BookingListView (página seguinte)",
+         keyset_queryset(_list_queryset(BookingListView, client, {}), after_key=page_key)[:client_page]),
+        ("ProviderBookingsView (página seguinte)",
+         keyset_queryset(_list_queryset(ProviderBookingsView, user, {}), after_key=page_key)[:provider_page]),
+        ("ProviderBookingsView (página anterior)",
+         keyset_queryset(_list_queryset(ProviderBookingsView, user, {}), before_key=page_key)[:provider_page]),
+        ("exportação (agendamentos)", export.booking_queryset(user.pk, start, end, ["completed"])),
+        ("exportação (arquivados)", export.archived_queryset(user.pk, start, end, ["completed"])),
+        ("painel de estatísticas (consolidado)",
+         ProviderDailyStats.objects.filter(provider_id=user.pk, date__range=(start, end)).order_by("date")),
+    ]
+
+
+def indexed_tables(plan):
+    """Tabelas quentes lidas por índice no plano."""
+    pattern = INDEX_SCAN_PATTERNS.get(connection.vendor)
+    if pattern is None:
+        return set()
+    return {table for table in pattern.findall(plan) if table in HOT_TABLES}
+
+
+def full_scans(plan):
+    pattern = FULL_SCAN_PATTERNS.get(connection.vendor)
+    if pattern is None:
+        return []
+    return [table for table in pattern.findall(plan) if table in HOT_TABLES]
+
+
+def prefer_indexes():
+    """
+    Dentro de uma transação: com tabelas pequenas o Postgres prefere Seq Scan;
+    aqui interessa saber se existe um índice utilizável para o caminho de acesso.
+    """
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+
+
+class Command(BaseCommand):
+    help = "Captura o EXPLAIN das consultas quentes e falha se alguma fizer varredura completa de tabela."
+
+    def handle(self, *args, **opts):
+        if connection.vendor not in FULL_SCAN_PATTERNS:
+            raise CommandError(f"Banco '{connection.vendor}' não suportado pela verificação de planos.")
+
+        failures = []
+        with transaction.atomic():
+            prefer_indexes()
+
+            for name, qs in hot_queries():
+                plan = qs.explain()
+                scanned = full_scans(plan)
+                if opts["verbosity"] >= 2 or scanned:
+                    self.stdout.write(f"--- {name}\n{plan}\n")
+                if scanned:
+                    failures.append(f"{name}: varredura completa em {', '.join(sorted(set(scanned)))}")
+                else:
+                    self.stdout.write(f"ok  {name}")
+
+        if failures:
+            raise CommandError("Regressão de plano de consulta:\n" + "\n".join(failures))
+        self.stdout.write(self.style.SUCCESS("Todos os planos usam índices."))
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from apps.bookings import export
+from apps.bookings.models import Booking
+
+
+class Command(BaseCommand):
+    help = (
+        "Exporta agendamentos (ativos e arquivados) em CSV ou JSONL, em streaming: "
+        "a memória usada não cresce com o tamanho do histórico."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--format", choices=list(export.FORMATS), default="csv")
+        parser.add_argument("--output", help="Arquivo de saída (padrão: stdout).")
+        parser.add_argument("--provider", type=int, help="Restringe a um prestador.")
+        parser.add_argument("--start", help="Data inicial do horário (YYYY-MM-DD).")
+        parser.add_argument("--end", help="Data final do horário (YYYY-MM-DD).")
+        parser.add_argument("--status", action="append", dest="statuses",
+                            choices=[code for code, _label in Booking.STATUS_CHOICES],
+                            help="Filtra por status (pode repetir).")
+        parser.add_argument("--chunk-size", type=int, help="Linhas lidas do banco por vez.")
+
+    def handle(self, *args, **opts):
+        try:
+            # parse_date devolve None para formato errado e levanta ValueError para data impossível
+            start = parse_date(opts["start"]) if opts["start"] else None
+            end = parse_date(opts["end"]) if opts["end"] else None
+        except ValueError:
+            start = end = None
+        if (opts["start"] and start is None) or (opts["end"] and end is None):
+            raise CommandError("Datas inválidas (use AAAA-MM-DD).")
+
+        rows = export.iter_rows(opts["provider"], start, end, opts["statuses"], opts["chunk_size"])
+        chunks = export.export_chunks(opts["format"], rows)
+        if not opts["output"]:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending="")
+            return
+
+        with open(opts["output"], "w", newline="", encoding="utf-8") as fh:
+            fh.writelines(chunks)
+        self.stderr.write(self.style.SUCCESS(f"Exportação gravada em {opts['output']}."))
@@ -0,0 +1,53 @@
+import csv
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.bookings import importer
+
+# erros mostrados no terminal (o relatório completo vai para --errors)
+SHOWN_ERRORS = 50
+
+
+class Command(BaseCommand):
+    help = (
+        "Importa horários e agendamentos de um CSV (colunas provider, date, start_time, "
+        "end_time e opcionalmente user, status, created_at), em lotes. Linhas já "
+        "importadas são ignoradas; as inválidas vão para o relatório de erros."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Arquivo CSV (UTF-8).")
+        parser.add_argument("--dry-run", action="store_true", help="Só valida, sem gravar nada.")
+        parser.add_argument("--batch-size", type=int, help="Linhas por lote/transação.")
+        parser.add_argument("--errors", help="Grava o relatório de erros (linha, erro) neste CSV.")
+
+    def handle(self, *args, **opts):
+        try:
+            with open(opts["path"], encoding="utf-8-sig", newline="") as fh:
+                result = importer.import_csv(fh, dry_run=opts["dry_run"], batch_size=opts["batch_size"])
+        except OSError as exc:
+            raise CommandError(f"Não foi possível ler {opts['path']}: {exc}")
+        except UnicodeDecodeError:
+            raise CommandError("O arquivo precisa estar em UTF-8.")
+
+        prefix = "[dry-run] " if result.dry_run else ""
+        self.stdout.write(
+            f"{prefix}{result.rows} linhas: {result.slots_created} horários e "
+            f"{result.bookings_created} agendamentos criados, {result.skipped} já existentes, "
+            f"{result.error_count} com erro."
+        )
+        for line, message in result.errors[:SHOWN_ERRORS]:
+            self.stdout.write(f"  linha {line}: {message}")
+        if result.error_count > SHOWN_ERRORS:
+            self.stdout.write(f"  ... e mais {result.error_count - SHOWN_ERRORS} erros.")
+
+        if opts["errors"]:
+            with open(opts["errors"], "w", newline="", encoding="utf-8") as fh:
+                writer = csv.writer(fh)
+                writer.writerow(["line", "error"])
+                writer.writerows(result.errors)
+            self.stdout.write(f"Relatório de erros gravado em {opts['errors']}.")
+        if result.error_count:
+            self.stdout.write(self.style.WARNING("Importação concluída com erros."))
+        else:
+            self.stdout.write(self.style.SUCCESS("Importação concluída."))
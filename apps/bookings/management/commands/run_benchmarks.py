@@ -0,0 +1,304 @@
+import json
+import platform
+import random
+import subprocess
+import time
+from datetime import date as date_type, timedelta
+
+import django
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Max
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.availability.management.commands.loadtest_availability import percentile
+from apps.availability.models import AvailabilityChange, AvailabilityRule, DayAvailability, DayOff, TimeSlot
+from apps.bookings import analytics, services
+from apps.bookings.models import Booking, OutboundEmail, ProviderDailyStats
+from apps.bookings.pagination import encode_cursor
+from .seed_benchmark_data import benchmark_users
+
+
+# geração do ScheduleView em meses bem no futuro, apagados ao final
+GENERATE_FROM_YEAR = 2090
+
+SCENARIOS = [
+    "slots_api",
+    "calendar_events_api",
+    "booking_create",
+    "booking_cancel",
+    "booking_list",
+    "provider_bookings",
+    "schedule_generate",
+]
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=settings.BASE_DIR,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        "Mede vazão e latência (p50/p95/p99) dos caminhos críticos de agendamento e disponibilidade "
+        "sobre os dados do seed_benchmark_data, no banco configurado (SQLite ou Postgres), e grava JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--prefix", default="bench", help="Prefixo usado no seed_benchmark_data.")
+        parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=SCENARIOS)
+        parser.add_argument("--iterations", type=int, default=200, help="Requisições medidas por cenário.")
+        parser.add_argument("--warmup", type=int, default=10, help="Requisições descartadas antes de medir.")
+        parser.add_argument("--generate-iterations", type=int, default=12,
+                            help="Meses gerados no cenário schedule_generate (cada um é um POST).")
+        parser.add_argument("--cold-cache", action="store_true",
+                            help="Limpa o cache de disponibilidade antes de cada requisição das APIs.")
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--output", help="Arquivo JSON de saída (padrão: benchmark-<commit>-<banco>.json).")
+
+    def handle(self, *args, **opts):
+        providers, clients = benchmark_users(opts["prefix"])
+        self.providers, self.clients = list(providers), list(clients)
+        if not self.providers or not self.clients:
+            raise CommandError(f"Sem dados com o prefixo '{opts['prefix']}'. Rode seed_benchmark_data antes.")
+
+        self.opts = opts
+        self.rng = random.Random(opts["seed"])
+        self.today = date_type.today()
+        self.days = sorted(set(
+            TimeSlot.objects.filter(provider__in=self.providers, date__gte=self.today)
+            .values_list("date", flat=True)
+        ))
+        if not self.days:
+            raise CommandError("O seed não tem horários futuros; gere com --months-ahead > 0.")
+
+        # tudo criado pelo benchmark fica acima destes ids e é desfeito ao final
+        self.max_booking_id = Booking.objects.aggregate(m=Max("pk"))["m"] or 0
+        self.max_email_id = OutboundEmail.objects.aggregate(m=Max("pk"))["m"] or 0
+
+        results = {}
+        self.stdout.write(f"{'cenário':<22}{'n':>6}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+                          f"{'queries':>9}{'erros':>7}")
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"]):
+            try:
+                for name in opts["scenarios"]:
+                    results[name] = getattr(self, f"_scenario_{name}")()
+                    self._print_row(name, results[name])
+            finally:
+                self._cleanup()
+
+        report = {"meta": self._meta(), "scenarios": results}
+        output = opts["output"] or f"benchmark-{report['meta']['commit'] or 'local'}-{connection.vendor}.json"
+        with open(output, "w") as fh:
+            json.dump(report, fh, indent=2, default=str)
+        self.stdout.write(self.style.SUCCESS(f"Resultados gravados em {output}"))
+
+    # -- infraestrutura ------------------------------------------------------
+
+    def _client(self, user):
+        client = Client()
+        client.force_login(user)
+        return client
+
+    def _measure(self, requests, expected_status, before_each=None):
+        """
+        Executa requests (lista de callables sem argumento que fazem uma requisição)
+        e retorna as métricas. As primeiras --warmup não entram na conta e a última
+        roda à parte, só para contar as queries.
+        """
+        warmup, measured = requests[:self.opts["warmup"]], requests[self.opts["warmup"]:]
+        for call in warmup:
+            if before_each:
+                before_each()
+            call()
+
+        latencies, errors = [], 0
+        started = time.perf_counter()
+        for call in measured[:-1]:
+            if before_each:
+                before_each()
+            t0 = time.perf_counter()
+            response = call()
+            latencies.append(time.perf_counter() - t0)
+            if response.status_code != expected_status:
+                errors += 1
+        wall = time.perf_counter() - started
+
+        if before_each:
+            before_each()
+        with CaptureQueriesContext(connection) as ctx:
+            measured[-1]()
+
+        to_ms = lambda v: round(v * 1000, 3) if v is not None else None  # noqa: E731
+        return {
+            "iterations": len(latencies),
+            "errors": errors,
+            "seconds": round(wall, 3),
+            "rps": round(len(latencies) / wall, 1) if wall else None,
+            "mean_ms": to_ms(sum(latencies) / len(latencies)) if latencies else None,
+            "p50_ms": to_ms(percentile(latencies, 50)),
+            "p95_ms": to_ms(percentile(latencies, 95)),
+            "p99_ms": to_ms(percentile(latencies, 99)),
+            "queries": len(ctx.captured_queries),
+        }
+
+    def _total(self, iterations=None):
+        return self.opts["warmup"] + (iterations or self.opts["iterations"]) + 1
+
+    def _clear_cache(self):
+        caches[settings.AVAILABILITY_CACHE_ALIAS].clear()
+
+    def _api_before_each(self):
+        return self._clear_cache if self.opts["cold_cache"] else None
+
+    def _print_row(self, name, row):
+        fmt = lambda v: f"{v:.1f}" if v is not None else "-"  # noqa: E731
+        self.stdout.write(
+            f"{name:<22}{row['iterations']:>6}{fmt(row['rps']):>10}{fmt(row['p50_ms']):>10}"
+            f"{fmt(row['p95_ms']):>10}{fmt(row['p99_ms']):>10}{row['queries'] or '-':>9}{row['errors']:>7}"
+        )
+
+    def _meta(self):
+        providers = [p.pk for p in self.providers]
+        return {
+            "commit": _git_commit(),
+            "timestamp": timezone.now().isoformat(),
+            "database": {"vendor": connection.vendor, "name": str(connection.settings_dict["NAME"])},
+            "django": django.get_version(),
+            "python": platform.python_version(),
+            "options": {k: self.opts[k] for k in (
+                "prefix", "iterations", "warmup", "generate_iterations", "cold_cache", "seed",
+            )},
+            "scale": {
+                "providers": len(providers),
+                "clients": len(self.clients),
+                "time_slots": TimeSlot.objects.filter(provider__in=providers).count(),
+                "day_offs": DayOff.objects.filter(provider__in=providers).count(),
+                "bookings": Booking.objects.filter(time_slot__provider__in=providers).count(),
+            },
+        }
+
+    def _free_slots(self, n):
+        slots = list(
+            TimeSlot.objects.filter(provider__in=self.providers, date__gte=self.today, is_available=True)
+            .order_by("?")[:n]
+        )
+        if len(slots) < n:
+            raise CommandError(f"Horários livres insuficientes para {n} reservas; aumente o seed.")
+        return slots
+
+    def _cleanup(self):
+        """Desfaz reservas, e-mails e horários criados pelos cenários."""
+        created = Booking.objects.filter(pk__gt=self.max_booking_id, user__in=self.clients)
+        pairs = set(created.values_list("time_slot__provider_id", "time_slot__date"))
+        slot_ids = list(created.values_list("time_slot_id", flat=True))
+        created.delete()
+        TimeSlot.objects.filter(pk__in=slot_ids).update(is_available=True)
+        services._refresh_index(pairs)
+        # os contadores do consolidado contaram as reservas apagadas acima
+        if pairs:
+            dates = [d for _pid, d in pairs]
+            analytics.rebuild(list({pid for pid, _d in pairs}), min(dates), max(dates))
+        OutboundEmail.objects.filter(pk__gt=self.max_email_id).delete()
+
+        far = date_type(GENERATE_FROM_YEAR, 1, 1)
+        AvailabilityRule.objects.filter(provider=self.providers[0], start_date__gte=far).delete()
+        TimeSlot.objects.filter(provider=self.providers[0], date__gte=far).delete()
+        DayAvailability.objects.filter(provider=self.providers[0], date__gte=far).delete()
+        AvailabilityChange.objects.filter(provider=self.providers[0], date__gte=far).delete()
+        ProviderDailyStats.objects.filter(provider=self.providers[0], date__gte=far).delete()
+
+    # -- cenários ------------------------------------------------------------
+
+    def _scenario_slots_api(self):
+        client = self._client(self.clients[0])
+        url = reverse("availability_slots_api")
+        calls = []
+        for _ in range(self._total()):
+            params = {"date": self.rng.choice(self.days).isoformat()}
+            if self.rng.random() < 0.5:
+                params["provider"] = self.rng.choice(self.providers).pk
+            calls.append(lambda p=params: client.get(url, p))
+        return self._measure(calls, 200, self._api_before_each())
+
+    def _scenario_calendar_events_api(self):
+        client = self._client(self.clients[0])
+        url = reverse("availability_calendar_events")
+        calls = []
+        for _ in range(self._total()):
+            start = self.rng.choice(self.days)
+            params = {"start": start.isoformat(), "end": (start + timedelta(days=42)).isoformat()}
+            calls.append(lambda p=params: client.get(url, p))
+        return self._measure(calls, 200, self._api_before_each())
+
+    def _scenario_booking_create(self):
+        client = self._client(self.clients[0])
+        url = reverse("booking_create")
+        slots = self._free_slots(self._total())
+        calls = [lambda ts=ts: client.post(url, {"time_slot": ts.pk}) for ts in slots]
+        return self._measure(calls, 302)
+
+    def _scenario_booking_cancel(self):
+        user = self.clients[0]
+        client = self._client(user)
+        # reservas preparadas fora da medição
+        bookings = [services.book_slot(user, ts) for ts in self._free_slots(self._total())]
+        calls = [lambda b=b: client.post(reverse("booking_cancel", args=[b.pk])) for b in bookings]
+        return self._measure(calls, 302)
+
+    def _list_calls(self, client, url, qs):
+        """Páginas em profundidades aleatórias: o cursor sai de um booking qualquer da lista."""
+        keys = list(qs.select_related("time_slot").only("pk", "status", "time_slot__date", "time_slot__start_time"))
+        calls = []
+        for _ in range(self._total()):
+            params = {}
+            if self.rng.random() < 0.3:
+                params["status"] = self.rng.choice(services.ACTIVE_STATUSES)
+            if keys and self.rng.random() < 0.8:
+                params["after"] = encode_cursor(self.rng.choice(keys))
+            calls.append(lambda p=params: client.get(url, p))
+        return calls
+
+    def _scenario_booking_list(self):
+        user = self.clients[0]
+        calls = self._list_calls(
+            self._client(user), reverse("booking_list"), Booking.objects.filter(user=user),
+        )
+        return self._measure(calls, 200)
+
+    def _scenario_provider_bookings(self):
+        provider = self.providers[0]
+        calls = self._list_calls(
+            self._client(provider), reverse("provider_bookings"),
+            Booking.objects.filter(time_slot__provider=provider),
+        )
+        return self._measure(calls, 200)
+
+    def _scenario_schedule_generate(self):
+        client = self._client(self.providers[0])
+        url = reverse("availability_schedule")
+        total = self._total(self.opts["generate_iterations"])
+        calls = []
+        for i in range(total):
+            data = {
+                "action": "generate",
+                "month": i % 12 + 1,
+                "year": GENERATE_FROM_YEAR + i // 12,
+                "weekdays": [0, 1, 2, 3, 4, 5],
+                "start_time": "08:00",
+                "end_time": "18:00",
+                "slot_minutes": 30,
+                "break_minutes": 0,
+            }
+            calls.append(lambda d=data: client.post(url, d))
+        return self._measure(calls, 302)
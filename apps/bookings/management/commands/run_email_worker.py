@@ -0,0 +1,34 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from apps.bookings import outbox
+
+
+class Command(BaseCommand):
+    help = "Worker da fila de e-mails (OutboundEmail): envia em lotes, com retentativas e backoff."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Processa a fila até esvaziar e sai.")
+        parser.add_argument("--batch-size", type=int, default=settings.EMAIL_OUTBOX_BATCH_SIZE)
+        parser.add_argument("--threads", type=int, default=settings.EMAIL_OUTBOX_THREADS)
+        parser.add_argument("--interval", type=float, default=settings.EMAIL_OUTBOX_POLL_SECONDS,
+                            help="Segundos de espera quando a fila está vazia.")
+
+    def handle(self, *args, **opts):
+        while True:
+            requeued = outbox.requeue_stale()
+            if requeued:
+                self.stdout.write(f"{requeued} mensagem(ns) presa(s) devolvida(s) à fila.")
+
+            result = outbox.process_batch(opts["batch_size"], opts["threads"])
+            if result.processed:
+                self.stdout.write(
+                    f"enviadas={result.sent} reagendadas={result.retried} falharam={result.failed}"
+                )
+                continue
+
+            if opts["once"]:
+                return
+            time.sleep(opts["interval"])
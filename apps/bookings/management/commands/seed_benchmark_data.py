@@ -0,0 +1,139 @@
+import random
+from datetime import date as date_type, datetime, time as time_type, timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from apps.availability import index
+from apps.availability.generation import BULK_BATCH_SIZE, daterange
+from apps.availability.models import DayOff, TimeSlot
+from apps.bookings import analytics
+from apps.bookings.models import Booking
+
+
+def benchmark_users(prefix):
+    """Prestadores e clientes criados pelo seed (mesmo prefixo usado no run_benchmarks)."""
+    User = get_user_model()
+    providers = User.objects.filter(username__startswith=f"{prefix}-provider-").order_by("pk")
+    clients = User.objects.filter(username__startswith=f"{prefix}-client-").order_by("pk")
+    return providers, clients
+
+
+def clear_benchmark_data(prefix):
+    """Remove usuários do seed e tudo que depende deles (bookings primeiro: FK PROTECT)."""
+    User = get_user_model()
+    users = User.objects.filter(username__startswith=f"{prefix}-")
+    with transaction.atomic():
+        Booking.objects.filter(time_slot__provider__in=users).delete()
+        Booking.objects.filter(user__in=users).delete()
+        return users.delete()[1].get(User._meta.label, 0)
+
+
+class Command(BaseCommand):
+    help = (
+        "Gera dados sintéticos para benchmark: prestadores, meses de horários, dias bloqueados "
+        "e histórico de agendamentos, em escala configurável. Usado pelo run_benchmarks."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--prefix", default="bench", help="Prefixo dos usernames criados.")
+        parser.add_argument("--providers", type=int, default=5)
+        parser.add_argument("--clients", type=int, default=50)
+        parser.add_argument("--months-ahead", type=int, default=3, help="Meses de agenda futura.")
+        parser.add_argument("--months-back", type=int, default=3, help="Meses de histórico passado.")
+        parser.add_argument("--slot-minutes", type=int, default=60)
+        parser.add_argument("--dayoff-rate", type=float, default=0.05, help="Fração de dias bloqueados.")
+        parser.add_argument("--booking-rate", type=float, default=0.3, help="Fração de horários futuros reservados.")
+        parser.add_argument("--history-rate", type=float, default=0.6, help="Fração de horários passados com booking.")
+        parser.add_argument("--seed", type=int, default=42, help="Semente do gerador aleatório (reprodutível).")
+        parser.add_argument("--reset", action="store_true", help="Apaga os dados do prefixo antes de gerar.")
+
+    def handle(self, *args, **opts):
+        prefix = opts["prefix"]
+        if opts["reset"]:
+            removed = clear_benchmark_data(prefix)
+            self.stdout.write(f"{removed} usuário(s) anteriores removidos.")
+        elif get_user_model().objects.filter(username__startswith=f"{prefix}-").exists():
+            raise CommandError(f"Já existem dados com o prefixo '{prefix}'. Use --reset.")
+
+        rng = random.Random(opts["seed"])
+        today = date_type.today()
+        start = today - timedelta(days=30 * opts["months_back"])
+        end = today + timedelta(days=30 * opts["months_ahead"])
+
+        with transaction.atomic():
+            providers, clients = self._create_users(prefix, opts["providers"], opts["clients"])
+            counts = self._create_schedule(rng, providers, clients, start, end, today, opts)
+            index.rebuild(provider_ids=[p.pk for p in providers])
+            analytics.rebuild(provider_ids=[p.pk for p in providers])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(providers)} prestadores, {len(clients)} clientes, {counts['slots']} horários, "
+            f"{counts['dayoffs']} dias bloqueados, {counts['bookings']} agendamentos ({start} a {end})."
+        ))
+
+    def _create_users(self, prefix, n_providers, n_clients):
+        User = get_user_model()
+        users = [User(username=f"{prefix}-provider-{i}", is_staff=True) for i in range(n_providers)]
+        users += [
+            User(username=f"{prefix}-client-{i}", email=f"{prefix}-client-{i}@example.com")
+            for i in range(n_clients)
+        ]
+        for user in users:
+            user.set_unusable_password()
+        User.objects.bulk_create(users, batch_size=BULK_BATCH_SIZE)
+        providers, clients = benchmark_users(prefix)
+        return list(providers), list(clients)
+
+    def _create_schedule(self, rng, providers, clients, start, end, today, opts):
+        if not clients:
+            raise CommandError("Informe ao menos um cliente (--clients).")
+
+        step = timedelta(minutes=opts["slot_minutes"])
+        day_start, day_end = time_type(8, 0), time_type(18, 0)
+
+        slots, dayoffs, plan = [], [], {}
+        for provider in providers:
+            for d in daterange(start, end):
+                if d.weekday() == 6:
+                    continue
+                blocked = rng.random() < opts["dayoff_rate"]
+                if blocked:
+                    dayoffs.append(DayOff(provider=provider, date=d, reason="benchmark"))
+
+                cursor = datetime.combine(d, day_start)
+                while cursor + step <= datetime.combine(d, day_end):
+                    st, et = cursor.time(), (cursor + step).time()
+                    status = None
+                    if not blocked:
+                        rate = opts["history_rate"] if d < today else opts["booking_rate"]
+                        if rng.random() < rate:
+                            if d < today:
+                                status = rng.choices(["completed", "cancelled"], weights=[4, 1])[0]
+                            else:
+                                status = rng.choices(["pending", "confirmed", "cancelled"], weights=[2, 3, 1])[0]
+                    if status:
+                        plan[(provider.pk, d, st)] = (rng.choice(clients), status)
+                    slots.append(TimeSlot(
+                        provider=provider, date=d, start_time=st, end_time=et,
+                        # cancelados liberam o horário; concluídos/ativos não
+                        is_available=not blocked and status in (None, "cancelled"),
+                    ))
+                    cursor += step
+
+        TimeSlot.objects.bulk_create(slots, batch_size=BULK_BATCH_SIZE)
+        DayOff.objects.bulk_create(dayoffs, batch_size=BULK_BATCH_SIZE)
+
+        slot_ids = TimeSlot.objects.filter(
+            provider__in=providers, date__range=(start, end),
+        ).values_list("pk", "provider_id", "date", "start_time")
+        bookings = []
+        for pk, provider_id, d, st in slot_ids.iterator(chunk_size=BULK_BATCH_SIZE):
+            planned = plan.get((provider_id, d, st))
+            if planned:
+                client, status = planned
+                bookings.append(Booking(user=client, time_slot_id=pk, status=status))
+        Booking.objects.bulk_create(bookings, batch_size=BULK_BATCH_SIZE)
+
+        return {"slots": len(slots), "dayoffs": len(dayoffs), "bookings": len(bookings)}
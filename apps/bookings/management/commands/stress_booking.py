@@ -0,0 +1,85 @@
+import threading
+import time
+from collections import Counter
+from datetime import date as date_type, time as time_type, timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, connection
+
+from apps.availability import index
+from apps.availability.models import TimeSlot
+from apps.bookings import services
+from apps.bookings.models import Booking
+
+
+class Command(BaseCommand):
+    help = (
+        "Dispara muitas reservas paralelas no mesmo horário e verifica que exatamente uma vence. "
+        "Precisa de um banco em arquivo/servidor (não funciona com SQLite em memória)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--attempts", type=int, default=50, help="Reservas simultâneas.")
+        parser.add_argument("--rounds", type=int, default=5, help="Quantos horários disputar.")
+        parser.add_argument("--engine", choices=list(services.BOOKING_ENGINES), default="optimistic")
+
+    def handle(self, *args, **opts):
+        User = get_user_model()
+        tag = f"stress-{time.monotonic_ns()}"
+        provider = User.objects.create(username=f"{tag}-provider", is_staff=True)
+        clients = [User(username=f"{tag}-client-{i}") for i in range(opts["attempts"])]
+        User.objects.bulk_create(clients)
+        clients = list(User.objects.filter(username__startswith=f"{tag}-client-"))
+
+        day = date_type.today() + timedelta(days=365 * 5)
+        failures = []
+        try:
+            for n in range(opts["rounds"]):
+                slot = TimeSlot.objects.create(
+                    provider=provider, date=day, start_time=time_type(8 + n, 0), end_time=time_type(8 + n, 30),
+                )
+                outcomes = self._race(slot, clients, opts["engine"])
+                winners = Booking.objects.filter(time_slot=slot, status__in=services.ACTIVE_STATUSES).count()
+                slot.refresh_from_db()
+
+                self.stdout.write(f"rodada {n + 1}: {dict(outcomes)} | bookings ativos={winners}")
+                if winners != 1 or outcomes["booked"] != 1 or slot.is_available:
+                    failures.append(n + 1)
+        finally:
+            Booking.objects.filter(time_slot__provider=provider).delete()
+            TimeSlot.objects.filter(provider=provider).delete()
+            index.refresh_days(provider.pk, [day])
+            User.objects.filter(username__startswith=tag).delete()
+
+        if failures:
+            raise CommandError(f"Rodadas com resultado inválido: {failures}")
+        self.stdout.write(self.style.SUCCESS("Exatamente uma reserva venceu em todas as rodadas."))
+
+    def _race(self, slot, clients, engine):
+        barrier = threading.Barrier(len(clients))
+        outcomes = Counter()
+        lock = threading.Lock()
+
+        def attempt(user):
+            try:
+                barrier.wait()
+                services.book_slot(user, slot, engine=engine)
+                result = "booked"
+            except services.SlotUnavailable:
+                result = "unavailable"
+            except DatabaseError as exc:
+                # ex.: "database is locked" se o SQLite não usar o perfil de
+                # config.settings (BEGIN IMMEDIATE + busy timeout)
+                result = f"db_error:{type(exc).__name__}"
+            finally:
+                connection.close()
+            with lock:
+                outcomes[result] += 1
+
+        threads = [threading.Thread(target=attempt, args=(u,)) for u in clients]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        return outcomes
@@ -0,0 +1,24 @@
+# Generated by Django 5.1.1 on 2026-10-18 19:48
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('availability', '0005_hot_lookup_indexes'),
+        ('bookings', '0002_alter_booking_options_remove_booking_notes_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['time_slot', 'status'], name='idx_booking_slot_status'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['user', 'status'], name='idx_booking_user_status'),
+        ),
+    ]
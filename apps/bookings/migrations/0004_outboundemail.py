@@ -0,0 +1,35 @@
+# Generated by Django 5.1.1 on 2026-10-18 19:53
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0003_hot_lookup_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboundEmail',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('recipients', models.JSONField(default=list, verbose_name='Destinatários')),
+                ('subject', models.CharField(max_length=255, verbose_name='Assunto')),
+                ('body', models.TextField(verbose_name='Mensagem')),
+                ('status', models.CharField(choices=[('pending', 'Pendente'), ('sending', 'Enviando'), ('sent', 'Enviado'), ('failed', 'Falhou')], default='pending', max_length=20)),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='Tentativas')),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Próxima tentativa')),
+                ('claim_token', models.UUIDField(blank=True, editable=False, null=True)),
+                ('claimed_at', models.DateTimeField(blank=True, editable=False, null=True)),
+                ('last_error', models.TextField(blank=True, verbose_name='Último erro')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('sent_at', models.DateTimeField(blank=True, null=True, verbose_name='Enviado em')),
+            ],
+            options={
+                'ordering': ['next_attempt_at', 'id'],
+                'indexes': [models.Index(fields=['status', 'next_attempt_at'], name='idx_outbox_status_next')],
+            },
+        ),
+    ]
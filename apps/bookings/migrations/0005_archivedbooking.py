@@ -0,0 +1,35 @@
+# Generated by Django 5.1.1 on 2026-10-18 20:05
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0004_outboundemail'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedBooking',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('time_slot_id', models.BigIntegerField(verbose_name='Horário (id)')),
+                ('slot_date', models.DateField(verbose_name='Data')),
+                ('slot_start_time', models.TimeField(verbose_name='Horário Início')),
+                ('slot_end_time', models.TimeField(verbose_name='Horário Fim')),
+                ('status', models.CharField(choices=[('pending', 'Pendente'), ('confirmed', 'Confirmado'), ('cancelled', 'Cancelado'), ('completed', 'Concluído')], max_length=20)),
+                ('created_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True, verbose_name='Arquivado em')),
+                ('provider', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Prestador')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Cliente')),
+            ],
+            options={
+                'ordering': ['-slot_date', '-slot_start_time'],
+                'indexes': [models.Index(fields=['user', 'slot_date'], name='idx_archivedbooking_user_date'), models.Index(fields=['provider', 'slot_date'], name='idx_archivedbooking_prov_date')],
+            },
+        ),
+    ]
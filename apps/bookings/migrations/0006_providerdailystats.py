@@ -0,0 +1,34 @@
+# Generated by Django 5.1.1 on 2026-10-18 20:29
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0005_archivedbooking'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProviderDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Data')),
+                ('slots_free', models.IntegerField(default=0, verbose_name='Horários livres')),
+                ('booked', models.IntegerField(default=0, verbose_name='Agendados')),
+                ('cancelled', models.IntegerField(default=0, verbose_name='Cancelados')),
+                ('completed', models.IntegerField(default=0, verbose_name='Concluídos')),
+                ('lead_minutes', models.BigIntegerField(default=0, verbose_name='Antecedência total (min)')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('provider', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Prestador')),
+            ],
+            options={
+                'ordering': ['date', 'provider'],
+                'constraints': [models.UniqueConstraint(fields=('provider', 'date'), name='uniq_providerdailystats_provider_date')],
+            },
+        ),
+    ]
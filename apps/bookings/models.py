@@ -1,6 +1,7 @@
 from django.db import models
 from django.conf import settings
 from django.db.models import Q
+from django.utils import timezone
 
 from apps.availability.models import TimeSlot
 
@@ -38,6 +39,112 @@ class Booking(models.Model):
                 name="uniq_active_booking_per_timeslot",
             ),
         ]
+        indexes = [
+            models.Index(fields=["time_slot", "status"], name="idx_booking_slot_status"),
+            models.Index(fields=["user", "status"], name="idx_booking_user_status"),
+        ]
+
+    def __str__(self):
+        return f"{self.user} - {self.time_slot} ({self.status})"
+
+
+class OutboundEmail(models.Model):
+    """
+    Fila durável de e-mails: views só enfileiram, e o worker
+    (`manage.py run_email_worker`) envia, reenvia com backoff e registra o status.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pendente'),
+        ('sending', 'Enviando'),
+        ('sent', 'Enviado'),
+        ('failed', 'Falhou'),
+    ]
+
+    recipients = models.JSONField('Destinatários', default=list)
+    subject = models.CharField('Assunto', max_length=255)
+    body = models.TextField('Mensagem')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField('Tentativas', default=0)
+    next_attempt_at = models.DateTimeField('Próxima tentativa', default=timezone.now)
+    claim_token = models.UUIDField(null=True, blank=True, editable=False)
+    claimed_at = models.DateTimeField(null=True, blank=True, editable=False)
+    last_error = models.TextField('Último erro', blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField('Enviado em', null=True, blank=True)
+
+    class Meta:
+        ordering = ["next_attempt_at", "id"]
+        indexes = [
+            models.Index(fields=["status", "next_attempt_at"], name="idx_outbox_status_next"),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} -> {', '.join(self.recipients)} ({self.status})"
+
+
+class ArchivedBooking(models.Model):
+    """
+    Agendamento concluído/cancelado antigo, movido de Booking pelo
+    `manage.py archive_old_rows` (mesmo id do original). Guarda os dados do
+    horário, que pode ter sido arquivado também.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="+", verbose_name="Cliente"
+    )
+    provider = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="+", verbose_name="Prestador"
+    )
+    time_slot_id = models.BigIntegerField("Horário (id)")
+    slot_date = models.DateField("Data")
+    slot_start_time = models.TimeField("Horário Início")
+    slot_end_time = models.TimeField("Horário Fim")
+    status = models.CharField(max_length=20, choices=Booking.STATUS_CHOICES)
+    created_at = models.DateTimeField()
+    archived_at = models.DateTimeField("Arquivado em", auto_now_add=True)
+
+    class Meta:
+        ordering = ["-slot_date", "-slot_start_time"]
+        indexes = [
+            models.Index(fields=["user", "slot_date"], name="idx_archivedbooking_user_date"),
+            models.Index(fields=["provider", "slot_date"], name="idx_archivedbooking_prov_date"),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} - {self.slot_date} {self.slot_start_time} ({self.status}, arquivado)"
+
+
+class ProviderDailyStats(models.Model):
+    """
+    Consolidado diário de um prestador (por data do horário), mantido de forma
+    incremental por apps.bookings.analytics a cada mudança de agendamento e a
+    cada atualização do índice de disponibilidade; pode ser recalculado com
+    `manage.py backfill_provider_stats`.
+    """
+    provider = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="+", verbose_name="Prestador"
+    )
+    date = models.DateField("Data")
+    # horários livres no índice (congelado depois que o dia passa)
+    slots_free = models.IntegerField("Horários livres", default=0)
+    # agendamentos feitos para o dia (inclusive os cancelados depois)
+    booked = models.IntegerField("Agendados", default=0)
+    cancelled = models.IntegerField("Cancelados", default=0)
+    completed = models.IntegerField("Concluídos", default=0)
+    # soma da antecedência (criação -> início do horário) dos agendamentos, em minutos
+    lead_minutes = models.BigIntegerField("Antecedência total (min)", default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["date", "provider"]
+        constraints = [
+            models.UniqueConstraint(fields=["provider", "date"], name="uniq_providerdailystats_provider_date"),
+        ]
+
+    @property
+    def slots_offered(self):
+        # livres + ocupados (ativos e concluídos); um cancelado libera o horário de volta
+        return self.slots_free + self.booked - self.cancelled
 
     def __str__(self):
-        return f"{self.user} - {self.time_slot} ({self.status})"
\ No newline at end of file
+        return f"{self.date} ({self.provider_id}): {self.booked} agendado(s)"
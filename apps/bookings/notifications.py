@@ -0,0 +1,40 @@
+"""
+E-mails de agendamento. Nada é enviado aqui: as mensagens vão para a fila
+(OutboundEmail) e o worker `manage.py run_email_worker` faz a entrega.
+"""
+from . import outbox
+
+
+def _slot_lines(slots):
+    return "\n".join(f"- {d} às {start}" for d, start in sorted(slots))
+
+
+def send_booking_confirmation(booking):
+    outbox.enqueue(
+        subject="Confirmação de agendamento",
+        body=f"Seu agendamento foi criado para {booking.time_slot.date} às {booking.time_slot.start_time}.",
+        recipients=[booking.user.email],
+    )
+
+
+def send_batch_confirmation(user, bookings):
+    """Um único e-mail listando todos os horários reservados no lote."""
+    if not bookings:
+        return
+    outbox.enqueue(
+        subject="Confirmação de agendamentos",
+        body="Seus agendamentos foram criados para:\n"
+        + _slot_lines((b.time_slot.date, b.time_slot.start_time) for b in bookings),
+        recipients=[user.email],
+    )
+
+
+def send_cancellation(user, slots):
+    """Aviso de cancelamento; slots é uma lista de (date, start_time)."""
+    if not slots:
+        return
+    outbox.enqueue(
+        subject="Cancelamento de agendamento" if len(slots) == 1 else "Cancelamento de agendamentos",
+        body="Os seguintes agendamentos foram cancelados:\n" + _slot_lines(slots),
+        recipients=[user.email],
+    )
@@ -0,0 +1,136 @@
+"""
+Envio assíncrono dos e-mails enfileirados em OutboundEmail.
+
+process_batch() reivindica um lote de mensagens pendentes (várias instâncias
+do worker podem rodar ao mesmo tempo), envia em paralelo em um pool de
+threads, cada uma reaproveitando uma única conexão SMTP para o seu pedaço do
+lote, e grava o resultado: enviado, nova tentativa com backoff exponencial
+ou falha definitiva após EMAIL_OUTBOX_MAX_ATTEMPTS.
+"""
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.utils import timezone
+
+from .models import OutboundEmail
+
+
+@dataclass
+class BatchResult:
+    sent: int = 0
+    retried: int = 0
+    failed: int = 0
+
+    @property
+    def processed(self):
+        return self.sent + self.retried + self.failed
+
+
+def enqueue(subject, body, recipients):
+    recipients = [r for r in recipients if r]
+    if not recipients:
+        return None
+    return OutboundEmail.objects.create(subject=subject, body=body, recipients=recipients)
+
+
+def requeue_stale(older_than=None):
+    """Devolve para a fila mensagens presas em 'sending' (worker que morreu no meio)."""
+    older_than = older_than or timedelta(seconds=settings.EMAIL_OUTBOX_CLAIM_TIMEOUT)
+    return OutboundEmail.objects.filter(
+        status="sending", claimed_at__lt=timezone.now() - older_than,
+    ).update(status="pending", claim_token=None, claimed_at=None)
+
+
+def claim(batch_size):
+    """Marca até batch_size mensagens pendentes como 'sending' para este worker."""
+    now = timezone.now()
+    candidate_ids = list(
+        OutboundEmail.objects.filter(status="pending", next_attempt_at__lte=now)
+        .order_by("next_attempt_at", "id")
+        .values_list("id", flat=True)[:batch_size]
+    )
+    if not candidate_ids:
+        return []
+
+    token = uuid.uuid4()
+    # só fica com as que ainda estavam pendentes (outro worker pode ter pego algumas)
+    OutboundEmail.objects.filter(pk__in=candidate_ids, status="pending").update(
+        status="sending", claim_token=token, claimed_at=now,
+    )
+    return list(OutboundEmail.objects.filter(claim_token=token, status="sending"))
+
+
+def _send_chunk(messages):
+    """Envia um pedaço do lote por uma única conexão; retorna [(id, erro ou None)]."""
+    results = []
+    connection = get_connection(fail_silently=False)
+    try:
+        connection.open()
+        for msg in messages:
+            email = EmailMessage(
+                subject=msg.subject, body=msg.body, to=msg.recipients, connection=connection,
+            )
+            try:
+                email.send()
+                results.append((msg.pk, None))
+            except Exception as exc:  # noqa: BLE001 - qualquer falha vira nova tentativa
+                results.append((msg.pk, f"{type(exc).__name__}: {exc}"))
+    except Exception as exc:  # noqa: BLE001 - falha ao conectar afeta o pedaço inteiro
+        done = {pk for pk, _ in results}
+        results += [(msg.pk, f"{type(exc).__name__}: {exc}") for msg in messages if msg.pk not in done]
+    finally:
+        try:
+            connection.close()
+        except Exception:  # noqa: BLE001
+            pass
+    return results
+
+
+def _backoff(attempts):
+    return timedelta(seconds=settings.EMAIL_OUTBOX_BACKOFF_SECONDS * 2 ** (attempts - 1))
+
+
+def process_batch(batch_size=None, threads=None):
+    batch_size = batch_size or settings.EMAIL_OUTBOX_BATCH_SIZE
+    threads = threads or settings.EMAIL_OUTBOX_THREADS
+
+    messages = claim(batch_size)
+    result = BatchResult()
+    if not messages:
+        return result
+
+    chunks = [messages[i::threads] for i in range(threads) if messages[i::threads]]
+    with ThreadPoolExecutor(max_workers=len(chunks)) as pool:
+        outcomes = [item for chunk_result in pool.map(_send_chunk, chunks) for item in chunk_result]
+
+    # gravação no banco fica na thread principal
+    by_id = {msg.pk: msg for msg in messages}
+    now = timezone.now()
+    sent_ids = []
+    for pk, error in outcomes:
+        if error is None:
+            sent_ids.append(pk)
+            continue
+
+        msg = by_id[pk]
+        msg.attempts += 1
+        msg.last_error = error
+        msg.claim_token = None
+        if msg.attempts >= settings.EMAIL_OUTBOX_MAX_ATTEMPTS:
+            msg.status = "failed"
+            result.failed += 1
+        else:
+            msg.status = "pending"
+            msg.next_attempt_at = now + _backoff(msg.attempts)
+            result.retried += 1
+        msg.save(update_fields=["attempts", "last_error", "claim_token", "status", "next_attempt_at"])
+
+    if sent_ids:
+        result.sent = OutboundEmail.objects.filter(pk__in=sent_ids).update(
+            status="sent", sent_at=now, claim_token=None, last_error="",
+        )
+    return result
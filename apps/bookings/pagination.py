@@ -0,0 +1,157 @@
+"""
+Paginação por cursor (keyset) das listas de agendamentos.
+
+Em vez de OFFSET, cada página pede as linhas depois/antes da chave
+(data, início, id) da borda da página atual, então o custo não cresce com
+a profundidade. A ordem segue -time_slot__date, -time_slot__start_time, -id.
+"""
+import base64
+import binascii
+import json
+from dataclasses import dataclass
+from datetime import date as date_type, time as time_type
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import Q
+
+ORDERING = ("-time_slot__date", "-time_slot__start_time", "-id")
+
+
+def encode_cursor(booking):
+    """Cursor opaco com a chave de ordenação de um booking (time_slot já carregado)."""
+    raw = f"{booking.time_slot.date.isoformat()}|{booking.time_slot.start_time.isoformat()}|{booking.pk}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(value):
+    """(date, time, id) ou None se o cursor for inválido."""
+    try:
+        raw = base64.urlsafe_b64decode(value + "=" * (-len(value) % 4)).decode()
+        d, t, pk = raw.split("|")
+        return date_type.fromisoformat(d), time_type.fromisoformat(t), int(pk)
+    except (ValueError, binascii.Error, UnicodeDecodeError):
+        return None
+
+
+def _before(key):
+    """Linhas que vêm depois de key na ordem decrescente (mais antigas)."""
+    d, t, pk = key
+    # o filtro redundante de data permite ao banco buscar por faixa no índice
+    return Q(time_slot__date__lte=d) & (
+        Q(time_slot__date__lt=d)
+        | Q(time_slot__date=d, time_slot__start_time__lt=t)
+        | Q(time_slot__date=d, time_slot__start_time=t, id__lt=pk)
+    )
+
+
+def _after(key):
+    """Linhas que vêm antes de key na ordem decrescente (mais recentes)."""
+    d, t, pk = key
+    return Q(time_slot__date__gte=d) & (
+        Q(time_slot__date__gt=d)
+        | Q(time_slot__date=d, time_slot__start_time__gt=t)
+        | Q(time_slot__date=d, time_slot__start_time=t, id__gt=pk)
+    )
+
+
+def keyset_queryset(qs, after_key=None, before_key=None):
+    """
+    qs na ordem da lista, restrito às linhas depois de after_key ou, com
+    before_key, às linhas antes dele em ordem invertida (a mais próxima primeiro).
+    """
+    qs = qs.order_by(*ORDERING)
+    if before_key:
+        return qs.filter(_after(before_key)).reverse()
+    if after_key:
+        return qs.filter(_before(after_key))
+    return qs
+
+
+def count_label(qs, cap=None):
+    """
+    Total para exibição sem COUNT(*) sobre o join inteiro: estimativa do
+    planner no Postgres, COUNT limitado a cap+1 linhas nos demais bancos.
+    Retorna None com cap=0 (contagem desligada).
+    """
+    cap = settings.BOOKING_LIST_COUNT_CAP if cap is None else cap
+    if not cap:
+        return None
+
+    qs = qs.order_by()
+    connection = connections[qs.db]
+    if connection.vendor == "postgresql":
+        sql, params = qs.query.get_compiler(using=qs.db).as_sql()
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        estimate = int(plan[0]["Plan"]["Plan Rows"])
+        # estimativas pequenas não compensam: conta de verdade
+        if estimate > cap:
+            return f"cerca de {estimate} agendamentos"
+
+    n = qs.values("pk")[:cap + 1].count()
+    return f"mais de {cap} agendamentos" if n > cap else f"{n} agendamento(s)"
+
+
+@dataclass
+class KeysetPage:
+    object_list: list
+    has_next: bool
+    has_previous: bool
+    next_cursor: str = ""
+    previous_cursor: str = ""
+    total_label: str = None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+def paginate(qs, page_size, after=None, before=None):
+    """
+    Uma página de qs (já filtrado) a partir dos parâmetros ?after=/?before=.
+    Busca page_size + 1 linhas para saber se existe próxima página.
+    """
+    after_key = decode_cursor(after) if after else None
+    before_key = decode_cursor(before) if before else None
+    qs = keyset_queryset(qs, after_key, before_key)
+
+    if before_key:
+        # voltando: pega as mais próximas acima do cursor e reverte
+        rows = list(qs[:page_size + 1])
+        has_previous = len(rows) > page_size
+        rows = rows[:page_size][::-1]
+        has_next = True
+    else:
+        rows = list(qs[:page_size + 1])
+        has_next = len(rows) > page_size
+        rows = rows[:page_size]
+        has_previous = after_key is not None
+
+    return KeysetPage(
+        object_list=rows,
+        has_next=has_next and bool(rows),
+        has_previous=has_previous and bool(rows),
+        next_cursor=encode_cursor(rows[-1]) if rows else "",
+        previous_cursor=encode_cursor(rows[0]) if rows else "",
+    )
+
+
+class KeysetPaginationMixin:
+    """
+    Substitui o paginador por OFFSET de ListView. O template recebe page_obj
+    (KeysetPage), is_paginated e total_label; os links usam ?after= e ?before=.
+    """
+
+    def paginate_queryset(self, queryset, page_size):
+        page = paginate(
+            queryset, page_size,
+            after=self.request.GET.get("after"), before=self.request.GET.get("before"),
+        )
+        page.total_label = count_label(queryset)
+        return None, page, page.object_list, page.has_next or page.has_previous
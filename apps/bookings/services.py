@@ -0,0 +1,215 @@
+from django.conf import settings
+from django.db import IntegrityError, transaction
+
+from apps.availability import index, rules
+from apps.availability.models import TimeSlot
+from . import analytics
+from .models import Booking
+
+
+ACTIVE_STATUSES = ["pending", "confirmed"]
+
+# As escritas abaixo abrem a transação sem savepoint: chamadas de dentro de
+# outra (as views, com a fila de e-mail), um erro desfaz a de quem chamou.
+
+
+class SlotUnavailable(Exception):
+    """O horário não pode mais ser reservado; a mensagem vai para o formulário."""
+
+
+class BatchConflict(Exception):
+    """Outra transação alterou os horários do lote entre a checagem e a gravação."""
+
+
+def book_slot_locking(user, time_slot):
+    """
+    Reserva com lock de linha: SELECT ... FOR UPDATE no horário, checagem de
+    booking ativo e só então o UPDATE.
+    """
+    with transaction.atomic(savepoint=False):
+        ts = TimeSlot.objects.select_for_update().get(pk=time_slot.pk)
+
+        if not ts.is_available:
+            raise SlotUnavailable("Este horário não está mais disponível.")
+
+        if Booking.objects.filter(time_slot=ts, status__in=ACTIVE_STATUSES).exists():
+            raise SlotUnavailable("Este horário acabou de ser reservado. Selecione outro.")
+
+        ts.is_available = False
+        ts.save(update_fields=["is_available"])
+        booking = Booking.objects.create(user=user, time_slot=ts, status="pending")
+        index.refresh_days(ts.provider_id, [ts.date], stats=analytics.booked_deltas([booking]))
+        return booking
+
+
+def book_slot_optimistic(user, time_slot):
+    """
+    Reserva sem lock: o UPDATE condicional (WHERE is_available) reivindica o
+    horário em um passo atômico e a constraint uniq_active_booking_per_timeslot
+    barra qualquer booking ativo concorrente que tenha escapado.
+    """
+    with transaction.atomic(savepoint=False):
+        claimed = TimeSlot.objects.filter(pk=time_slot.pk, is_available=True).update(is_available=False)
+        if not claimed:
+            raise SlotUnavailable("Este horário não está mais disponível.")
+
+        try:
+            with transaction.atomic():
+                booking = Booking.objects.create(user=user, time_slot=time_slot, status="pending")
+        except IntegrityError:
+            # a exceção desfaz também o UPDATE acima (transação externa)
+            raise SlotUnavailable("Este horário acabou de ser reservado. Selecione outro.")
+
+        # provider/date do horário não mudam; dispensa reler a linha
+        index.refresh_days(time_slot.provider_id, [time_slot.date], stats=analytics.booked_deltas([booking]))
+        return booking
+
+
+BOOKING_ENGINES = {
+    "locking": book_slot_locking,
+    "optimistic": book_slot_optimistic,
+}
+
+
+def book_slot(user, time_slot, engine=None):
+    return BOOKING_ENGINES[engine or settings.BOOKING_ENGINE](user, time_slot)
+
+
+def resolve_slot(ref):
+    """
+    TimeSlot de um horário escolhido: o próprio TimeSlot ou uma chave de regra,
+    materializada aqui (chamar dentro da transação da reserva).
+    """
+    if isinstance(ref, TimeSlot):
+        return ref
+    try:
+        return rules.materialize(ref)
+    except rules.SlotNotOffered as exc:
+        raise SlotUnavailable(str(exc))
+
+
+def _refresh_index(pairs, stats=None):
+    """
+    Atualiza o índice de disponibilidade (e o consolidado do painel, com os
+    deltas de stats) para pares (provider_id, date), em uma chamada.
+    """
+    index.refresh_many({provider_id for provider_id, _d in pairs}, [d for _pid, d in pairs], stats)
+
+
+def book_slots(user, slot_refs):
+    """
+    Reserva vários horários em uma transação, de forma set-based:
+    1 SELECT dos horários, 1 dos bookings ativos, 1 UPDATE de is_available
+    e 1 INSERT em lote. Retorna (resultados por item, bookings criados).
+    Os itens são ids de TimeSlot ou chaves de horários de regra (materializadas
+    em lote). Horários indisponíveis falham individualmente; os demais são reservados.
+    """
+    slot_refs = list(dict.fromkeys(slot_refs))
+
+    with transaction.atomic(savepoint=False):
+        materialized = rules.materialize_many([ref for ref in slot_refs if isinstance(ref, str)])
+        slot_ids = {}
+        for ref in slot_refs:
+            if isinstance(ref, str):
+                slot_ids[ref] = materialized[ref].pk if ref in materialized else None
+            else:
+                slot_ids[ref] = ref
+
+        slots = TimeSlot.objects.select_for_update().in_bulk([pk for pk in slot_ids.values() if pk])
+        active = set(
+            Booking.objects.filter(time_slot_id__in=slots, status__in=ACTIVE_STATUSES)
+            .values_list("time_slot_id", flat=True)
+        )
+
+        results, claimable = [], []
+        for ref in slot_refs:
+            ts = slots.get(slot_ids[ref])
+            if ts is None:
+                results.append({"id": ref, "ok": False, "error": "Horário inexistente."})
+            elif ts in claimable:
+                results.append({"id": ref, "ok": False, "error": "Horário repetido no lote."})
+            elif not ts.is_available:
+                results.append({"id": ref, "ok": False, "error": "Este horário não está mais disponível."})
+            elif ts.pk in active:
+                results.append({"id": ref, "ok": False, "error": "Este horário acabou de ser reservado."})
+            else:
+                results.append({"id": ref, "ok": True})
+                claimable.append(ts)
+
+        # horários materializados e não reservados continuam livres, agora com id
+        touched = {(ts.provider_id, ts.date) for ts in materialized.values()}
+        if not claimable:
+            _refresh_index(touched)
+            return results, []
+
+        claimed = (
+            TimeSlot.objects.filter(pk__in=[ts.pk for ts in claimable], is_available=True)
+            .update(is_available=False)
+        )
+        if claimed != len(claimable):
+            raise BatchConflict("Alguns horários foram reservados por outra pessoa. Tente novamente.")
+
+        try:
+            with transaction.atomic():
+                bookings = Booking.objects.bulk_create([
+                    Booking(user=user, time_slot=ts, status="pending") for ts in claimable
+                ])
+        except IntegrityError:
+            raise BatchConflict("Alguns horários foram reservados por outra pessoa. Tente novamente.")
+
+        by_slot = {b.time_slot_id: b for b in bookings}
+        for r in results:
+            if r["ok"]:
+                r["booking_id"] = by_slot[slot_ids[r["id"]]].pk
+
+        _refresh_index(touched | {(ts.provider_id, ts.date) for ts in claimable}, analytics.booked_deltas(bookings))
+
+    return results, bookings
+
+
+def cancel_bookings(user, booking_ids):
+    """
+    Cancela vários bookings ativos do usuário em uma transação: 1 UPDATE de
+    status e 1 UPDATE reabrindo os horários que ficaram sem booking ativo.
+    Retorna (resultados por item, [(date, start_time)] dos cancelados).
+    """
+    booking_ids = list(dict.fromkeys(booking_ids))
+
+    with transaction.atomic(savepoint=False):
+        rows = {
+            row["id"]: row
+            for row in Booking.objects.select_for_update(of=("self",))
+            .filter(pk__in=booking_ids, user=user)
+            .values("id", "status", "time_slot_id", "time_slot__provider_id", "time_slot__date",
+                    "time_slot__start_time")
+        }
+
+        results, to_cancel = [], []
+        for booking_id in booking_ids:
+            row = rows.get(booking_id)
+            if row is None:
+                results.append({"id": booking_id, "ok": False, "error": "Agendamento não encontrado."})
+            elif row["status"] not in ACTIVE_STATUSES:
+                results.append({"id": booking_id, "ok": False, "error": "Agendamento não está ativo."})
+            else:
+                results.append({"id": booking_id, "ok": True})
+                to_cancel.append(row)
+
+        if to_cancel:
+            slot_ids = {row["time_slot_id"] for row in to_cancel}
+            Booking.objects.filter(pk__in=[row["id"] for row in to_cancel]).update(status="cancelled")
+
+            still_active = Booking.objects.filter(
+                time_slot_id__in=slot_ids, status__in=ACTIVE_STATUSES,
+            ).values_list("time_slot_id", flat=True)
+            TimeSlot.objects.filter(pk__in=slot_ids).exclude(pk__in=still_active).update(is_available=True)
+
+            _refresh_index(
+                {(row["time_slot__provider_id"], row["time_slot__date"]) for row in to_cancel},
+                analytics.status_deltas([
+                    (row["time_slot__provider_id"], row["time_slot__date"], row["status"], "cancelled")
+                    for row in to_cancel
+                ]),
+            )
+
+    return results, [(row["time_slot__date"], row["time_slot__start_time"]) for row in to_cancel]
@@ -0,0 +1,120 @@
+import threading
+from collections import Counter
+from datetime import date as date_type, time as time_type, timedelta
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import DatabaseError, connection
+from django.test import TestCase, TransactionTestCase
+
+from apps.availability.models import TimeSlot
+from apps.bookings import services
+from apps.bookings.management.commands import check_query_plans
+from apps.bookings.management.commands.check_query_budgets import QUERY_BUDGETS, budget_cases
+from apps.bookings.management.commands.seed_benchmark_data import benchmark_users
+from apps.bookings.models import Booking
+from config.instrumentation import assert_max_queries
+
+
+class SeededTestCase(TestCase):
+    """Dados do seed_benchmark_data em escala pequena, criados uma vez por classe."""
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command(
+            "seed_benchmark_data", prefix="test", providers=2, clients=3,
+            months_ahead=1, months_back=1, stdout=StringIO(),
+        )
+        providers, clients = benchmark_users("test")
+        cls.provider, cls.client_user = providers.first(), clients.first()
+
+
+class QueryPlanTests(SeededTestCase):
+    """As consultas quentes das views leem as tabelas grandes por índice."""
+
+    def test_hot_queries_use_indexes(self):
+        if connection.vendor not in check_query_plans.FULL_SCAN_PATTERNS:
+            self.skipTest(f"banco '{connection.vendor}' não suportado pela verificação de planos")
+        check_query_plans.prefer_indexes()
+        for name, qs in check_query_plans.hot_queries(self.client_user, self.provider):
+            with self.subTest(query=name):
+                plan = qs.explain()
+                self.assertEqual(check_query_plans.full_scans(plan), [], plan)
+                self.assertTrue(check_query_plans.indexed_tables(plan), plan)
+
+
+class QueryBudgetTests(SeededTestCase):
+    """Cada view fica dentro do orçamento de queries de check_query_budgets, com o cache frio."""
+
+    def tearDown(self):
+        # o cache pode ter guardado versões que o rollback do teste desfaz
+        caches[settings.AVAILABILITY_CACHE_ALIAS].clear()
+
+    def test_views_within_budget(self):
+        for name, prepare, call in budget_cases(self.provider, self.client_user):
+            with self.subTest(view=name):
+                prepared = prepare()
+                caches[settings.AVAILABILITY_CACHE_ALIAS].clear()
+                with assert_max_queries(QUERY_BUDGETS[name], name):
+                    response = call(prepared)
+                if hasattr(response, "status_code"):
+                    self.assertLess(response.status_code, 400, name)
+
+
+class ConcurrentBookingTests(TransactionTestCase):
+    """Muitas reservas simultâneas no mesmo horário: exatamente uma vence, em cada engine."""
+
+    attempts = 8
+
+    def setUp(self):
+        if connection.vendor == "sqlite" and connection.is_in_memory_db():
+            self.skipTest("precisa de um banco de teste em arquivo (uma conexão por thread)")
+        User = get_user_model()
+        self.provider = User.objects.create(username="race-provider", is_staff=True)
+        self.clients = [User.objects.create(username=f"race-client-{i}") for i in range(self.attempts)]
+
+    def _race(self, slot, engine):
+        barrier = threading.Barrier(len(self.clients))
+        outcomes = Counter()
+        lock = threading.Lock()
+
+        def attempt(user):
+            try:
+                barrier.wait()
+                services.book_slot(user, slot, engine=engine)
+                result = "booked"
+            except services.SlotUnavailable:
+                result = "unavailable"
+            except DatabaseError as exc:
+                result = f"db_error:{type(exc).__name__}"
+            finally:
+                connection.close()
+            with lock:
+                outcomes[result] += 1
+
+        threads = [threading.Thread(target=attempt, args=(user,)) for user in self.clients]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        return outcomes
+
+    def test_exactly_one_winner(self):
+        day = date_type.today() + timedelta(days=30)
+        for n, engine in enumerate(services.BOOKING_ENGINES):
+            with self.subTest(engine=engine):
+                slot = TimeSlot.objects.create(
+                    provider=self.provider, date=day,
+                    start_time=time_type(8 + n, 0), end_time=time_type(8 + n, 30),
+                )
+                outcomes = self._race(slot, engine)
+
+                self.assertEqual(outcomes, Counter(booked=1, unavailable=self.attempts - 1))
+                self.assertEqual(
+                    Booking.objects.filter(time_slot=slot, status__in=services.ACTIVE_STATUSES).count(), 1,
+                )
+                slot.refresh_from_db()
+                self.assertFalse(slot.is_available)
@@ -5,5 +5,9 @@ urlpatterns = [
     path('', views.BookingListView.as_view(), name='booking_list'),
     path('novo/', views.BookingCreateView.as_view(), name='booking_create'),
     path('<int:pk>/cancelar/', views.BookingCancelView.as_view(), name='booking_cancel'),
+    path('lote/', views.BookingBatchView.as_view(), name='booking_batch'),
     path('prestador/agendamentos/', views.ProviderBookingsView.as_view(), name='provider_bookings'),
+    path('prestador/agendamentos/exportar/', views.booking_export, name='booking_export'),
+    path('prestador/estatisticas/', views.ProviderStatsView.as_view(), name='provider_stats'),
+    path('prestador/estatisticas/api/', views.provider_stats_api, name='provider_stats_api'),
 ]
\ No newline at end of file
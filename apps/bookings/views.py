@@ -1,19 +1,30 @@
+import json
+from datetime import date as date_type, timedelta
+
+from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.core.mail import send_mail
 from django.db import transaction
 from django.db.models import Q
+from django.http import JsonResponse, StreamingHttpResponse
 from django.shortcuts import render, get_object_or_404, redirect
-from django.views.generic import ListView, CreateView
+from django.views.generic import ListView, CreateView, TemplateView
 from django.views import View
 from django.urls import reverse_lazy
+from django.utils.dateparse import parse_date
+from django.utils.decorators import method_decorator
 
+from apps.availability import index
 from apps.availability.models import TimeSlot
+from config.db_router import read_from_replica
+from . import analytics, export, notifications, services
+from .pagination import ORDERING, KeysetPaginationMixin
 from .models import Booking
 from .forms import BookingForm
 
-class BookingListView(LoginRequiredMixin, ListView):
+@method_decorator(read_from_replica, name="dispatch")
+class BookingListView(LoginRequiredMixin, KeysetPaginationMixin, ListView):
     model = Booking
     template_name = "bookings/booking_list.html"
     context_object_name = "bookings"
@@ -27,7 +38,7 @@ class BookingListView(LoginRequiredMixin, ListView):
         if status:
             qs = qs.filter(status=status)
 
-        return qs.order_by("-time_slot__date", "-time_slot__start_time")
+        return qs.order_by(*ORDERING)
 
     def get_context_data(self, **kwargs):
         ctx = super().get_context_data(**kwargs)
@@ -42,64 +53,101 @@ class BookingCreateView(LoginRequiredMixin, CreateView):
     success_url = reverse_lazy("booking_list")
 
     def form_valid(self, form):
-        form.instance.user = self.request.user
-        form.instance.status = "pending"
-
-        with transaction.atomic():
-            ts = TimeSlot.objects.select_for_update().get(pk=form.cleaned_data["time_slot"].pk)
-
-            if not ts.is_available:
-                form.add_error("time_slot", "Este horário não está mais disponível.")
-                return self.form_invalid(form)
-
-            if Booking.objects.filter(time_slot=ts, status__in=["pending", "confirmed"]).exists():
-                form.add_error("time_slot", "Este horário acabou de ser reservado. Selecione outro.")
-                return self.form_invalid(form)
-
-            ts.is_available = False
-            ts.save(update_fields=["is_available"])
-
-            response = super().form_valid(form)
-            booking = self.object
-
-            def _send():
-                if booking.user.email:
-                    send_mail(
-                        subject="Confirmação de agendamento",
-                        message=f"Seu agendamento foi criado para {booking.time_slot.date} às {booking.time_slot.start_time}.",
-                        from_email=None,
-                        recipient_list=[booking.user.email],
-                        fail_silently=True,
-                    )
+        try:
+            # o e-mail entra na fila na mesma transação do booking
+            with transaction.atomic():
+                time_slot = services.resolve_slot(form.cleaned_data["time_slot"])
+                booking = services.book_slot(self.request.user, time_slot)
+                notifications.send_booking_confirmation(booking)
+        except services.SlotUnavailable as exc:
+            form.add_error("time_slot", str(exc))
+            return self.form_invalid(form)
 
-            transaction.on_commit(_send)
-            return response
+        self.object = booking
+        return redirect(self.get_success_url())
 
 
 class BookingCancelView(LoginRequiredMixin, View):
     def post(self, request, pk):
-        booking = get_object_or_404(Booking, pk=pk, user=request.user)
-
         with transaction.atomic():
+            # relido com lock: um segundo envio (duplo clique, reload) vê o status novo
+            booking = get_object_or_404(Booking.objects.select_for_update(), pk=pk, user=request.user)
+            if booking.status not in services.ACTIVE_STATUSES:
+                messages.error(request, "Este agendamento não está mais ativo.")
+                return redirect("booking_list")
+
             ts = TimeSlot.objects.select_for_update().get(pk=booking.time_slot_id)
 
+            previous_status = booking.status
             booking.status = "cancelled"
             booking.save(update_fields=["status"])
+            change = (ts.provider_id, ts.date, previous_status, "cancelled")
 
             has_other_active = Booking.objects.filter(
                 time_slot=ts,
-                status__in=["pending", "confirmed"],
+                status__in=services.ACTIVE_STATUSES,
             ).exists()
 
-            if not has_other_active:
+            if has_other_active:
+                analytics.record_status_changes([change])
+            else:
                 ts.is_available = True
                 ts.save(update_fields=["is_available"])
+                index.refresh_days(ts.provider_id, [ts.date], stats=analytics.status_deltas([change]))
+
+            notifications.send_cancellation(request.user, [(ts.date, ts.start_time)])
 
         messages.info(request, "Agendamento cancelado.")
         return redirect("booking_list")
 
 
-class ProviderBookingsView(LoginRequiredMixin, ListView):
+class BookingBatchView(LoginRequiredMixin, View):
+    """
+    Reserva ou cancela vários horários de uma vez (ex.: sessões semanais).
+    POST JSON: {"action": "book", "slot_ids": [id ou chave de regra, ...]} ou {"action": "cancel", "booking_ids": [...]}
+    Resposta: {"results": [{"id": ..., "ok": true|false, ...}, ...]}
+    """
+
+    def post(self, request):
+        try:
+            payload = json.loads(request.body)
+        except ValueError:
+            return JsonResponse({"error": "JSON inválido."}, status=400)
+
+        action = payload.get("action") if isinstance(payload, dict) else None
+        ids_field = {"book": "slot_ids", "cancel": "booking_ids"}.get(action)
+        if ids_field is None:
+            return JsonResponse({"error": "Ação inválida."}, status=400)
+
+        ids = payload.get(ids_field)
+        # horários de regra chegam como chave (texto); bookings sempre por id
+        allowed = (int, str) if action == "book" else (int,)
+        if not (isinstance(ids, list) and ids and all(isinstance(i, allowed) and not isinstance(i, bool) for i in ids)):
+            kind = "inteiros ou chaves de horário" if action == "book" else "inteiros"
+            return JsonResponse({"error": f"Informe {ids_field} como lista de {kind}."}, status=400)
+        if len(ids) > settings.BOOKING_BATCH_MAX_ITEMS:
+            return JsonResponse(
+                {"error": f"Máximo de {settings.BOOKING_BATCH_MAX_ITEMS} itens por lote."}, status=400
+            )
+
+        if action == "cancel":
+            with transaction.atomic():
+                results, cancelled = services.cancel_bookings(request.user, ids)
+                notifications.send_cancellation(request.user, cancelled)
+            return JsonResponse({"results": results})
+
+        try:
+            with transaction.atomic():
+                results, bookings = services.book_slots(request.user, ids)
+                notifications.send_batch_confirmation(request.user, bookings)
+        except services.BatchConflict as exc:
+            return JsonResponse({"error": str(exc)}, status=409)
+
+        return JsonResponse({"results": results})
+
+
+@method_decorator(read_from_replica, name="dispatch")
+class ProviderBookingsView(LoginRequiredMixin, KeysetPaginationMixin, ListView):
     """
     Lista agendamentos dos clientes para o prestador logado (staff).
     """
@@ -123,9 +171,130 @@ class ProviderBookingsView(LoginRequiredMixin, ListView):
         if status:
             qs = qs.filter(status=status)
 
-        return qs.order_by("-time_slot__date", "-time_slot__start_time")
+        return qs.order_by(*ORDERING)
 
     def get_context_data(self, **kwargs):
         ctx = super().get_context_data(**kwargs)
         ctx["status_filter"] = self.request.GET.get("status", "")
-        return ctx
\ No newline at end of file
+        return ctx
+
+
+def _optional_date(value, default=None):
+    """Data AAAA-MM-DD, default se vier vazia ou None se for inválida (inclusive 2026-02-30)."""
+    if not value:
+        return default
+    try:
+        return parse_date(value)
+    except ValueError:
+        return None
+
+
+def _stats_range(params):
+    """
+    (início, fim, erro) do painel a partir de ?start=&end= (YYYY-MM-DD).
+    Padrão: dos últimos 30 dias aos próximos 30.
+    """
+    today = date_type.today()
+    start = _optional_date(params.get("start"), today - timedelta(days=29))
+    end = _optional_date(params.get("end"), today + timedelta(days=30))
+    if start is None or end is None:
+        return None, None, "Datas inválidas (use AAAA-MM-DD)."
+    if end < start:
+        return None, None, "A data final deve ser igual ou posterior à inicial."
+    if (end - start).days >= analytics.STATS_MAX_RANGE_DAYS:
+        return None, None, f"Intervalo máximo de {analytics.STATS_MAX_RANGE_DAYS} dias."
+    return start, end, None
+
+
+@method_decorator(read_from_replica, name="dispatch")
+class ProviderStatsView(LoginRequiredMixin, TemplateView):
+    """
+    Painel de uso do prestador logado (staff): ocupação, cancelamentos,
+    concluídos e antecedência por dia, lidos de ProviderDailyStats.
+    """
+    template_name = "bookings/provider_stats.html"
+
+    def dispatch(self, request, *args, **kwargs):
+        if not request.user.is_staff:
+            messages.error(request, "Acesso restrito a prestadores.")
+            return redirect("booking_list")
+        return super().dispatch(request, *args, **kwargs)
+
+    def get_context_data(self, **kwargs):
+        ctx = super().get_context_data(**kwargs)
+        start, end, error = _stats_range(self.request.GET)
+        if error:
+            messages.error(self.request, error)
+            start, end, _ = _stats_range({})
+        days, totals = analytics.summary(self.request.user.pk, start, end)
+        ctx.update({"start": start, "end": end, "days": days, "totals": totals})
+        return ctx
+
+
+@read_from_replica
+@login_required
+def provider_stats_api(request):
+    """
+    GET /prestador/estatisticas/api/?start=YYYY-MM-DD&end=YYYY-MM-DD (somente staff)
+    Resposta: {"start", "end", "totals": {...}, "days": [{"date", ...}, ...]}
+    """
+    if not request.user.is_staff:
+        return JsonResponse({"error": "Acesso restrito."}, status=403)
+
+    start, end, error = _stats_range(request.GET)
+    if error:
+        return JsonResponse({"error": error}, status=400)
+
+    days, totals = analytics.summary(request.user.pk, start, end)
+    return JsonResponse({"start": start, "end": end, "totals": totals, "days": days})
+
+
+def export_params(params, user):
+    """
+    (filtros de export.iter_rows, formato, erro) a partir da query string.
+    Prestador exporta só os próprios agendamentos; superusuário escolhe com
+    ?provider=<id> ou exporta todos.
+    """
+    fmt = params.get("format", "csv")
+    if fmt not in export.FORMATS:
+        return None, None, "Formato inválido (use csv ou jsonl)."
+
+    start_str, end_str = params.get("start"), params.get("end")
+    start, end = _optional_date(start_str), _optional_date(end_str)
+    if (start_str and start is None) or (end_str and end is None):
+        return None, None, "Datas inválidas (use AAAA-MM-DD)."
+
+    valid_statuses = {code for code, _label in Booking.STATUS_CHOICES}
+    statuses = [s for s in params.getlist("status") if s]
+    if any(s not in valid_statuses for s in statuses):
+        return None, None, "Status inválido."
+
+    provider_id = user.pk
+    if user.is_superuser:
+        provider = params.get("provider", "")
+        if provider and not provider.isdigit():
+            return None, None, "Prestador inválido."
+        provider_id = int(provider) if provider else None
+
+    return {"provider_id": provider_id, "start": start, "end": end, "statuses": statuses}, fmt, None
+
+
+@read_from_replica
+@login_required
+def booking_export(request):
+    """
+    GET /prestador/agendamentos/exportar/?format=csv|jsonl[&start=&end=YYYY-MM-DD][&status=...]
+    Arquivo em streaming com os agendamentos (ativos e arquivados) do prestador.
+    """
+    if not request.user.is_staff:
+        return JsonResponse({"error": "Acesso restrito."}, status=403)
+
+    filters, fmt, error = export_params(request.GET, request.user)
+    if error:
+        return JsonResponse({"error": error}, status=400)
+
+    # @read_from_replica mantém o banco escolhido enquanto o arquivo é transmitido
+    rows = export.iter_rows(**filters)
+    response = StreamingHttpResponse(export.export_chunks(fmt, rows), content_type=export.FORMATS[fmt])
+    response["Content-Disposition"] = f'attachment; filename="agendamentos-{date_type.today():%Y%m%d}.{fmt}"'
+    return response
@@ -0,0 +1,193 @@
+"""
+Roteamento de leituras para a réplica (alias "replica" em DATABASES).
+
+Só as views marcadas com @read_from_replica leem da réplica; o resto do
+sistema (inclusive as escritas com select_for_update) continua no primário.
+A escolha é feita por requisição e guardada em um ContextVar:
+
+- depois de um POST/PUT/PATCH/DELETE, ReplicaPinMiddleware fixa o usuário no
+  primário por REPLICA_PIN_SECONDS (sessão), para ele ver o que acabou de gravar;
+- se a réplica estiver fora do ar ou com atraso acima de
+  REPLICA_MAX_LAG_SECONDS, a leitura volta para o primário.
+"""
+import asyncio
+import functools
+import logging
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import sync_to_async
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DatabaseError, connections
+from django.db.models import Max
+
+logger = logging.getLogger("saas.replica")
+
+REPLICA_ALIAS = "replica"
+PIN_SESSION_KEY = "db_pin_until"
+
+_read_alias = ContextVar("read_alias", default=None)
+
+# última medição do atraso neste processo
+_health = {"checked_at": 0.0, "lag": None}
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        return _read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # primário e réplica têm os mesmos dados
+        return True
+
+
+def replica_configured():
+    return REPLICA_ALIAS in settings.DATABASES
+
+
+def replica_lag():
+    """
+    Atraso da réplica em segundos, ou None se ela não responder.
+    No Postgres usa o replay do WAL; nos demais bancos compara a última
+    alteração do índice de disponibilidade nos dois lados.
+    """
+    replica = connections[REPLICA_ALIAS]
+    try:
+        if replica.vendor == "postgresql":
+            with replica.cursor() as cursor:
+                cursor.execute(
+                    "SELECT CASE WHEN NOT pg_is_in_recovery() "
+                    "OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+                    "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END"
+                )
+                return float(cursor.fetchone()[0] or 0)
+
+        from apps.availability.models import DayAvailability
+
+        latest = {
+            alias: DayAvailability.objects.using(alias).aggregate(m=Max("updated_at"))["m"]
+            for alias in ("default", REPLICA_ALIAS)
+        }
+        if latest["default"] is None or latest[REPLICA_ALIAS] == latest["default"]:
+            return 0.0
+        if latest[REPLICA_ALIAS] is None:
+            return float("inf")
+        return max(0.0, (latest["default"] - latest[REPLICA_ALIAS]).total_seconds())
+    except DatabaseError as exc:
+        logger.warning("réplica indisponível: %s", exc)
+        return None
+
+
+def replica_healthy():
+    """Atraso dentro do limite, medido no máximo a cada REPLICA_LAG_CHECK_SECONDS."""
+    now = time.monotonic()
+    if now - _health["checked_at"] >= settings.REPLICA_LAG_CHECK_SECONDS:
+        _health["lag"] = replica_lag()
+        _health["checked_at"] = now
+        if _health["lag"] is not None and _health["lag"] > settings.REPLICA_MAX_LAG_SECONDS:
+            logger.warning("réplica atrasada %.1fs; lendo do primário", _health["lag"])
+    lag = _health["lag"]
+    return lag is not None and lag <= settings.REPLICA_MAX_LAG_SECONDS
+
+
+def _is_pinned(request):
+    session = getattr(request, "session", None)
+    return session is not None and session.get(PIN_SESSION_KEY, 0) > time.time()
+
+
+def choose_read_alias(request):
+    """Alias de leitura desta requisição (None = primário)."""
+    if not replica_configured() or _is_pinned(request):
+        return None
+    # sessão e usuário saem do primário, antes da troca: uma sessão recém-criada
+    # pode ainda não existir na réplica
+    user = getattr(request, "user", None)
+    if user is not None:
+        user.is_authenticated  # noqa: B018 - resolve o SimpleLazyObject agora
+    return REPLICA_ALIAS if replica_healthy() else None
+
+
+def _scoped(alias, iterator):
+    """Mantém o alias durante cada passo de um corpo em streaming (lido após a view retornar)."""
+    iterator = iter(iterator)
+    while True:
+        token = _read_alias.set(alias)
+        try:
+            chunk = next(iterator)
+        except StopIteration:
+            return
+        finally:
+            _read_alias.reset(token)
+        yield chunk
+
+
+async def _ascoped(alias, iterator):
+    iterator = aiter(iterator)
+    while True:
+        token = _read_alias.set(alias)
+        try:
+            chunk = await anext(iterator)
+        except StopAsyncIteration:
+            return
+        finally:
+            _read_alias.reset(token)
+        yield chunk
+
+
+def _bind_stream(response, alias):
+    if alias and getattr(response, "streaming", False):
+        content = response.streaming_content
+        response.streaming_content = (
+            _ascoped(alias, content) if response.is_async else _scoped(alias, content)
+        )
+    return response
+
+
+def read_from_replica(view):
+    """Decorator de view (sync ou async): leituras da requisição vão para a réplica quando possível."""
+    if asyncio.iscoroutinefunction(view):
+        @functools.wraps(view)
+        async def async_wrapper(request, *args, **kwargs):
+            alias = await sync_to_async(choose_read_alias)(request)
+            token = _read_alias.set(alias)
+            try:
+                return _bind_stream(await view(request, *args, **kwargs), alias)
+            finally:
+                _read_alias.reset(token)
+
+        return async_wrapper
+
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        alias = choose_read_alias(request)
+        token = _read_alias.set(alias)
+        try:
+            return _bind_stream(view(request, *args, **kwargs), alias)
+        finally:
+            _read_alias.reset(token)
+
+    return wrapper
+
+
+class ReplicaPinMiddleware:
+    """Após uma requisição de escrita bem-sucedida, fixa o usuário no primário."""
+
+    def __init__(self, get_response):
+        if not replica_configured():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if (
+            request.method not in ("GET", "HEAD", "OPTIONS")
+            and response.status_code < 400
+            and request.user.is_authenticated
+        ):
+            request.session[PIN_SESSION_KEY] = time.time() + settings.REPLICA_PIN_SECONDS
+        return response
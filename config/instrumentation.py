@@ -0,0 +1,162 @@
+"""
+Instrumentação opcional de queries por requisição (QUERY_INSTRUMENTATION=1).
+
+QueryInstrumentationMiddleware instala um execute_wrapper em cada conexão e
+registra, por view: quantidade de queries, tempo total de SQL, a query mais
+lenta e o tamanho da resposta. O resumo vai no header Server-Timing (visível
+no DevTools) e em uma linha de log JSON no logger "saas.queries".
+
+assert_max_queries() usa o mesmo wrapper para verificar orçamentos de
+queries (ver `manage.py check_query_budgets`).
+
+CacheCounters conta acertos/falhas de um cache em memória do processo, sem
+ir ao próprio cache medido; com a instrumentação ligada, os da requisição
+entram também no header e no log.
+"""
+import json
+import logging
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger("saas.queries")
+
+# tamanho máximo do SQL guardado (sem parâmetros, para não vazar dados)
+SQL_PREVIEW_CHARS = 300
+
+
+class QueryStats:
+    """execute_wrapper que acumula contagem, tempo e a query mais lenta."""
+
+    def __init__(self, keep_sql=False):
+        self.count = 0
+        self.seconds = 0.0
+        self.slowest_seconds = 0.0
+        self.slowest_sql = ""
+        self.statements = [] if keep_sql else None
+
+    def __call__(self, execute, sql, params, many, context):
+        t0 = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - t0
+            self.count += 1
+            self.seconds += elapsed
+            if elapsed >= self.slowest_seconds:
+                self.slowest_seconds = elapsed
+                self.slowest_sql = sql[:SQL_PREVIEW_CHARS]
+            if self.statements is not None:
+                self.statements.append(sql)
+
+
+@contextmanager
+def capture_queries(keep_sql=False):
+    """Conta as queries executadas, em todas as conexões, dentro do bloco."""
+    stats = QueryStats(keep_sql=keep_sql)
+    with ExitStack() as stack:
+        for conn in connections.all():
+            stack.enter_context(conn.execute_wrapper(stats))
+        yield stats
+
+
+@contextmanager
+def assert_max_queries(limit, label=""):
+    """
+    Falha com AssertionError se o bloco executar mais de `limit` queries.
+    Ex.: with assert_max_queries(5, "booking_list"): client.get(url)
+    """
+    with capture_queries(keep_sql=True) as stats:
+        yield stats
+    if stats.count > limit:
+        listing = "\n".join(f"  {i}. {sql}" for i, sql in enumerate(stats.statements, 1))
+        raise AssertionError(f"{label or 'bloco'}: {stats.count} queries (orçamento: {limit})\n{listing}")
+
+
+# contadores de cache da requisição em andamento ({nome: [acertos, falhas]})
+_request_cache_counts = ContextVar("request_cache_counts", default=None)
+
+
+class CacheCounters:
+    """Acertos/falhas de um cache, por processo (zeram quando o processo reinicia)."""
+
+    def __init__(self, name):
+        self.name = name
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def record(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+        counts = _request_cache_counts.get()
+        if counts is not None:
+            counts.setdefault(self.name, [0, 0])[0 if hit else 1] += 1
+
+    def snapshot(self):
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        total = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": round(hits / total, 4) if total else None,
+        }
+
+
+class QueryInstrumentationMiddleware:
+    """
+    Middleware só síncrono de propósito: views assíncronas passam a rodar na
+    thread da requisição, onde o wrapper está instalado. Em respostas em
+    streaming só entra o que foi executado antes do primeiro byte.
+    """
+
+    def __init__(self, get_response):
+        if not settings.QUERY_INSTRUMENTATION:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        cache_counts = {}
+        token = _request_cache_counts.set(cache_counts)
+        try:
+            with capture_queries() as stats:
+                response = self.get_response(request)
+        finally:
+            _request_cache_counts.reset(token)
+        total = time.perf_counter() - started
+
+        db_ms, total_ms = stats.seconds * 1000, total * 1000
+        response["Server-Timing"] = ", ".join([
+            f'db;dur={db_ms:.1f};desc="{stats.count} queries"',
+            f"app;dur={total_ms - db_ms:.1f}",
+            f"total;dur={total_ms:.1f}",
+        ])
+
+        match = request.resolver_match
+        record = {
+            "view": match.view_name if match else None,
+            "method": request.method,
+            "path": request.path,
+            "status": response.status_code,
+            "queries": stats.count,
+            "db_ms": round(db_ms, 2),
+            "total_ms": round(total_ms, 2),
+            "slowest_ms": round(stats.slowest_seconds * 1000, 2),
+            "slowest_sql": stats.slowest_sql,
+            "response_bytes": None if response.streaming else len(response.content),
+            "streaming": response.streaming,
+            "cache": {name: {"hits": hits, "misses": misses} for name, (hits, misses) in cache_counts.items()},
+        }
+        level = logging.WARNING if stats.count > settings.QUERY_INSTRUMENTATION_WARN_QUERIES else logging.INFO
+        logger.log(level, json.dumps(record), extra={"query_stats": record})
+        return response